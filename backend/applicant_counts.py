@@ -0,0 +1,37 @@
+"""Per-job applicant counters, stored on each job as `applicant_counts`.
+
+`apply_to_job` and `update_application_status` keep them current with $inc,
+so listing a recruiter's jobs never counts applications. `count_stages`
+recounts them from the applications collection, for seeding and for the
+reconcile job that repairs drift.
+"""
+
+from typing import Dict, Iterable, List
+
+APPLICATION_STATUSES = ("pending", "shortlisted", "rejected", "accepted")
+
+
+def empty_applicant_counts() -> dict:
+    return {"total": 0, **{status: 0 for status in APPLICATION_STATUSES}}
+
+
+def count_stages(match: dict) -> List[dict]:
+    """Pipeline counting the applications matching `match` per (job_id, status), with their latest write"""
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {"job_id": "$job_id", "status": "$status"},
+            "count": {"$sum": 1},
+            "last_updated_at": {"$max": "$updated_at"},
+        }},
+    ]
+
+
+def tally(rows: Iterable[dict]) -> Dict[str, dict]:
+    """job_id -> applicant_counts from the output of `count_stages`"""
+    counts = {}
+    for row in rows:
+        job_counts = counts.setdefault(row["_id"]["job_id"], empty_applicant_counts())
+        job_counts[row["_id"]["status"]] = job_counts.get(row["_id"]["status"], 0) + row["count"]
+        job_counts["total"] += row["count"]
+    return counts
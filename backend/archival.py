@@ -0,0 +1,279 @@
+"""Hot/cold archival of closed jobs, their applications and old messages.
+
+`delete_job` only closes a job, so without archival every closed job, every
+application to it and every message ever sent stay in the hot collections and
+their indexes. The archiver moves documents matching an ArchivePolicy into
+`<collection>_archive` in batches: insert into the archive, then delete from
+the hot collection. The delete repeats the policy filter, so a document
+changed in between (a job reopened) stays hot and its archive copy is removed,
+and the children already archived with it are moved back.
+Reruns are safe because archives have a unique index on the business key.
+
+Archive collections are created with ARCHIVE_BLOCK_COMPRESSOR (zstd by
+default) as their WiredTiger block compressor. Deployments that reject the
+option get a plain collection.
+
+Handlers read through to the archive when an item is missing from the hot
+collection (`find_one`, `archive`). `report` gives hot and archive sizes and
+an estimate of the hot working set reclaimed so far.
+
+With ARCHIVE_ENABLED=true the sweep runs from the scheduler and handlers read
+through. archive_cold_data.py runs it once by hand.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import bson
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+
+from dates import date_range, utcnow
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_ENABLED = os.environ.get("ARCHIVE_ENABLED", "false").lower() == "true"
+ARCHIVE_SWEEP_SECONDS = float(os.environ.get("ARCHIVE_SWEEP_SECONDS", "86400"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_JOB_DAYS = float(os.environ.get("ARCHIVE_JOB_DAYS", "180"))
+ARCHIVE_MESSAGE_DAYS = float(os.environ.get("ARCHIVE_MESSAGE_DAYS", "365"))
+# Empty for the server default; "none" stores archives uncompressed
+ARCHIVE_BLOCK_COMPRESSOR = os.environ.get("ARCHIVE_BLOCK_COMPRESSOR", "zstd")
+ARCHIVE_SUFFIX = "_archive"
+STATS_COLLECTION = "archive_stats"
+
+ARCHIVED_JOB_STATUSES = ("closed", "rejected")
+
+
+@dataclass
+class ArchivePolicy:
+    """Documents of `collection` that `eligible(now)` matches move to the archive.
+
+    `cascade` names (collection, key, field) children moved along with each
+    batch, e.g. the applications of archived jobs.
+    """
+    collection: str
+    key: str
+    eligible: Callable[[datetime], dict]
+    indexes: List[List[Tuple[str, int]]] = field(default_factory=list)
+    cascade: List[Tuple[str, str, str]] = field(default_factory=list)
+
+
+def closed_jobs(now: datetime, days: float = ARCHIVE_JOB_DAYS) -> dict:
+    cutoff = now - timedelta(days=days)
+    return {
+        "status": {"$in": list(ARCHIVED_JOB_STATUSES)},
+        "$or": [
+            {"closed_at": {"$lt": cutoff}},
+            # Jobs closed before closed_at was recorded age from when they were posted
+            {"closed_at": None, **date_range("posted_at", lt=cutoff)},
+        ],
+    }
+
+
+def read_messages(now: datetime, days: float = ARCHIVE_MESSAGE_DAYS) -> dict:
+    """Unread messages stay hot so unread counts and mark_read never look in the archive"""
+    return {"read": True, **date_range("created_at", lt=now - timedelta(days=days))}
+
+
+POLICIES = {
+    "jobs": ArchivePolicy(
+        "jobs", "job_id", closed_jobs,
+        indexes=[[("recruiter_id", 1)]],
+        cascade=[("applications", "application_id", "job_id")],
+    ),
+    "messages": ArchivePolicy(
+        "messages", "message_id", read_messages,
+        indexes=[[("sender_id", 1), ("receiver_id", 1), ("created_at", -1)]],
+    ),
+}
+# Indexes of collections only archived through a cascade
+CASCADE_INDEXES = {"applications": [[("job_id", 1), ("applied_at", -1)], [("job_seeker_id", 1)]]}
+
+
+def archive_name(collection: str) -> str:
+    return collection + ARCHIVE_SUFFIX
+
+
+class Archiver:
+    def __init__(self, db, policies: Dict[str, ArchivePolicy] = POLICIES, batch_size: int = ARCHIVE_BATCH_SIZE,
+                 read_through: bool = ARCHIVE_ENABLED):
+        self.db = db
+        self.policies = policies
+        self.batch_size = batch_size
+        self.read_through = read_through
+        self._ready = set()
+
+    def archive(self, collection: str):
+        return self.db[archive_name(collection)]
+
+    # ============ READ-THROUGH ============
+
+    async def find_one(self, collection: str, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        """Look up a document that is no longer hot; marked with archived: True"""
+        if not self.read_through:
+            return None
+        doc = await self.archive(collection).find_one(query, projection)
+        if doc is not None:
+            doc["archived"] = True
+        return doc
+
+    async def older_messages(self, user_id: str, other_id: str, before, limit: int) -> List[dict]:
+        """The `limit` archived messages between two users sent before `before`, oldest first"""
+        if not self.read_through or limit <= 0:
+            return []
+        query = {"$or": [
+            {"sender_id": user_id, "receiver_id": other_id},
+            {"sender_id": other_id, "receiver_id": user_id},
+        ]}
+        if before is not None:
+            query["created_at"] = {"$lt": before}
+        messages = await self.archive("messages").find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+        messages.reverse()
+        return messages
+
+    # ============ MOVING ============
+
+    async def ensure_archive(self, collection: str, key: str, indexes: List[List[Tuple[str, int]]]):
+        if collection in self._ready:
+            return
+        name = archive_name(collection)
+        options = {}
+        if ARCHIVE_BLOCK_COMPRESSOR:
+            options["storageEngine"] = {"wiredTiger": {"configString": f"block_compressor={ARCHIVE_BLOCK_COMPRESSOR}"}}
+        try:
+            await self.db.create_collection(name, **options)
+        except CollectionInvalid:
+            pass
+        except OperationFailure as e:
+            if e.code == 48:  # NamespaceExists
+                pass
+            else:
+                logger.warning(f"Creating {name} with {ARCHIVE_BLOCK_COMPRESSOR} compression failed ({e}), "
+                               f"using the default")
+                try:
+                    await self.db.create_collection(name)
+                except (CollectionInvalid, OperationFailure):
+                    pass
+        await self.archive(collection).create_index(key, unique=True)
+        for index in indexes:
+            await self.archive(collection).create_index(index)
+        self._ready.add(collection)
+
+    async def _copy(self, target, docs: List[dict]):
+        try:
+            await target.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Copies left by an interrupted run are already there
+            if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+
+    async def _record(self, collection: str, docs: List[dict], sign: int = 1):
+        await self.db[STATS_COLLECTION].update_one(
+            {"_id": collection},
+            {"$inc": {"documents": sign * len(docs), "bytes": sign * sum(len(bson.encode(doc)) for doc in docs)},
+             "$set": {"last_run_at": utcnow()}},
+            upsert=True
+        )
+
+    async def restore(self, collection: str, key: str, query: dict) -> List[str]:
+        """Move archived documents matching `query` back to the hot collection; returns their keys"""
+        docs = await self.archive(collection).find(query).to_list(None)
+        if not docs:
+            return []
+        keys = [doc[key] for doc in docs]
+        await self._copy(self.db[collection], docs)
+        await self.archive(collection).delete_many({key: {"$in": keys}})
+        await self._record(collection, docs, sign=-1)
+        return keys
+
+    async def move(self, collection: str, key: str, query: dict, cascade=()) -> List[str]:
+        """Move every document matching `query` to the archive; returns the moved keys.
+
+        Children are moved before their parents, so an interrupted run never
+        leaves hot children of an archived parent. Children of a parent that
+        stays hot are restored.
+        """
+        hot = self.db[collection]
+        moved = []
+        while True:
+            docs = await hot.find(query).limit(self.batch_size).to_list(self.batch_size)
+            if not docs:
+                return moved
+            keys = [doc[key] for doc in docs]
+            for child, child_key, parent_field in cascade:
+                await self.ensure_archive(child, child_key, CASCADE_INDEXES.get(child, []))
+                await self.move(child, child_key, {parent_field: {"$in": keys}})
+            await self._copy(self.archive(collection), docs)
+            result = await hot.delete_many({**query, key: {"$in": keys}})
+            if result.deleted_count < len(docs):
+                # Changed since they were read, e.g. a job reopened: the hot copy wins, with its children
+                kept = {doc[key] async for doc in hot.find({key: {"$in": keys}}, {"_id": 0, key: 1})}
+                for child, child_key, parent_field in cascade:
+                    await self.restore(child, child_key, {parent_field: {"$in": list(kept)}})
+                await self.archive(collection).delete_many({key: {"$in": list(kept)}})
+                docs = [doc for doc in docs if doc[key] not in kept]
+            await self._record(collection, docs)
+            moved.extend(doc[key] for doc in docs)
+            if len(docs) < self.batch_size:
+                return moved
+            await asyncio.sleep(0)
+
+    async def run(self, collections: Optional[List[str]] = None) -> int:
+        """Archive everything currently eligible; the scheduler's entry point"""
+        now, touched = utcnow(), 0
+        for name, policy in self.policies.items():
+            if collections and name not in collections:
+                continue
+            await self.ensure_archive(policy.collection, policy.key, policy.indexes)
+            moved = await self.move(policy.collection, policy.key, policy.eligible(now), policy.cascade)
+            if moved:
+                logger.info(f"Archived {len(moved)} {policy.collection}")
+            touched += len(moved)
+        return touched
+
+    async def eligible_counts(self) -> Dict[str, int]:
+        now = utcnow()
+        return {
+            name: await self.db[policy.collection].count_documents(policy.eligible(now))
+            for name, policy in self.policies.items()
+        }
+
+    # ============ REPORTING ============
+
+    async def _sizes(self, name: str) -> dict:
+        try:
+            stats = await self.db.command("collStats", name)
+        except OperationFailure:
+            stats = {}
+        return {
+            "count": stats.get("count", 0),
+            "size_bytes": stats.get("size", 0),
+            "storage_bytes": stats.get("storageSize", 0),
+            "index_bytes": stats.get("totalIndexSize", 0),
+        }
+
+    async def report(self) -> Dict[str, dict]:
+        """Hot and archive sizes, and the hot working set reclaimed by archiving so far"""
+        names = {policy.collection for policy in self.policies.values()}
+        names |= {child for policy in self.policies.values() for child, _, _ in policy.cascade}
+        moved = {doc["_id"]: doc async for doc in self.db[STATS_COLLECTION].find({"_id": {"$in": sorted(names)}})}
+        report = {}
+        for name in sorted(names):
+            hot, archive = await self._sizes(name), await self._sizes(archive_name(name))
+            totals = moved.get(name, {})
+            index_bytes_per_doc = hot["index_bytes"] / hot["count"] if hot["count"] else 0
+            report[name] = {
+                "hot": hot,
+                "archive": archive,
+                "documents_archived": totals.get("documents", 0),
+                # Data plus the index entries the moved documents would have kept in the hot set
+                "reclaimed_bytes_estimate": round(totals.get("bytes", 0) + index_bytes_per_doc * totals.get("documents", 0)),
+                "archive_compression_ratio": (round(archive["size_bytes"] / archive["storage_bytes"], 2)
+                                              if archive["storage_bytes"] else None),
+                "last_run_at": totals.get("last_run_at"),
+            }
+        return report
@@ -0,0 +1,60 @@
+"""Run the hot/cold archival sweep once, outside the scheduler.
+
+Moves documents matching the policies in archival.py into their
+`<collection>_archive` collections and reports hot and archive sizes. Set
+ARCHIVE_ENABLED=true on the workers first, so handlers read through to the
+archive for the items moved.
+
+    python archive_cold_data.py --dry-run            # documents eligible per policy
+    python archive_cold_data.py --collections jobs   # archive closed jobs and their applications
+    ARCHIVE_JOB_DAYS=90 python archive_cold_data.py
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from archival import POLICIES, Archiver  # noqa: E402
+from database import RoutedDatabase, create_client  # noqa: E402
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME"))
+    parser.add_argument("--collections", help=f"comma-separated subset of {', '.join(POLICIES)}")
+    parser.add_argument("--dry-run", action="store_true", help="only count eligible documents")
+    args = parser.parse_args()
+    if not args.db_name:
+        parser.error("--db-name or DB_NAME is required")
+    collections = args.collections.split(",") if args.collections else None
+    unknown = set(collections or ()) - set(POLICIES)
+    if unknown:
+        parser.error(f"no archival policy for {', '.join(sorted(unknown))}")
+
+    client = create_client(args.mongo_url)
+    archiver = Archiver(RoutedDatabase(client[args.db_name]))
+    if args.dry_run:
+        for name, count in (await archiver.eligible_counts()).items():
+            print(f"{name}: {count:,} documents eligible")
+    else:
+        start = time.perf_counter()
+        moved = await archiver.run(collections)
+        print(f"Archived {moved:,} documents in {time.perf_counter() - start:.1f}s")
+
+    for name, entry in (await archiver.report()).items():
+        hot, archive = entry["hot"], entry["archive"]
+        print(f"  {name:<14} hot {hot['count']:>12,} docs {hot['size_bytes'] / 2**20:>9.1f}MB data "
+              f"{hot['index_bytes'] / 2**20:>8.1f}MB indexes | archive {archive['count']:>12,} docs "
+              f"{archive['storage_bytes'] / 2**20:>9.1f}MB on disk | "
+              f"reclaimed ~{entry['reclaimed_bytes_estimate'] / 2**20:.1f}MB")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
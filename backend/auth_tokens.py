@@ -0,0 +1,209 @@
+"""JWT issuing and revocation for email/password logins.
+
+In "legacy" mode (the default) a login returns one token holding `user_id`,
+valid for LEGACY_TOKEN_EXPIRE_DAYS, and every request reads the user from
+Mongo. In "stateless" mode a login returns a short-lived access token and a
+refresh token. The access token carries the role, identity fields and a token
+version, so `get_current_user` and the role checks need no database read:
+
+    {"typ": "access", "user_id", "role", "email", "name", "picture",
+     "created_at", "ver", "iat", "exp", "jti"}
+
+Revocation is checked against an in-memory `RevocationList`. It holds
+revoked token ids, and a minimum token version per user for "log out
+everywhere". It is loaded from the `token_revocations` collection at startup
+and kept in sync by the change stream and a poll every REVOCATION_SYNC_SECONDS.
+Entries expire with the tokens they cover, so the set stays small.
+
+Refresh tokens are single use. Each refresh revokes the presented token, and
+presenting an already revoked one revokes every token of that user.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import jwt
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from dates import as_datetime, utcnow
+
+logger = logging.getLogger(__name__)
+
+AUTH_TOKEN_MODE = os.environ.get("AUTH_TOKEN_MODE", "legacy")
+ACCESS_TOKEN_EXPIRE_MINUTES = float(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = float(os.environ.get("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+LEGACY_TOKEN_EXPIRE_DAYS = float(os.environ.get("LEGACY_TOKEN_EXPIRE_DAYS", "7"))
+# Set to "false" once every legacy token has expired, so only stateless tokens are accepted
+ACCEPT_LEGACY_TOKENS = os.environ.get("ACCEPT_LEGACY_TOKENS", "true").lower() == "true"
+REVOCATION_SYNC_SECONDS = float(os.environ.get("REVOCATION_SYNC_SECONDS", "30"))
+REVOCATION_COLLECTION = "token_revocations"
+
+# Identity fields copied into access tokens so handlers can build a User from claims
+IDENTITY_CLAIMS = ("user_id", "email", "name", "role", "picture")
+
+
+class TokenIssuer:
+    def __init__(self, secret: str, algorithm: str = "HS256", mode: str = AUTH_TOKEN_MODE):
+        if mode not in ("legacy", "stateless"):
+            raise ValueError(f"Unknown AUTH_TOKEN_MODE: {mode}")
+        self.secret = secret
+        self.algorithm = algorithm
+        self.mode = mode
+
+    def _encode(self, claims: dict, lifetime: timedelta) -> str:
+        now = utcnow()
+        claims = {**claims, "iat": now, "exp": now + lifetime, "jti": uuid.uuid4().hex}
+        return jwt.encode(claims, self.secret, algorithm=self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        """Verified claims; raises jwt.PyJWTError for bad signatures and expired tokens"""
+        return jwt.decode(token, self.secret, algorithms=[self.algorithm])
+
+    def access_token(self, user: dict) -> str:
+        claims = {field: user.get(field) for field in IDENTITY_CLAIMS}
+        created_at = user.get("created_at")
+        claims["created_at"] = as_datetime(created_at).isoformat() if created_at else None
+        claims["ver"] = user.get("token_version", 0)
+        return self._encode({"typ": "access", **claims}, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+
+    def refresh_token(self, user: dict) -> str:
+        claims = {"typ": "refresh", "user_id": user["user_id"], "ver": user.get("token_version", 0)}
+        return self._encode(claims, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+    def issue(self, user: dict) -> dict:
+        """Response fields for a successful login"""
+        if self.mode == "legacy":
+            claims = {"user_id": user["user_id"], "ver": user.get("token_version", 0)}
+            return {"token": self._encode(claims, timedelta(days=LEGACY_TOKEN_EXPIRE_DAYS))}
+        return {
+            "token": self.access_token(user),
+            "refresh_token": self.refresh_token(user),
+            "expires_in": int(ACCESS_TOKEN_EXPIRE_MINUTES * 60),
+        }
+
+
+class RevocationList:
+    """Revoked token ids and per-user minimum token versions, mirrored from Mongo"""
+
+    def __init__(self, db, sync_seconds: float = REVOCATION_SYNC_SECONDS):
+        self.collection = db[REVOCATION_COLLECTION]
+        self.users = db.users
+        self.sync_seconds = sync_seconds
+        self.token_ids: Dict[str, datetime] = {}
+        self.min_versions: Dict[str, tuple] = {}
+        self.metrics = {"checks": 0, "rejected": 0, "syncs": 0, "sync_errors": 0, "last_sync_at": None}
+        self._synced_until: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+        await self.collection.create_index("created_at")
+
+    # ============ CHECKS ============
+
+    def is_revoked(self, claims: dict) -> bool:
+        self.metrics["checks"] += 1
+        revoked = claims.get("jti") in self.token_ids
+        if not revoked:
+            min_version = self.min_versions.get(claims.get("user_id"))
+            revoked = min_version is not None and claims.get("ver", 0) < min_version[0]
+        if revoked:
+            self.metrics["rejected"] += 1
+        return revoked
+
+    # ============ REVOKING ============
+
+    def apply(self, doc: dict):
+        expires_at = as_datetime(doc["expires_at"])
+        if doc.get("kind") == "user":
+            current = self.min_versions.get(doc["user_id"])
+            if current is None or doc["min_version"] > current[0]:
+                self.min_versions[doc["user_id"]] = (doc["min_version"], expires_at)
+        else:
+            self.token_ids[doc["jti"]] = expires_at
+
+    def apply_change(self, change: dict):
+        """Change-stream callback, so other workers learn of a revocation before the next poll"""
+        if change.get("operationType") == "insert" and change.get("fullDocument"):
+            self.apply(change["fullDocument"])
+
+    async def revoke_token(self, claims: dict) -> bool:
+        """Revoke one token by its jti; False if it was already revoked"""
+        if not claims.get("jti") or not claims.get("exp"):
+            # Issued before tokens had an id and expiry: only a version bump can invalidate it
+            if not claims.get("user_id"):
+                return False
+            await self.revoke_user(claims["user_id"])
+            return True
+        if claims["jti"] in self.token_ids:
+            return False
+        doc = {"_id": f"jti:{claims['jti']}", "kind": "token", "jti": claims["jti"], "user_id": claims.get("user_id"),
+               "expires_at": datetime.fromtimestamp(claims["exp"], tz=timezone.utc), "created_at": utcnow()}
+        self.apply(doc)
+        try:
+            await self.collection.insert_one(doc)
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def revoke_user(self, user_id: str) -> int:
+        """Invalidate every token issued to `user_id` so far; returns the new token version"""
+        user = await self.users.find_one_and_update(
+            {"user_id": user_id}, {"$inc": {"token_version": 1}}, projection={"_id": 0, "token_version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        version = (user or {}).get("token_version", 1)
+        now = utcnow()
+        doc = {"_id": f"user:{user_id}:{version}", "kind": "user", "user_id": user_id, "min_version": version,
+               # Older tokens cannot outlive the longest token lifetime
+               "expires_at": now + timedelta(days=max(REFRESH_TOKEN_EXPIRE_DAYS, LEGACY_TOKEN_EXPIRE_DAYS)),
+               "created_at": now}
+        self.apply(doc)
+        await self.collection.insert_one(doc)
+        return version
+
+    # ============ SYNC ============
+
+    async def sync(self):
+        """Apply revocations written since the last sync, then drop expired entries"""
+        query = {}
+        if self._synced_until is not None:
+            # Overlap a little: writes from other workers can land with slightly older timestamps
+            query = {"created_at": {"$gte": self._synced_until - timedelta(seconds=self.sync_seconds)}}
+        started = utcnow()
+        async for doc in self.collection.find(query):
+            self.apply(doc)
+        self._synced_until = started
+        self.metrics["syncs"] += 1
+        self.metrics["last_sync_at"] = started
+        self.prune(started)
+
+    def prune(self, now: datetime):
+        self.token_ids = {jti: expires for jti, expires in self.token_ids.items() if expires > now}
+        self.min_versions = {user: entry for user, entry in self.min_versions.items() if entry[1] > now}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.sync_seconds)
+            try:
+                await self.sync()
+            except PyMongoError as e:
+                self.metrics["sync_errors"] += 1
+                logger.error(f"Revocation sync failed: {e}")
+
+    def stats(self) -> dict:
+        return {"revoked_tokens": len(self.token_ids), "revoked_users": len(self.min_versions), **self.metrics}
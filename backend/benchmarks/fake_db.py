@@ -0,0 +1,851 @@
+"""In-memory stand-in for the subset of the Motor API that server.py uses.
+
+Good enough to exercise handlers in benchmarks without a mongod. Every call
+that would be a network round trip increments `FakeDatabase.round_trips`.
+Time spent evaluating reads is added to `FakeDatabase.server_seconds`, since
+mongod would do that work, not the handler.
+
+`SyncFakeDatabase` shows the same data through the blocking pymongo API
+that the migrate_*.py scripts use.
+"""
+
+import copy
+import functools
+import re
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from geo import haversine_km
+
+_MISSING = object()
+
+
+def get_path(doc, path):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def set_path(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def unset_path(doc, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part, {})
+    doc.pop(parts[-1], None)
+
+
+def _sort_key(value):
+    # Approximates BSON ordering: missing/null < numbers < strings < objects < arrays
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (5, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, dict):
+        return (3, str(value))
+    if isinstance(value, list):
+        return (4, str(value))
+    return (6, value)
+
+
+def _compare(op, actual, expected):
+    if actual is _MISSING or actual is None:
+        return False
+    try:
+        if op == "$gt":
+            return actual > expected
+        if op == "$gte":
+            return actual >= expected
+        if op == "$lt":
+            return actual < expected
+        if op == "$lte":
+            return actual <= expected
+    except TypeError:
+        return False
+    raise ValueError(op)
+
+
+def _match_value(actual, condition):
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, expected in condition.items():
+            if op == "$options":
+                continue
+            if op == "$eq":
+                if not _match_value(actual, expected):
+                    return False
+            elif op == "$ne":
+                if _match_value(actual, expected):
+                    return False
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                values = actual if isinstance(actual, list) else [actual]
+                if not any(_compare(op, v, expected) for v in values):
+                    return False
+            elif op == "$in":
+                values = actual if isinstance(actual, list) else [actual]
+                if not any(v in expected for v in values) and not (actual is _MISSING and None in expected):
+                    return False
+            elif op == "$nin":
+                values = actual if isinstance(actual, list) else [actual]
+                if any(v in expected for v in values):
+                    return False
+            elif op == "$exists":
+                if (actual is not _MISSING) != bool(expected):
+                    return False
+            elif op == "$regex":
+                flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+                if not isinstance(actual, str) or not re.search(expected, actual, flags):
+                    return False
+            elif op == "$all":
+                if not isinstance(actual, list) or not all(v in actual for v in expected):
+                    return False
+            elif op == "$size":
+                if not isinstance(actual, list) or len(actual) != expected:
+                    return False
+            elif op == "$type":
+                names = {"string": str, "date": datetime, "number": (int, float), "objectId": ObjectId}
+                if not isinstance(actual, names.get(expected, object)):
+                    return False
+            elif op == "$elemMatch":
+                if not isinstance(actual, list) or not any(matches(v, expected) for v in actual):
+                    return False
+            else:
+                raise NotImplementedError(f"fake_db does not support {op}")
+        return True
+    if actual is _MISSING:
+        return condition is None
+    if isinstance(actual, list) and not isinstance(condition, list):
+        return condition in actual
+    return actual == condition
+
+
+def matches(doc, query):
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$expr":
+            if not evaluate(doc, condition):
+                return False
+        elif not _match_value(get_path(doc, key), condition):
+            return False
+    return True
+
+
+def evaluate(doc, expr, variables=None):
+    """Evaluate the aggregation expressions the server uses"""
+    variables = variables or {}
+    if isinstance(expr, str) and expr.startswith("$$"):
+        name, _, path = expr[2:].partition(".")
+        value = doc if name == "ROOT" else variables.get(name)
+        return get_path(value, path) if path else value
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = get_path(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, list):
+        return [evaluate(doc, e, variables) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) == 1:
+        op, args = next(iter(expr.items()))
+        if op.startswith("$"):
+            return _operator(doc, op, args, variables)
+    return {k: evaluate(doc, v, variables) for k, v in expr.items()}
+
+
+def _operator(doc, op, args, variables):
+    ev = lambda e: evaluate(doc, e, variables)  # noqa: E731
+    if op == "$literal":
+        return args
+    if op == "$cond":
+        if isinstance(args, dict):
+            args = [args["if"], args["then"], args["else"]]
+        return ev(args[1]) if ev(args[0]) else ev(args[2])
+    if op == "$switch":
+        for branch in args["branches"]:
+            if ev(branch["case"]):
+                return ev(branch["then"])
+        return ev(args.get("default"))
+    if op in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+        a, b = ev(args[0]), ev(args[1])
+        if op == "$eq":
+            return a == b
+        if op == "$ne":
+            return a != b
+        return _compare(op, a, b)
+    if op == "$and":
+        return all(ev(a) for a in args)
+    if op == "$or":
+        return any(ev(a) for a in args)
+    if op == "$not":
+        return not ev(args[0] if isinstance(args, list) else args)
+    if op == "$in":
+        return ev(args[0]) in (ev(args[1]) or [])
+    if op == "$ifNull":
+        value = ev(args[0])
+        return ev(args[1]) if value is None else value
+    if op == "$add":
+        return sum(ev(a) or 0 for a in args)
+    if op == "$subtract":
+        return (ev(args[0]) or 0) - (ev(args[1]) or 0)
+    if op == "$multiply":
+        result = 1
+        for a in args:
+            result *= ev(a) or 0
+        return result
+    if op == "$size":
+        return len(ev(args) or [])
+    if op == "$setIntersection":
+        first, *rest = [ev(a) or [] for a in args]
+        return [v for v in dict.fromkeys(first) if all(v in r for r in rest)]
+    if op == "$arrayElemAt":
+        values, index = ev(args[0]) or [], ev(args[1])
+        return values[index] if -len(values) <= index < len(values) else None
+    if op == "$first":
+        values = ev(args) or []
+        return values[0] if values else None
+    if op == "$concat":
+        parts = [ev(a) for a in args]
+        return None if any(part is None for part in parts) else "".join(parts)
+    if op == "$toLower":
+        return (ev(args) or "").lower()
+    if op == "$min":
+        values = [v for v in (ev(a) for a in args) if v is not None]
+        return min(values) if values else None
+    if op == "$max":
+        values = [v for v in (ev(a) for a in args) if v is not None]
+        return max(values) if values else None
+    raise NotImplementedError(f"fake_db does not support expression {op}")
+
+
+def project(doc, projection):
+    if not projection:
+        return doc
+    slices = {k: v["$slice"] for k, v in projection.items() if isinstance(v, dict) and "$slice" in v}
+    if slices:
+        for key, n in slices.items():
+            value = get_path(doc, key)
+            if isinstance(value, list):
+                set_path(doc, key, value[n:] if n < 0 else value[:n])
+        projection = {k: (1 if k in slices else v) for k, v in projection.items()}
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        result = {}
+        for key in include:
+            value = projection[key]
+            if isinstance(value, (str, dict)) and value not in (1, True):
+                result[key] = evaluate(doc, value)
+            else:
+                actual = get_path(doc, key)
+                if actual is not _MISSING:
+                    set_path(result, key, actual)
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    result = copy.copy(doc)
+    for key, value in projection.items():
+        if not value:
+            unset_path(result, key)
+    return result
+
+
+def _sort_spec(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return list(key_or_list)
+
+
+def sort_docs(docs, spec):
+    for key, direction in reversed(spec):
+        docs.sort(key=lambda d: _sort_key(get_path(d, key)), reverse=direction < 0)
+    return docs
+
+
+class Result:
+    def __init__(self, **kwargs):
+        self.inserted_id = None
+        self.inserted_ids = []
+        self.matched_count = 0
+        self.modified_count = 0
+        self.upserted_id = None
+        self.deleted_count = 0
+        self.__dict__.update(kwargs)
+
+
+def server_side(results):
+    """Charge the time a read takes to the fake server instead of the caller"""
+    @functools.wraps(results)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return results(self, *args, **kwargs)
+        finally:
+            self._collection.database.server_seconds += time.perf_counter() - started
+    return wrapper
+
+
+class FakeCursor:
+    def __init__(self, collection, query, projection):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = _sort_spec(key_or_list, direction)
+        return self
+
+    def skip(self, n):
+        self._skip = n
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    @server_side
+    def _results(self, length=None):
+        self._collection.database.round_trips += 1
+        docs = [d for d in self._collection.docs if matches(d, self._query)]
+        sort_docs(docs, self._sort)
+        docs = docs[self._skip:]
+        limit = min(x for x in (self._limit, length) if x) if (self._limit or length) else None
+        if limit:
+            docs = docs[:limit]
+        return [project(copy.deepcopy(d), self._projection) for d in docs]
+
+    async def to_list(self, length=None):
+        return self._results(length)
+
+    def __aiter__(self):
+        self._iter = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeAggregateCursor:
+    def __init__(self, collection, pipeline):
+        self._collection = collection
+        self._pipeline = pipeline
+
+    @server_side
+    def _results(self):
+        self._collection.database.round_trips += 1
+        docs = [copy.deepcopy(d) for d in self._collection.docs]
+        return run_pipeline(self._collection.database, docs, self._pipeline)
+
+    async def to_list(self, length=None):
+        docs = self._results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        self._iter = iter(self._results())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _accumulate(op, values):
+    values = [v for v in values if v is not _MISSING]
+    if op == "$sum":
+        return sum(v for v in values if isinstance(v, (int, float)))
+    if op == "$avg":
+        numbers = [v for v in values if isinstance(v, (int, float))]
+        return sum(numbers) / len(numbers) if numbers else None
+    if op == "$first":
+        return values[0] if values else None
+    if op == "$last":
+        return values[-1] if values else None
+    if op == "$max":
+        present = [v for v in values if v is not None]
+        return max(present, key=_sort_key) if present else None
+    if op == "$min":
+        present = [v for v in values if v is not None]
+        return min(present, key=_sort_key) if present else None
+    if op == "$push":
+        return values
+    if op == "$addToSet":
+        return list({repr(v): v for v in values}.values())
+    raise NotImplementedError(f"fake_db does not support accumulator {op}")
+
+
+def run_pipeline(database, docs, pipeline, variables=None):
+    for stage in pipeline:
+        name, spec = next(iter(stage.items()))
+        if name == "$match":
+            docs = [d for d in docs if matches(d, _bind(spec, variables))]
+        elif name == "$geoNear":
+            lon, lat = spec["near"]["coordinates"]
+            max_km = spec.get("maxDistance", float("inf")) / 1000
+            near = []
+            for d in docs:
+                point = get_path(d, spec["key"])
+                if point is _MISSING or not matches(d, spec.get("query", {})):
+                    continue
+                km = haversine_km(lon, lat, *point["coordinates"])
+                if km <= max_km:
+                    set_path(d, spec["distanceField"], km * 1000 * spec.get("distanceMultiplier", 1))
+                    near.append((km, d))
+            docs = [d for _, d in sorted(near, key=lambda pair: pair[0])]
+        elif name == "$sort":
+            docs = sort_docs(docs, _sort_spec(spec))
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$project":
+            docs = [project(d, spec) for d in docs]
+        elif name in ("$addFields", "$set"):
+            for d in docs:
+                for key, expr in spec.items():
+                    set_path(d, key, evaluate(d, expr, variables))
+        elif name == "$unset":
+            for d in docs:
+                for key in ([spec] if isinstance(spec, str) else spec):
+                    unset_path(d, key)
+        elif name == "$unwind":
+            path = spec if isinstance(spec, str) else spec["path"]
+            keep_empty = isinstance(spec, dict) and spec.get("preserveNullAndEmptyArrays")
+            unwound = []
+            for d in docs:
+                values = get_path(d, path[1:])
+                if isinstance(values, list) and values:
+                    for v in values:
+                        item = copy.copy(d)
+                        set_path(item, path[1:], v)
+                        unwound.append(item)
+                elif values not in (_MISSING, None, []) and not isinstance(values, list):
+                    unwound.append(d)
+                elif keep_empty:
+                    item = copy.copy(d)
+                    unset_path(item, path[1:])
+                    unwound.append(item)
+            docs = unwound
+        elif name == "$group":
+            groups = {}
+            for d in docs:
+                key = evaluate(d, spec["_id"], variables)
+                groups.setdefault(repr(key), (key, []))[1].append(d)
+            docs = []
+            for key, members in groups.values():
+                out = {"_id": key}
+                for field, acc in spec.items():
+                    if field == "_id":
+                        continue
+                    op, expr = next(iter(acc.items()))
+                    out[field] = _accumulate(op, [evaluate(m, expr, variables) for m in members])
+                docs.append(out)
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif name == "$facet":
+            docs = [{key: run_pipeline(database, [copy.deepcopy(d) for d in docs], sub, variables)
+                     for key, sub in spec.items()}]
+        elif name == "$lookup":
+            # Joins run server-side, so no extra round trip is counted
+            foreign = database[spec["from"]].docs
+            by_key = {}
+            if "localField" in spec:
+                # Stands in for the index on foreignField, so the join cost stays linear
+                for f in foreign:
+                    key = get_path(f, spec["foreignField"])
+                    for k in (key if isinstance(key, list) else [key]):
+                        if not isinstance(k, dict):
+                            by_key.setdefault(k, []).append(f)
+            for d in docs:
+                candidates = foreign
+                if "localField" in spec:
+                    local = get_path(d, spec["localField"])
+                    local_values = local if isinstance(local, list) else [local]
+                    candidates = [f for v in local_values if not isinstance(v, dict) for f in by_key.get(v, [])]
+                candidates = [copy.deepcopy(f) for f in candidates]
+                if "pipeline" in spec:
+                    let = {k: evaluate(d, v, variables) for k, v in spec.get("let", {}).items()}
+                    candidates = run_pipeline(database, candidates, spec["pipeline"], let)
+                d[spec["as"]] = candidates
+        elif name == "$bucket":
+            boundaries = spec["boundaries"]
+            buckets = {}
+            for d in docs:
+                value = evaluate(d, spec["groupBy"], variables)
+                label = spec.get("default")
+                if isinstance(value, (int, float)):
+                    for low, high in zip(boundaries, boundaries[1:]):
+                        if low <= value < high:
+                            label = low
+                            break
+                if label is None:
+                    continue
+                buckets.setdefault(label, []).append(d)
+            output = spec.get("output", {"count": {"$sum": 1}})
+            docs = []
+            for label, members in buckets.items():
+                out = {"_id": label}
+                for field, acc in output.items():
+                    op, expr = next(iter(acc.items()))
+                    out[field] = _accumulate(op, [evaluate(m, expr, variables) for m in members])
+                docs.append(out)
+        elif name == "$sortByCount":
+            counts = defaultdict(int)
+            for d in docs:
+                counts[evaluate(d, spec, variables)] += 1
+            docs = sorted(({"_id": k, "count": v} for k, v in counts.items()), key=lambda x: -x["count"])
+        else:
+            raise NotImplementedError(f"fake_db does not support stage {name}")
+    return docs
+
+
+def _bind(query, variables):
+    """Resolve $$var references inside a $match that uses $expr"""
+    if not variables or "$expr" not in query:
+        return query
+    bound = dict(query)
+    bound["$expr"] = _substitute(query["$expr"], variables)
+    return bound
+
+
+def _substitute(expr, variables):
+    if isinstance(expr, str) and expr.startswith("$$") and expr[2:].split(".")[0] in variables:
+        name, _, path = expr[2:].partition(".")
+        value = variables[name]
+        return {"$literal": get_path(value, path) if path else value}
+    if isinstance(expr, list):
+        return [_substitute(e, variables) for e in expr]
+    if isinstance(expr, dict):
+        return {k: _substitute(v, variables) for k, v in expr.items()}
+    return expr
+
+
+def _set_filtered(doc, key, value, array_filters):
+    """$set through one `$[name]` array filter, e.g. "messages.$[m].read" """
+    head, rest = key.split(".$[", 1)
+    name, tail = rest.split("].", 1)
+    conditions = {}
+    for spec in array_filters or []:
+        for path, condition in spec.items():
+            if path.split(".")[0] == name:
+                conditions[path.split(".", 1)[1]] = condition
+    for element in get_path(doc, head) or []:
+        if matches(element, conditions):
+            set_path(element, tail, value)
+
+
+def apply_update(doc, update, inserting=False, array_filters=None):
+    if isinstance(update, list):
+        for stage in update:
+            name, spec = next(iter(stage.items()))
+            if name in ("$set", "$addFields"):
+                computed = {k: evaluate(doc, v) for k, v in spec.items()}
+                for key, value in computed.items():
+                    set_path(doc, key, value)
+            elif name == "$unset":
+                for key in ([spec] if isinstance(spec, str) else spec):
+                    unset_path(doc, key)
+        return
+    for op, fields in update.items():
+        for key, value in fields.items():
+            current = get_path(doc, key)
+            if op == "$set" and ".$[" in key:
+                _set_filtered(doc, key, value, array_filters)
+            elif op == "$set":
+                set_path(doc, key, value)
+            elif op == "$setOnInsert":
+                if inserting:
+                    set_path(doc, key, value)
+            elif op == "$unset":
+                unset_path(doc, key)
+            elif op == "$inc":
+                set_path(doc, key, (0 if current is _MISSING else current) + value)
+            elif op == "$min":
+                if current is _MISSING or value < current:
+                    set_path(doc, key, value)
+            elif op == "$max":
+                if current is _MISSING or value > current:
+                    set_path(doc, key, value)
+            elif op == "$push":
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                set_path(doc, key, ([] if current is _MISSING else current) + list(items))
+            elif op == "$addToSet":
+                existing = [] if current is _MISSING else current
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                set_path(doc, key, existing + [i for i in items if i not in existing])
+            elif op == "$pull":
+                if current is not _MISSING:
+                    set_path(doc, key, [v for v in current if not _match_value(v, value)])
+            else:
+                raise NotImplementedError(f"fake_db does not support update {op}")
+
+
+class FakeCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        self.docs = []
+        self.unique_keys = []
+
+    def _check_unique(self, doc, ignore=None):
+        for keys in [["_id"]] + self.unique_keys:
+            values = tuple(get_path(doc, k) for k in keys)
+            for other in self.docs:
+                if other is not ignore and other is not doc and tuple(get_path(other, k) for k in keys) == values:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name}")
+
+    def _upsert_seed(self, query):
+        return {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+
+    def find(self, query=None, projection=None):
+        return FakeCursor(self, query or {}, projection)
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        cursor = FakeCursor(self, query or {}, projection)
+        if sort:
+            cursor.sort(sort)
+        results = cursor.limit(1)._results()
+        return results[0] if results else None
+
+    async def insert_one(self, doc):
+        self.database.round_trips += 1
+        doc.setdefault("_id", ObjectId())
+        self._check_unique(doc)
+        self.docs.append(copy.deepcopy(doc))
+        return Result(inserted_id=doc["_id"])
+
+    async def insert_many(self, docs, ordered=True):
+        self.database.round_trips += 1
+        ids = []
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+            self._check_unique(doc)
+            self.docs.append(copy.deepcopy(doc))
+            ids.append(doc["_id"])
+        return Result(inserted_ids=ids)
+
+    async def _update(self, query, update, upsert, many, array_filters=None):
+        self.database.round_trips += 1
+        matched = [d for d in self.docs if matches(d, query)]
+        if not many:
+            matched = matched[:1]
+        for doc in matched:
+            apply_update(doc, update, array_filters=array_filters)
+        if not matched and upsert:
+            doc = self._upsert_seed(query)
+            doc.setdefault("_id", ObjectId())
+            apply_update(doc, update, inserting=True)
+            self._check_unique(doc)
+            self.docs.append(doc)
+            return Result(upserted_id=doc["_id"])
+        return Result(matched_count=len(matched), modified_count=len(matched))
+
+    async def update_one(self, query, update, upsert=False, array_filters=None):
+        return await self._update(query, update, upsert, False, array_filters)
+
+    async def update_many(self, query, update, upsert=False, array_filters=None):
+        return await self._update(query, update, upsert, True, array_filters)
+
+    async def find_one_and_update(self, query, update, projection=None, sort=None, upsert=False,
+                                  return_document=ReturnDocument.BEFORE):
+        self.database.round_trips += 1
+        matched = [d for d in self.docs if matches(d, query)]
+        if sort:
+            sort_docs(matched, _sort_spec(sort))
+        if not matched:
+            if not upsert:
+                return None
+            doc = self._upsert_seed(query)
+            doc.setdefault("_id", ObjectId())
+            apply_update(doc, update, inserting=True)
+            self._check_unique(doc)
+            self.docs.append(doc)
+            return project(copy.deepcopy(doc), projection) if return_document == ReturnDocument.AFTER else None
+        doc = matched[0]
+        before = copy.deepcopy(doc)
+        apply_update(doc, update)
+        return project(copy.deepcopy(doc) if return_document == ReturnDocument.AFTER else before, projection)
+
+    async def find_one_and_delete(self, query, projection=None, sort=None):
+        self.database.round_trips += 1
+        matched = [d for d in self.docs if matches(d, query)]
+        if sort:
+            sort_docs(matched, _sort_spec(sort))
+        if not matched:
+            return None
+        self.docs.remove(matched[0])
+        return project(matched[0], projection)
+
+    async def delete_one(self, query):
+        self.database.round_trips += 1
+        for doc in self.docs:
+            if matches(doc, query):
+                self.docs.remove(doc)
+                return Result(deleted_count=1)
+        return Result(deleted_count=0)
+
+    async def delete_many(self, query):
+        self.database.round_trips += 1
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not matches(d, query)]
+        return Result(deleted_count=before - len(self.docs))
+
+    async def count_documents(self, query, **kwargs):
+        self.database.round_trips += 1
+        return sum(1 for d in self.docs if matches(d, query))
+
+    async def estimated_document_count(self):
+        self.database.round_trips += 1
+        return len(self.docs)
+
+    def aggregate(self, pipeline, **kwargs):
+        return FakeAggregateCursor(self, pipeline)
+
+    async def create_index(self, keys, unique=False, **kwargs):
+        self.database.round_trips += 1
+        if unique:
+            self.unique_keys.append([k if isinstance(k, str) else k[0] for k in keys] if isinstance(keys, list) else [keys])
+        return "fake_index"
+
+    def with_options(self, **kwargs):
+        return self
+
+
+class FakeDatabase:
+    def __init__(self):
+        self._collections = {}
+        self.round_trips = 0
+        self.server_seconds = 0.0
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name, **kwargs):
+        return self[name]
+
+    async def command(self, *args, **kwargs):
+        self.round_trips += 1
+        return {"ok": 1}
+
+    async def create_collection(self, name, **kwargs):
+        self.round_trips += 1
+        return self[name]
+
+    async def list_collection_names(self):
+        return list(self._collections)
+
+
+# ============ PYMONGO ============
+
+def _resolve(coroutine):
+    """Result of a fake call; they never wait on anything, so one step finishes them"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("fake_db call suspended")
+
+
+class SyncFakeCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, key_or_list, direction=None):
+        self._cursor.sort(key_or_list, direction)
+        return self
+
+    def skip(self, n):
+        self._cursor.skip(n)
+        return self
+
+    def limit(self, n):
+        self._cursor.limit(n)
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor._results())
+
+
+class SyncFakeCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+        return lambda *args, **kwargs: _resolve(method(*args, **kwargs))
+
+    def find(self, query=None, projection=None):
+        return SyncFakeCursor(self.collection.find(query, projection))
+
+    def aggregate(self, pipeline, **kwargs):
+        return iter(self.collection.aggregate(pipeline)._results())
+
+    def bulk_write(self, operations, ordered=True):
+        modified = 0
+        for operation in operations:
+            if not isinstance(operation, UpdateOne):
+                raise NotImplementedError(f"fake_db does not support bulk {type(operation).__name__}")
+            result = _resolve(self.collection.update_one(
+                operation._filter, operation._doc, upsert=operation._upsert, array_filters=operation._array_filters
+            ))
+            modified += result.modified_count
+        return Result(modified_count=modified)
+
+
+class SyncFakeDatabase:
+    def __init__(self, database=None):
+        self.database = database or FakeDatabase()
+
+    def __getitem__(self, name):
+        return SyncFakeCollection(self.database[name])
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def list_collection_names(self):
+        return _resolve(self.database.list_collection_names())
+
+    def command(self, *args, **kwargs):
+        return _resolve(self.database.command(*args, **kwargs))
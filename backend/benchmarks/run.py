@@ -0,0 +1,370 @@
+"""Micro-benchmarks for the backend hot paths.
+
+Each benchmark isolates one function from server.py and runs it against the
+in-memory FakeDatabase, so results reflect Python CPU cost plus the number of
+round trips a handler would make, not network or mongod noise. The "app"
+column leaves out the time the fake spends evaluating queries, which is the
+handler's own CPU cost per request.
+
+    python benchmarks/run.py                  # run and compare with the last saved run
+    python benchmarks/run.py --save           # append results to test_reports/benchmarks.json
+    python benchmarks/run.py --check          # exit 1 if any benchmark regressed past its threshold
+    python benchmarks/run.py -k jobs          # only benchmarks whose name contains "jobs"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+BENCH_DIR = Path(__file__).parent
+BACKEND_DIR = BENCH_DIR.parent
+HISTORY_FILE = BACKEND_DIR.parent / "test_reports" / "benchmarks.json"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "naya_job_bench")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-only-secret-key-0123456789abcdef")
+os.environ.setdefault("SLOW_QUERY_LOG_ENABLED", "false")
+
+import jwt  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import server  # noqa: E402
+from auth_tokens import RevocationList, TokenIssuer  # noqa: E402
+from benchmarks.fake_db import FakeDatabase  # noqa: E402
+from message_store import (  # noqa: E402
+    MESSAGE_BUCKET_DAYS, MESSAGE_BUCKET_SIZE, BucketMessageStore, DocumentMessageStore, pair_key,
+)
+from migrate_messages import pair_buckets  # noqa: E402
+from seed_data import Generator  # noqa: E402
+
+DEFAULT_THRESHOLD = 0.25
+BENCHMARKS = []
+
+
+def benchmark(name, number=200, rounds=7, threshold=DEFAULT_THRESHOLD):
+    """Register a setup function that returns the callable (sync or async) to time"""
+    def decorator(setup):
+        BENCHMARKS.append(SimpleNamespace(name=name, setup=setup, number=number, rounds=rounds, threshold=threshold))
+        return setup
+    return decorator
+
+
+# ============ FIXTURES ============
+
+def build_fixtures(jobs=1000, applicants=100):
+    """Populate a FakeDatabase with seed_data documents and point server.db at it"""
+    db = FakeDatabase()
+    gen = Generator(seed=7, users=applicants * 2, jobs=jobs, applications_per_seeker=0,
+                    messages_per_thread=0, chat_share=0)
+    seekers = []
+    for i in range(gen.seekers):
+        user, profile = gen.seeker_docs(i)
+        db.users.docs.append(user)
+        db.job_seeker_profiles.docs.append(profile)
+        seekers.append(user)
+    recruiter, recruiter_profile = gen.recruiter_docs(0)
+    db.users.docs.append(recruiter)
+    db.recruiter_profiles.docs.append(recruiter_profile)
+    for j in range(jobs):
+        job = gen.job_doc(j)
+        job["status"] = "approved"
+        db.jobs.docs.append(job)
+
+    hot_job = db.jobs.docs[0]
+    hot_job["recruiter_id"] = recruiter["user_id"]
+    for n, seeker in enumerate(seekers[:applicants]):
+        db.applications.docs.append({
+            "application_id": f"app_bench{n:07d}",
+            "job_id": hot_job["job_id"],
+            "job_seeker_id": seeker["user_id"],
+            "recruiter_id": recruiter["user_id"],
+            "status": "pending",
+            "cover_letter": "I would like to apply",
+            "resume_url": None,
+            "applied_at": seeker["created_at"],
+            "updated_at": seeker["created_at"],
+        })
+
+    server.db = db
+    token = lambda user: jwt.encode({"user_id": user["user_id"]}, server.JWT_SECRET, algorithm=server.JWT_ALGORITHM)  # noqa: E731
+    return SimpleNamespace(
+        db=db, seeker=seekers[0], recruiter=recruiter, hot_job=hot_job,
+        seeker_token=token(seekers[0]), recruiter_token=token(recruiter),
+        profile=db.job_seeker_profiles.docs[0],
+    )
+
+
+def fake_request():
+    return SimpleNamespace(headers={})
+
+
+# ============ BENCHMARKS ============
+
+@benchmark("auth.get_current_user", number=500)
+def bench_get_current_user():
+    fx = build_fixtures(jobs=10, applicants=50)
+    request = fake_request()
+    return lambda: server.get_current_user(request, fx.seeker_token)
+
+
+@benchmark("auth.get_current_user_stateless", number=500)
+def bench_get_current_user_stateless():
+    fx = build_fixtures(jobs=10, applicants=50)
+    server.revocations = RevocationList(fx.db)
+    token = TokenIssuer(server.JWT_SECRET, server.JWT_ALGORITHM, mode="stateless").access_token(fx.recruiter)
+    request = fake_request()
+    return lambda: server.get_current_recruiter(request, token)
+
+
+@benchmark("jobs.build_job_query", number=20000)
+def bench_build_job_query():
+    return lambda: server.build_job_query("approved", "Pune", "full_time", "Python, React, SQL", 400000)
+
+
+@benchmark("jobs.get_jobs_handler", number=50)
+def bench_get_jobs():
+    build_fixtures()
+    return lambda: server.get_jobs(status="approved", location="Pune", job_type=None, skills="Python,SQL", salary_min=None)
+
+
+@benchmark("jobs.get_job_burst_200", number=20)
+def bench_get_job_burst():
+    fx = build_fixtures()
+    job_id = fx.hot_job["job_id"]
+    async def burst():
+        # 200 concurrent reads of one job, as when it goes viral; coalesced into one query
+        await asyncio.gather(*[server.get_job(job_id) for _ in range(200)])
+    return burst
+
+
+@benchmark("jobs.get_jobs_facets_cached", number=50)
+def bench_get_jobs_facets():
+    build_fixtures()
+    server.job_facets.clear()
+    # The first call fills the facet cache; timed calls only fetch the result page
+    return lambda: server.get_jobs(status="approved", location=None, job_type="full_time", skills=None, salary_min=None,
+                                   facets=True)
+
+
+@benchmark("jobs.suggest_uncached", number=2000)
+def bench_suggest():
+    fx = build_fixtures(jobs=5000)
+    server.job_typeahead.build(fx.db.jobs.docs)
+    prefixes = ["s", "py", "eng", "data", "sa", "man", "de", "re"]
+
+    def suggest():
+        # Clear the memo so every call does the bisect and ranking work
+        server.job_typeahead._memo.clear()
+        for prefix in prefixes:
+            server.job_typeahead.suggest(prefix)
+    return suggest
+
+
+@benchmark("talent.search_ranked_10k", number=100)
+def bench_talent_search():
+    fx = build_fixtures(jobs=10, applicants=5000)
+    server.talent_index.build(fx.db.job_seeker_profiles.docs)
+    request = fake_request()
+    # Ranked against the recruiter's job over 10k profiles, filtered by experience
+    return lambda: server.search_talent(request, min_experience=1, job_id=fx.hot_job["job_id"],
+                                        session_token=fx.recruiter_token)
+
+
+@benchmark("recommendations.skill_overlap_fallback", number=500)
+def bench_skill_overlap():
+    fx = build_fixtures(jobs=100)
+    jobs = fx.db.jobs.docs[:100]
+    profile = dict(fx.profile, skills=["Python", "SQL", "React", "AWS", "Docker"])
+    return lambda: server.rank_jobs_by_skill_overlap(profile, jobs)
+
+
+@benchmark("applications.get_job_applications", number=50)
+def bench_get_job_applications():
+    fx = build_fixtures(jobs=50, applicants=100)
+    request = fake_request()
+    return lambda: server.get_job_applications(fx.hot_job["job_id"], request, fx.recruiter_token)
+
+
+@benchmark("applications.get_job_applications_fit_10k", number=50)
+def bench_get_job_applications_fit():
+    fx = build_fixtures(jobs=10, applicants=10000)
+    server.talent_index.build(fx.db.job_seeker_profiles.docs)
+    server.applicant_rankings.clear()
+    request = fake_request()
+    # The first call scores all 10k applicants; timed calls check the cached ranking and fetch one page
+    return lambda: server.get_job_applications(fx.hot_job["job_id"], request, fx.recruiter_token, limit=20,
+                                               sort="fit", min_score=0.3)
+
+
+@benchmark("applications.get_my_applications", number=50)
+def bench_get_my_applications():
+    fx = build_fixtures(jobs=100, applicants=10)
+    for n, job in enumerate(fx.db.jobs.docs[1:51]):
+        fx.db.applications.docs.append({
+            "application_id": f"app_mine{n:07d}",
+            "job_id": job["job_id"],
+            "job_seeker_id": fx.seeker["user_id"],
+            "recruiter_id": job["recruiter_id"],
+            "status": "pending",
+            "cover_letter": None,
+            "resume_url": None,
+            "applied_at": job["posted_at"],
+            "updated_at": job["posted_at"],
+        })
+    request = fake_request()
+    return lambda: server.get_my_applications(request, fx.seeker_token)
+
+
+def thread_fixtures(store_class, messages=1000):
+    """A long, fully read thread between the fixture seeker and recruiter"""
+    fx = build_fixtures(jobs=10, applicants=10)
+    seeker, recruiter = fx.seeker["user_id"], fx.recruiter["user_id"]
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    thread = [{
+        "message_id": f"msg_bench{n:07d}",
+        "sender_id": seeker if n % 2 else recruiter,
+        "receiver_id": recruiter if n % 2 else seeker,
+        "content": "Thanks, when would suit you for a call?",
+        "application_id": None,
+        "created_at": started + timedelta(minutes=n),
+        "read": True,
+    } for n in range(messages)]
+    if store_class is BucketMessageStore:
+        fx.db.message_buckets.docs.extend(pair_buckets(pair_key(seeker, recruiter), thread, MESSAGE_BUCKET_SIZE, MESSAGE_BUCKET_DAYS))
+    else:
+        fx.db.messages.docs.extend(thread)
+    server.message_store = store_class(fx.db)
+    return lambda: server.get_conversation(recruiter, fake_request(), fx.seeker_token)
+
+
+@benchmark("messages.get_conversation_documents", number=50)
+def bench_conversation_documents():
+    return thread_fixtures(DocumentMessageStore)
+
+
+@benchmark("messages.get_conversation_buckets", number=50)
+def bench_conversation_buckets():
+    return thread_fixtures(BucketMessageStore)
+
+
+@benchmark("encoding.jobs_payload_100", number=200)
+def bench_encode_jobs():
+    fx = build_fixtures(jobs=100)
+    jobs = [{k: v for k, v in job.items() if k != "_id"} for job in fx.db.jobs.docs[:100]]
+    return lambda: JSONResponse(content=jsonable_encoder(jobs)).body
+
+
+@benchmark("auth.bcrypt_verify", number=3, rounds=3, threshold=0.5)
+def bench_bcrypt_verify():
+    hashed = server.pwd_context.hash("BenchPassword123!")
+    return lambda: server.pwd_context.verify("BenchPassword123!", hashed)
+
+
+# ============ RUNNER ============
+
+def measure(bench, loop):
+    fn = bench.setup()
+    is_async = asyncio.iscoroutine(probe := fn())
+    if is_async:
+        loop.run_until_complete(probe)
+
+    async def run_async(n):
+        for _ in range(n):
+            await fn()
+
+    db = server.db if isinstance(server.db, FakeDatabase) else None
+    timings, app_timings = [], []
+    trips_before = db.round_trips if db else 0
+    for _ in range(bench.rounds):
+        server_before = db.server_seconds if db else 0.0
+        start = time.perf_counter()
+        if is_async:
+            loop.run_until_complete(run_async(bench.number))
+        else:
+            for _ in range(bench.number):
+                fn()
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed / bench.number)
+        # What is left once the fake server's query evaluation is taken out
+        app_timings.append((elapsed - ((db.server_seconds - server_before) if db else 0.0)) / bench.number)
+    calls = bench.rounds * bench.number
+    return {
+        "median_us": round(statistics.median(timings) * 1e6, 3),
+        "min_us": round(min(timings) * 1e6, 3),
+        "app_median_us": round(statistics.median(app_timings) * 1e6, 3),
+        "round_trips_per_call": round((db.round_trips - trips_before) / calls, 2) if db else 0,
+        "threshold": bench.threshold,
+    }
+
+
+def load_history():
+    if HISTORY_FILE.exists():
+        return json.loads(HISTORY_FILE.read_text())
+    return {"runs": []}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="keyword", help="only run benchmarks whose name contains this")
+    parser.add_argument("--save", action="store_true", help="append results to the history file")
+    parser.add_argument("--check", action="store_true", help="exit non-zero on regressions")
+    parser.add_argument("--baseline", help="commit to compare against (default: last saved run)")
+    args = parser.parse_args()
+
+    history = load_history()
+    runs = history["runs"]
+    baseline = next((r for r in reversed(runs) if r["commit"] == args.baseline), None) if args.baseline else (runs[-1] if runs else None)
+
+    loop = asyncio.new_event_loop()
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<42} {'median':>12} {'min':>12} {'app':>12} {'trips':>6}  vs baseline")
+    for bench in BENCHMARKS:
+        if args.keyword and args.keyword not in bench.name:
+            continue
+        result = measure(bench, loop)
+        results[bench.name] = result
+        line = (f"{bench.name:<42} {result['median_us']:>10.1f}us {result['min_us']:>10.1f}us "
+                f"{result['app_median_us']:>10.1f}us {result['round_trips_per_call']:>6}")
+        previous = (baseline or {}).get("results", {}).get(bench.name)
+        if previous:
+            change = (result["median_us"] - previous["median_us"]) / previous["median_us"]
+            line += f"  {change:+.1%}"
+            if change > bench.threshold:
+                line += "  REGRESSION"
+                regressions.append(bench.name)
+        print(line)
+    loop.close()
+
+    if args.save:
+        runs.append({"commit": git_commit(), "timestamp": datetime.now(timezone.utc).isoformat(),
+                     "python": sys.version.split()[0], "results": results})
+        HISTORY_FILE.parent.mkdir(exist_ok=True)
+        HISTORY_FILE.write_text(json.dumps(history, indent=2))
+        print(f"\nSaved to {HISTORY_FILE}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) past threshold: {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""Business IDs stored as `_id`.
+
+By default every document carries an ObjectId `_id` next to its string
+business key (`user_id`, `job_id`, ...). Collections listed in
+BUSINESS_ID_COLLECTIONS store the business key as `_id` instead, which drops
+the duplicated field and the second unique index, and lets lookups by key
+use the `_id` index.
+
+Handlers keep using the public field name. `KeyedCollection` rewrites
+filters, projections, sorts, inserts and pipelines on the way in, and
+renames `_id` back to the key on the way out. Aggregations get the key back
+through an `$addFields` stage placed right after their leading
+match/sort/limit stages, and `$lookup`s into keyed collections join on `_id`.
+
+Filters are rewritten where the key is a top-level field (also inside
+$or/$and/$nor) and where `$<key>` is a path inside $expr. A key nested in
+anything else, such as $where or $text, is left alone. Collection methods
+that take documents or pipelines KeyedCollection cannot rewrite (bulk_write,
+watch, ...) raise instead of silently matching nothing.
+
+Existing collections are converted with migrate_business_ids.py.
+"""
+
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BUSINESS_KEYS = {
+    "users": "user_id",
+    "jobs": "job_id",
+    "applications": "application_id",
+    "messages": "message_id",
+}
+
+
+def keyed_collections(setting: str) -> Dict[str, str]:
+    names = [name.strip() for name in setting.split(",") if name.strip()]
+    for name in names:
+        if name not in BUSINESS_KEYS:
+            logger.warning(f"BUSINESS_ID_COLLECTIONS: {name} has no business key, ignoring it")
+    return {name: BUSINESS_KEYS[name] for name in names if name in BUSINESS_KEYS}
+
+
+# Collection -> key field for collections whose `_id` is the business key
+KEYED_COLLECTIONS = keyed_collections(os.environ.get("BUSINESS_ID_COLLECTIONS", ""))
+
+# Leading stages that only read the collection's own fields, before the key is added back
+_PREFIX_STAGES = ("$geoNear", "$match", "$sort", "$skip", "$limit")
+# Motor collection methods whose arguments KeyedCollection does not rewrite
+_UNTRANSLATED = ("bulk_write", "watch", "create_indexes", "find_raw_batches", "aggregate_raw_batches")
+
+
+# ============ DOCUMENTS ============
+
+def to_stored(doc: dict, key: str) -> dict:
+    return {"_id": doc[key], **{k: v for k, v in doc.items() if k not in ("_id", key)}}
+
+
+def to_public(doc: Optional[dict], key: str) -> Optional[dict]:
+    if doc is None or "_id" not in doc:
+        return doc
+    return {key: doc["_id"], **{k: v for k, v in doc.items() if k != "_id"}}
+
+
+def public_document(collection: str, doc: Optional[dict]) -> Optional[dict]:
+    """`doc` as handlers expect it, for documents read outside KeyedCollection (change streams)"""
+    key = KEYED_COLLECTIONS.get(collection)
+    return to_public(doc, key) if key else doc
+
+
+# ============ QUERIES ============
+
+def translate_expression(expression, key: str):
+    """`expression` with every `$<key>` field path pointing at `$_id`"""
+    if isinstance(expression, str):
+        return "$_id" if expression == f"${key}" else expression
+    if isinstance(expression, list):
+        return [translate_expression(item, key) for item in expression]
+    if isinstance(expression, dict):
+        return {name: translate_expression(value, key) for name, value in expression.items()}
+    return expression
+
+
+def translate_filter(query: Optional[dict], key: str) -> Optional[dict]:
+    if not query:
+        return query
+    translated = {}
+    for field, condition in query.items():
+        if field == key:
+            translated["_id"] = condition
+        elif field in ("$or", "$and", "$nor"):
+            translated[field] = [translate_filter(q, key) for q in condition]
+        elif field == "$expr":
+            translated[field] = translate_expression(condition, key)
+        else:
+            translated[field] = condition
+    return translated
+
+
+def translate_projection(projection: Optional[dict], key: str) -> Optional[dict]:
+    """Return `_id` exactly when the key would have been returned"""
+    if projection is None:
+        return None
+    projection = dict(projection)
+    wanted = projection.pop(key, None)
+    projection.pop("_id", None)
+    if wanted or any(projection.values()):
+        # Inclusion: _id comes back unless excluded, so say which
+        projection["_id"] = 1 if wanted else 0
+    elif wanted is not None:
+        projection["_id"] = 0
+    return projection or None
+
+
+def translate_sort(key_or_list, direction, key: str):
+    if isinstance(key_or_list, str):
+        return ("_id" if key_or_list == key else key_or_list), direction
+    pairs = key_or_list.items() if isinstance(key_or_list, dict) else key_or_list
+    return [("_id" if field == key else field, order) for field, order in pairs], direction
+
+
+def translate_lookup(spec: dict, keyed: Dict[str, str]) -> dict:
+    foreign_key = keyed.get(spec.get("from"))
+    if not foreign_key:
+        return spec
+    spec = dict(spec)
+    if spec.get("foreignField") == foreign_key:
+        spec["foreignField"] = "_id"
+    spec["pipeline"] = [{"$addFields": {foreign_key: "$_id"}}, *translate_pipeline(spec.get("pipeline", []), None, keyed)]
+    return spec
+
+
+def translate_pipeline(pipeline: List[dict], key: Optional[str], keyed: Dict[str, str]) -> List[dict]:
+    translated, index = [], 0
+    if key:
+        while index < len(pipeline) and next(iter(pipeline[index])) in _PREFIX_STAGES:
+            name, spec = next(iter(pipeline[index].items()))
+            if name == "$match":
+                spec = translate_filter(spec, key)
+            elif name == "$sort":
+                spec = dict(translate_sort(spec, None, key)[0])
+            elif name == "$geoNear" and "query" in spec:
+                spec = {**spec, "query": translate_filter(spec["query"], key)}
+            translated.append({name: spec})
+            index += 1
+        translated.append({"$addFields": {key: "$_id"}})
+    for stage in pipeline[index:]:
+        name, spec = next(iter(stage.items()))
+        if name == "$lookup":
+            stage = {name: translate_lookup(spec, keyed)}
+        elif name == "$facet":
+            stage = {name: {facet: translate_pipeline(stages, None, keyed) for facet, stages in spec.items()}}
+        translated.append(stage)
+    return translated
+
+
+# ============ COLLECTIONS ============
+
+class KeyedCursor:
+    def __init__(self, cursor, key: str):
+        self._cursor = cursor
+        self._key = key
+
+    def sort(self, key_or_list, direction=None):
+        key_or_list, direction = translate_sort(key_or_list, direction, self._key)
+        self._cursor.sort(key_or_list, direction) if direction is not None else self._cursor.sort(key_or_list)
+        return self
+
+    def skip(self, n: int):
+        self._cursor.skip(n)
+        return self
+
+    def limit(self, n: int):
+        self._cursor.limit(n)
+        return self
+
+    async def to_list(self, length=None):
+        return [to_public(doc, self._key) for doc in await self._cursor.to_list(length)]
+
+    def __aiter__(self):
+        self._iterator = self._cursor.__aiter__()
+        return self
+
+    async def __anext__(self):
+        return to_public(await self._iterator.__anext__(), self._key)
+
+
+class KeyedCollection:
+    """A Motor collection seen through its business key.
+
+    With `key=None` only `$lookup`s into keyed collections are rewritten,
+    so every collection can be wrapped once any collection is keyed.
+    """
+
+    def __init__(self, collection, key: Optional[str], keyed: Dict[str, str]):
+        self._collection = collection
+        self._key = key
+        self._keyed = keyed
+
+    def __getattr__(self, name):
+        if self._key and name in _UNTRANSLATED:
+            raise NotImplementedError(f"{name} is not translated for {self._collection.name}, whose _id is {self._key}")
+        return getattr(self._collection, name)
+
+    def with_options(self, **kwargs):
+        return KeyedCollection(self._collection.with_options(**kwargs), self._key, self._keyed)
+
+    def _filter(self, query):
+        return translate_filter(query, self._key) if self._key else query
+
+    def _projection(self, projection):
+        return translate_projection(projection, self._key) if self._key else projection
+
+    def _public(self, doc):
+        return to_public(doc, self._key) if self._key else doc
+
+    def _check_update(self, update):
+        if self._key and isinstance(update, dict) and self._key in update.get("$set", {}):
+            raise ValueError(f"{self._key} is the _id of {self._collection.name} and cannot be changed")
+
+    def _replacement(self, document):
+        if not self._key:
+            return document
+        if self._key in document:
+            return to_stored(document, self._key)
+        # The stored _id is the key, so a replacement without it keeps it
+        return {k: v for k, v in document.items() if k != "_id"}
+
+    def find(self, filter=None, projection=None, *args, **kwargs):
+        cursor = self._collection.find(self._filter(filter), self._projection(projection), *args, **kwargs)
+        return KeyedCursor(cursor, self._key) if self._key else cursor
+
+    async def find_one(self, filter=None, projection=None, *args, sort=None, **kwargs):
+        if sort is not None and self._key:
+            sort = translate_sort(sort, None, self._key)[0]
+        doc = await self._collection.find_one(self._filter(filter), self._projection(projection), *args, sort=sort, **kwargs)
+        return self._public(doc)
+
+    async def find_one_and_update(self, filter, update, projection=None, sort=None, **kwargs):
+        self._check_update(update)
+        if sort is not None and self._key:
+            sort = translate_sort(sort, None, self._key)[0]
+        doc = await self._collection.find_one_and_update(
+            self._filter(filter), update, projection=self._projection(projection), sort=sort, **kwargs
+        )
+        return self._public(doc)
+
+    async def find_one_and_delete(self, filter, projection=None, sort=None, **kwargs):
+        if sort is not None and self._key:
+            sort = translate_sort(sort, None, self._key)[0]
+        doc = await self._collection.find_one_and_delete(
+            self._filter(filter), projection=self._projection(projection), sort=sort, **kwargs
+        )
+        return self._public(doc)
+
+    async def find_one_and_replace(self, filter, replacement, projection=None, sort=None, **kwargs):
+        if sort is not None and self._key:
+            sort = translate_sort(sort, None, self._key)[0]
+        doc = await self._collection.find_one_and_replace(
+            self._filter(filter), self._replacement(replacement), projection=self._projection(projection), sort=sort,
+            **kwargs
+        )
+        return self._public(doc)
+
+    async def replace_one(self, filter, replacement, **kwargs):
+        return await self._collection.replace_one(self._filter(filter), self._replacement(replacement), **kwargs)
+
+    async def distinct(self, key, filter=None, **kwargs):
+        field = "_id" if self._key and key == self._key else key
+        return await self._collection.distinct(field, self._filter(filter), **kwargs)
+
+    async def insert_one(self, document, **kwargs):
+        return await self._collection.insert_one(to_stored(document, self._key) if self._key else document, **kwargs)
+
+    async def insert_many(self, documents, **kwargs):
+        if self._key:
+            documents = [to_stored(doc, self._key) for doc in documents]
+        return await self._collection.insert_many(documents, **kwargs)
+
+    async def update_one(self, filter, update, **kwargs):
+        self._check_update(update)
+        return await self._collection.update_one(self._filter(filter), update, **kwargs)
+
+    async def update_many(self, filter, update, **kwargs):
+        self._check_update(update)
+        return await self._collection.update_many(self._filter(filter), update, **kwargs)
+
+    async def delete_one(self, filter, **kwargs):
+        return await self._collection.delete_one(self._filter(filter), **kwargs)
+
+    async def delete_many(self, filter, **kwargs):
+        return await self._collection.delete_many(self._filter(filter), **kwargs)
+
+    async def count_documents(self, filter, **kwargs):
+        return await self._collection.count_documents(self._filter(filter), **kwargs)
+
+    def aggregate(self, pipeline, **kwargs):
+        return self._collection.aggregate(translate_pipeline(pipeline, self._key, self._keyed), **kwargs)
+
+    async def create_index(self, keys, **kwargs):
+        fields = [keys] if isinstance(keys, str) else [field for field, _ in keys]
+        if self._key and fields == [self._key]:
+            # The _id index already covers it
+            return "_id_"
+        if self._key and isinstance(keys, list):
+            keys = [("_id" if field == self._key else field, order) for field, order in keys]
+        return await self._collection.create_index(keys, **kwargs)
@@ -0,0 +1,195 @@
+"""Cross-worker cache invalidation from MongoDB change streams.
+
+Every worker tails one database-level change stream filtered to the
+collections that have subscribers, and hands each event to the callbacks
+registered for that collection. Local caches therefore drop entries written
+by any worker or node, not only their own.
+
+Without a replica set (or when the stream breaks and cannot resume), the
+listener reports "ttl_only": caches keep working and simply rely on their TTL,
+and the listener retries in the background.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from business_ids import public_document
+
+logger = logging.getLogger(__name__)
+
+CHANGE_STREAMS_ENABLED = os.environ.get("CHANGE_STREAMS_ENABLED", "true").lower() == "true"
+# Workers sharing a consumer name share a stored resume token; default is one per host
+CHANGE_STREAM_CONSUMER = os.environ.get("CHANGE_STREAM_CONSUMER", socket.gethostname())
+CHANGE_STREAM_TOKEN_SAVE_SECONDS = float(os.environ.get("CHANGE_STREAM_TOKEN_SAVE_SECONDS", "5"))
+CHANGE_STREAM_RETRY_SECONDS = float(os.environ.get("CHANGE_STREAM_RETRY_SECONDS", "60"))
+TOKEN_COLLECTION = "change_stream_tokens"
+
+# Server error codes for "this deployment has no change streams" and "token too old to resume"
+_UNSUPPORTED_CODES = {40573, 40324}
+_HISTORY_LOST_CODES = {286, 280}
+
+
+def touches(change: dict, fields) -> bool:
+    """Whether `change` can affect any of `fields`; only updates say which fields they changed"""
+    if fields is None or change.get("operationType") != "update":
+        return True
+    description = change.get("updateDescription", {})
+    changed = list(description.get("updatedFields", {})) + list(description.get("removedFields", []))
+    return any(name.split(".")[0] in fields for name in changed)
+
+
+class ChangeStreamListener:
+    def __init__(self, db, consumer: str = CHANGE_STREAM_CONSUMER):
+        self.db = db
+        self.consumer = consumer
+        self.subscribers: Dict[str, List[Callable[[dict], None]]] = {}
+        self.mode = "stopped"
+        self.metrics = {"events": 0, "last_event_at": None, "last_lag_ms": None, "max_lag_ms": 0.0, "avg_lag_ms": None,
+                        "errors": 0, "last_error": None}
+        self._token = None
+        self._token_saved_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, collection: str, callback: Callable[[dict], None]):
+        """Call `callback(change)` for every insert, update, replace or delete on `collection`"""
+        self.subscribers.setdefault(collection, []).append(callback)
+
+    def clear_cache(self, collection: str, cache, fields=None):
+        """Empty `cache` whenever a document in `collection` changes (see `invalidate_cache`)"""
+        self.subscribe(collection, lambda change: cache.clear() if touches(change, fields) else None)
+
+    def invalidate_cache(self, collection: str, cache, key: str, fields=None):
+        """Drop `cache[doc[key]]` whenever a document in `collection` changes.
+
+        With `fields`, updates that touch none of them are ignored.
+        """
+        def invalidate(change):
+            if not touches(change, fields):
+                return
+            document = change.get("fullDocument") or change.get("documentKey")
+            if document and key in document:
+                cache.invalidate(document[key])
+            else:
+                # Deletes only carry _id, so unless _id is the business key the cache key is unknown
+                cache.clear()
+        self.subscribe(collection, invalidate)
+
+    def start(self):
+        if self._task is None and CHANGE_STREAMS_ENABLED and self.subscribers:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._token is not None:
+            await self._save_token(force=True)
+        self.mode = "stopped"
+
+    def _clear_subscribed_caches(self):
+        # Events may have been missed, so every subscriber starts from a clean slate
+        for collection, callbacks in self.subscribers.items():
+            for callback in callbacks:
+                callback({"operationType": "invalidate", "ns": {"coll": collection}})
+
+    async def _load_token(self):
+        try:
+            saved = await self.db[TOKEN_COLLECTION].find_one({"_id": self.consumer})
+            self._token = saved.get("token") if saved else None
+        except PyMongoError as e:
+            logger.warning(f"Could not load change stream resume token: {e}")
+
+    async def _save_token(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._token_saved_at < CHANGE_STREAM_TOKEN_SAVE_SECONDS:
+            return
+        self._token_saved_at = now
+        try:
+            await self.db[TOKEN_COLLECTION].update_one(
+                {"_id": self.consumer},
+                {"$set": {"token": self._token, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+        except PyMongoError as e:
+            logger.warning(f"Could not save change stream resume token: {e}")
+
+    def _record_lag(self, change):
+        wall_time = change.get("wallTime")
+        if wall_time is not None:
+            event_ts = wall_time.replace(tzinfo=timezone.utc).timestamp() if wall_time.tzinfo is None else wall_time.timestamp()
+        else:
+            event_ts = change["clusterTime"].time
+        lag_ms = max(0.0, (time.time() - event_ts) * 1000)
+        m = self.metrics
+        m["events"] += 1
+        m["last_event_at"] = datetime.now(timezone.utc).isoformat()
+        m["last_lag_ms"] = round(lag_ms, 1)
+        m["max_lag_ms"] = round(max(m["max_lag_ms"], lag_ms), 1)
+        m["avg_lag_ms"] = round(lag_ms if m["avg_lag_ms"] is None else 0.9 * m["avg_lag_ms"] + 0.1 * lag_ms, 1)
+
+    def _dispatch(self, change):
+        self._record_lag(change)
+        collection = change["ns"]["coll"]
+        # Subscribers see documents with their public key field, as handlers do
+        if change.get("fullDocument"):
+            change["fullDocument"] = public_document(collection, change["fullDocument"])
+        change["documentKey"] = public_document(collection, change.get("documentKey"))
+        for callback in self.subscribers.get(collection, []):
+            try:
+                callback(change)
+            except Exception as e:
+                logger.error(f"Change stream subscriber failed: {e}", exc_info=True)
+
+    async def _run(self):
+        await self._load_token()
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(self.subscribers)},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+        }}]
+        while True:
+            try:
+                async with self.db.watch(pipeline, full_document="updateLookup", resume_after=self._token) as stream:
+                    self.mode = "streaming"
+                    logger.info(f"Change stream listening on {sorted(self.subscribers)}")
+                    async for change in stream:
+                        self._dispatch(change)
+                        self._token = stream.resume_token
+                        await self._save_token()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in _UNSUPPORTED_CODES:
+                    self._on_error(e, "Change streams unavailable, caches fall back to TTL", logging.WARNING)
+                    await asyncio.sleep(CHANGE_STREAM_RETRY_SECONDS)
+                    continue
+                self._on_error(e)
+                if e.code in _HISTORY_LOST_CODES:
+                    self._token = None
+                    self._clear_subscribed_caches()
+                    continue
+                await asyncio.sleep(CHANGE_STREAM_RETRY_SECONDS)
+            except PyMongoError as e:
+                self._on_error(e)
+                # The driver already retried a resume once; anything cached may now be stale
+                self._clear_subscribed_caches()
+                await asyncio.sleep(min(CHANGE_STREAM_RETRY_SECONDS, 5))
+
+    def _on_error(self, error, message="Change stream interrupted", level=logging.ERROR):
+        self.mode = "ttl_only"
+        self.metrics["errors"] += 1
+        self.metrics["last_error"] = str(error)
+        logger.log(level, f"{message}: {error}")
+
+    def streaming(self) -> bool:
+        """Whether events are arriving; in-memory indexes maintained from them go stale otherwise"""
+        return self.mode == "streaming"
+
+    def status(self) -> dict:
+        return {"mode": self.mode, "consumer": self.consumer, "collections": sorted(self.subscribers), **self.metrics}
@@ -0,0 +1,154 @@
+"""MongoDB client configuration and per-route read routing.
+
+Every driver setting comes from the environment so pools and timeouts can be
+tuned per deployment without code changes. Handlers read through `RoutedDatabase`;
+a handler decorated with `@read_profile("secondary_preferred")` sends its reads
+to secondaries when the deployment has them, while writes always go to the
+primary.
+
+To try read routing locally, run a single-node replica set:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0
+    mongosh --eval 'rs.initiate()'
+    MONGO_URL="mongodb://localhost:27017/?replicaSet=rs0" uvicorn server:app
+
+With no secondaries, secondary-preferred reads fall back to the primary.
+"""
+
+import contextvars
+import functools
+import importlib.util
+import logging
+import os
+from datetime import timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo.read_preferences import Primary, PrimaryPreferred, SecondaryPreferred
+
+from business_ids import KEYED_COLLECTIONS, KeyedCollection
+from slow_query import SLOW_QUERY_ENABLED, slow_query_recorder
+
+logger = logging.getLogger(__name__)
+
+
+def _optional_int(name):
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = _optional_int("MONGO_MAX_IDLE_TIME_MS")
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+MONGO_SOCKET_TIMEOUT_MS = _optional_int("MONGO_SOCKET_TIMEOUT_MS")
+MONGO_WAIT_QUEUE_TIMEOUT_MS = _optional_int("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+# Preference order; codecs whose Python package is missing are skipped
+MONGO_COMPRESSORS = os.environ.get("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+# Secondaries lagging further than this are not read from (MongoDB minimum is 90)
+MONGO_MAX_STALENESS_SECONDS = int(os.environ.get("MONGO_MAX_STALENESS_SECONDS", "90"))
+# Set to "false" to pin every read to the primary regardless of route profiles
+MONGO_READ_ROUTING_ENABLED = os.environ.get("MONGO_READ_ROUTING_ENABLED", "true").lower() == "true"
+
+_COMPRESSOR_PACKAGES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+
+def available_compressors(requested: str = MONGO_COMPRESSORS):
+    names = [c.strip() for c in requested.split(",") if c.strip()]
+    available = []
+    for name in names:
+        package = _COMPRESSOR_PACKAGES.get(name, name)
+        if package is None or importlib.util.find_spec(package) is not None:
+            available.append(name)
+        else:
+            logger.info(f"Mongo compressor {name} skipped: {package} is not installed")
+    return available
+
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "compressors": ",".join(available_compressors()) or None,
+        # Dates come back as aware UTC datetimes, so API responses keep their +00:00 offset
+        "tz_aware": True,
+        "tzinfo": timezone.utc,
+    }
+    return {k: v for k, v in options.items() if v is not None}
+
+
+def create_client(mongo_url: str) -> AsyncIOMotorClient:
+    options = client_options()
+    logger.info(f"Mongo client options: {options}")
+    listeners = [slow_query_recorder] if SLOW_QUERY_ENABLED else []
+    return AsyncIOMotorClient(mongo_url, event_listeners=listeners, **options)
+
+
+# ============ READ PROFILES ============
+
+READ_PROFILES = {
+    "primary": Primary(),
+    "primary_preferred": PrimaryPreferred(max_staleness=MONGO_MAX_STALENESS_SECONDS),
+    "secondary_preferred": SecondaryPreferred(max_staleness=MONGO_MAX_STALENESS_SECONDS),
+}
+
+read_profile_var = contextvars.ContextVar("read_profile", default="primary")
+
+
+def read_profile(profile: str):
+    """Route the reads a handler makes according to `profile`.
+
+    Only for endpoints that tolerate data up to MONGO_MAX_STALENESS_SECONDS old,
+    such as anonymous job browsing.
+    """
+    if profile not in READ_PROFILES:
+        raise ValueError(f"Unknown read profile: {profile}")
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            token = read_profile_var.set(profile)
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                read_profile_var.reset(token)
+        return wrapper
+    return decorator
+
+
+class RoutedDatabase:
+    """Wraps a Motor database so collections pick up the current read profile.
+
+    Collections in BUSINESS_ID_COLLECTIONS are also wrapped in a
+    `KeyedCollection`, so handlers keep using `user_id`, `job_id`, ... while
+    Mongo stores them as `_id`.
+    """
+
+    def __init__(self, database):
+        self._database = database
+        self._collections = {}
+
+    def _collection(self, name: str):
+        profile = read_profile_var.get() if MONGO_READ_ROUTING_ENABLED else "primary"
+        key = (name, profile)
+        collection = self._collections.get(key)
+        if collection is None:
+            collection = self._database.get_collection(name, read_preference=READ_PROFILES[profile])
+            if KEYED_COLLECTIONS:
+                collection = KeyedCollection(collection, KEYED_COLLECTIONS.get(name), KEYED_COLLECTIONS)
+            self._collections[key] = collection
+        return collection
+
+    def __getitem__(self, name: str):
+        return self._collection(name)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._database, name)
+        if isinstance(attr, AsyncIOMotorCollection):
+            return self._collection(name)
+        return attr
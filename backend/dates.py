@@ -0,0 +1,49 @@
+"""Timestamps are stored as native BSON dates.
+
+Documents written before the switch hold `isoformat()` strings in the fields
+listed in DATE_FIELDS until migrate_dates.py has rewritten them. Until then,
+values read from Mongo go through `as_datetime`, and range filters on those
+fields use `date_range`, which matches either form. MongoDB only compares
+values of the same BSON type, so each branch of its $or sees one form.
+
+Once migrate_dates.py reports no strings left, set DATE_STRING_COMPAT=false
+to drop the string branch from every range filter.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Optional, Union
+
+DATE_STRING_COMPAT = os.environ.get("DATE_STRING_COMPAT", "true").lower() == "true"
+
+# Fields that older documents store as ISO strings; user_sessions always used dates
+DATE_FIELDS = {
+    "users": ("created_at",),
+    "recruiter_profiles": ("subscription_start", "subscription_end", "updated_at"),
+    "jobs": ("posted_at", "approved_at"),
+    "applications": ("applied_at", "updated_at"),
+    "messages": ("created_at",),
+    "payments": ("created_at",),
+}
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_datetime(value: Union[datetime, str, None]) -> Optional[datetime]:
+    """Timezone-aware UTC datetime from either stored form"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def date_range(field: str, **bounds: datetime) -> dict:
+    """Filter on `field` for both stored forms, e.g. date_range("subscription_end", lt=now)"""
+    native = {field: {f"${op}": value for op, value in bounds.items()}}
+    if not DATE_STRING_COMPAT:
+        return native
+    legacy = {field: {f"${op}": value.isoformat() for op, value in bounds.items()}}
+    return {"$or": [native, legacy]}
@@ -0,0 +1,129 @@
+"""Offline geocoding of free-text locations against a bundled gazetteer.
+
+`data/gazetteer.csv` lists cities with their state, country, coordinates and
+common alternate names. Free text such as "Bangalore, KA" or "Whitefield,
+Bengaluru" resolves to one canonical place; anything unrecognised (including
+"Remote") resolves to nothing and the caller keeps only the raw text.
+"""
+
+import csv
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+GAZETTEER_FILE = Path(__file__).parent / "data" / "gazetteer.csv"
+EARTH_RADIUS_KM = 6371.0088
+
+COUNTRY_ALIASES = {
+    "in": "india", "ind": "india", "bharat": "india",
+    "uae": "united arab emirates", "us": "united states", "usa": "united states",
+    "uk": "united kingdom", "gb": "united kingdom",
+}
+_SEPARATORS = re.compile(r"[,/|;()]")
+_NOT_WORD = re.compile(r"[^a-z0-9 ]+")
+_LAT_LON = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+@dataclass(frozen=True)
+class Place:
+    city: str
+    state: str
+    country: str
+    lat: float
+    lon: float
+
+    @property
+    def name(self) -> str:
+        return f"{self.city}, {self.state}, {self.country}"
+
+    @property
+    def point(self) -> dict:
+        """GeoJSON point; GeoJSON orders coordinates longitude first"""
+        return {"type": "Point", "coordinates": [self.lon, self.lat]}
+
+
+def normalize(text: str) -> str:
+    return " ".join(_NOT_WORD.sub(" ", text.lower()).split())
+
+
+@lru_cache(maxsize=1)
+def gazetteer() -> Dict[str, List[Place]]:
+    """Alias -> places with that name, in file order (larger cities first)"""
+    index: Dict[str, List[Place]] = {}
+    with open(GAZETTEER_FILE, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            place = Place(row["city"], row["state"], row["country"], float(row["lat"]), float(row["lon"]))
+            names = [row["city"], *filter(None, (row.get("aliases") or "").split("|"))]
+            for name in names:
+                index.setdefault(normalize(name), []).append(place)
+    return index
+
+
+def _matches_qualifier(place: Place, qualifier: str) -> bool:
+    qualifier = COUNTRY_ALIASES.get(qualifier, qualifier)
+    return qualifier in (normalize(place.state), normalize(place.country))
+
+
+@lru_cache(maxsize=4096)
+def geocode(text: Optional[str]) -> Optional[Place]:
+    """Resolve free text to a gazetteer place, or None"""
+    if not text:
+        return None
+    parts = [normalize(p) for p in _SEPARATORS.split(text)]
+    parts = [p for p in parts if p]
+    index = gazetteer()
+    # The most specific recognisable part wins: "Whitefield, Bengaluru" -> Bengaluru
+    for i, part in enumerate(parts):
+        candidates = index.get(part)
+        if not candidates:
+            continue
+        qualifiers = parts[:i] + parts[i + 1:]
+        for candidate in candidates:
+            if any(_matches_qualifier(candidate, q) for q in qualifiers):
+                return candidate
+        return candidates[0]
+    return None
+
+
+def parse_point(text: str) -> Optional[Tuple[float, float]]:
+    """(lon, lat) from "lat,lon" text or a place name"""
+    match = _LAT_LON.match(text)
+    if match:
+        lat, lon = float(match.group(1)), float(match.group(2))
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return lon, lat
+        return None
+    place = geocode(text)
+    return (place.lon, place.lat) if place else None
+
+
+def location_fields(text: Optional[str]) -> dict:
+    """Fields stored next to a free-text `location`.
+
+    `location_normalized` is "" when the text is not a known place, so
+    documents that have been looked at are distinguishable from ones that
+    have not (null). `location_point` is only present for known places.
+    """
+    place = geocode(text)
+    if place is None:
+        return {"location_normalized": ""}
+    return {"location_normalized": place.name, "location_point": place.point}
+
+
+def location_update(text: Optional[str]) -> dict:
+    """Update document that re-derives the location fields from `text`"""
+    fields = location_fields(text)
+    update = {"$set": fields}
+    if "location_point" not in fields:
+        update["$unset"] = {"location_point": ""}
+    return update
+
+
+def haversine_km(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
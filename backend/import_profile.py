@@ -0,0 +1,83 @@
+"""Report what `import server` costs, module by module.
+
+Runs a fresh interpreter with `-X importtime`, so the numbers match a worker
+cold start. With --budget-ms the script exits 1 when the total import time is
+over budget, which lets CI keep cold starts bounded.
+
+    python import_profile.py                   # top 25 modules by cumulative time
+    python import_profile.py --top 50 --json   # also write test_reports/import_profile_<ts>.json
+    python import_profile.py --budget-ms 1500  # fail if importing server takes longer
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+REPORTS_DIR = BACKEND_DIR.parent / "test_reports"
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_imports(module: str = "server"):
+    env = {
+        "MONGO_URL": "mongodb://localhost:27017",
+        "DB_NAME": "import_profile",
+        "JWT_SECRET_KEY": "import-profile-only-secret-key-0123456789",
+        **os.environ,
+    }
+    started = datetime.now(timezone.utc)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append({
+                "module": name,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": len(indent) // 2,
+            })
+    # Top-level entries are the direct imports; together they make up the whole cost
+    total_ms = sum(m["cumulative_ms"] for m in modules if m["depth"] == 0)
+    return {"module": module, "timestamp": started.isoformat(), "total_ms": round(total_ms, 1), "modules": modules}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget-ms", type=float, help="exit 1 if total import time exceeds this")
+    parser.add_argument("--json", action="store_true", help="write the full report to test_reports/")
+    args = parser.parse_args()
+
+    report = profile_imports(args.module)
+    print(f"import {report['module']}: {report['total_ms']:.1f}ms\n")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for m in sorted(report["modules"], key=lambda m: m["cumulative_ms"], reverse=True)[:args.top]:
+        print(f"{m['cumulative_ms']:>10.1f}ms {m['self_ms']:>8.1f}ms  {'  ' * m['depth']}{m['module']}")
+
+    if args.json:
+        REPORTS_DIR.mkdir(exist_ok=True)
+        path = REPORTS_DIR / f"import_profile_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}.json"
+        path.write_text(json.dumps(report, indent=2))
+        print(f"\nSaved to {path}")
+
+    if args.budget_ms is not None and report["total_ms"] > args.budget_ms:
+        print(f"\nImport time {report['total_ms']:.1f}ms is over the {args.budget_ms:.0f}ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Third-party clients, created on first use instead of at import.
+
+Payment and LLM SDKs are heavy to import and most requests never touch them,
+so worker boot does not pay for them. The shared HTTP client is opened by the
+app lifespan, which also connects it to the known outbound hosts, and is
+reused for every outbound call.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+from typing import List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID', '')
+RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET', '')
+# The LLM SDK is only imported when explicitly enabled; otherwise a no-op stub answers
+LLM_ENABLED = os.environ.get("LLM_ENABLED", "false").lower() == "true"
+HTTP_TIMEOUT_SECONDS = float(os.environ.get("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_WARM_TIMEOUT_SECONDS = float(os.environ.get("HTTP_WARM_TIMEOUT_SECONDS", "2"))
+
+_razorpay_client = None
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+# ============ PAYMENTS ============
+
+def razorpay_module():
+    return importlib.import_module("razorpay")
+
+
+def get_razorpay_client():
+    """Razorpay client, or None when keys are not configured (demo mode)"""
+    global _razorpay_client
+    if _razorpay_client is None and RAZORPAY_KEY_ID and RAZORPAY_KEY_SECRET:
+        _razorpay_client = razorpay_module().Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
+    return _razorpay_client
+
+
+# ============ LLM ============
+
+class _StubLlmChat:
+    def __init__(self, *args, **kwargs): pass
+    def with_model(self, *args, **kwargs): return self
+    async def send_message(self, *args, **kwargs): return ""
+
+
+class _StubUserMessage:
+    def __init__(self, *args, **kwargs): pass
+
+
+def llm_classes():
+    """(LlmChat, UserMessage), imported on first use when LLM_ENABLED is set"""
+    if LLM_ENABLED:
+        try:
+            chat = importlib.import_module("emergentintegrations.llm.chat")
+            return chat.LlmChat, chat.UserMessage
+        except ImportError as e:
+            logger.error(f"LLM_ENABLED is set but the LLM SDK is unavailable: {e}")
+    return _StubLlmChat, _StubUserMessage
+
+
+# ============ HTTP ============
+
+async def start_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=20),
+        )
+    return _http_client
+
+
+async def warm_http_client(urls: List[str]) -> int:
+    """Open a pooled connection to each URL's host, so the first real call skips TCP/TLS setup.
+
+    Sends one HEAD to each origin; any answer leaves the connection in the
+    keep-alive pool. Unreachable hosts are logged and skipped. Returns the
+    number of hosts that answered.
+    """
+    http_client = await start_http_client()
+    origins = list(dict.fromkeys(str(httpx.URL(url).copy_with(path="/", query=None, fragment=None)) for url in urls))
+
+    async def warm(origin: str) -> bool:
+        try:
+            await http_client.head(origin, timeout=HTTP_WARM_TIMEOUT_SECONDS)
+            return True
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not pre-connect to {origin}: {e!r}")
+            return False
+
+    return sum(await asyncio.gather(*[warm(origin) for origin in origins]))
+
+
+def get_http_client() -> httpx.AsyncClient:
+    if _http_client is None:
+        raise RuntimeError("HTTP client used before application startup")
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
@@ -0,0 +1,181 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.environ.get("LOG_FILE", str(Path(__file__).parent / "backend_error.log"))
+LOG_FILE_LEVEL = os.environ.get("LOG_FILE_LEVEL", "ERROR").upper()
+LOG_FILE_MAX_BYTES = int(os.environ.get("LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_FILE_BACKUPS = int(os.environ.get("LOG_FILE_BACKUPS", "5"))
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+# Identical tracebacks beyond this many per window are counted instead of written
+LOG_REPEAT_LIMIT = int(os.environ.get("LOG_REPEAT_LIMIT", "5"))
+LOG_REPEAT_WINDOW_SECONDS = float(os.environ.get("LOG_REPEAT_WINDOW_SECONDS", "60"))
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "suppressed_repeats"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any `extra=` fields carried through"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if getattr(record, "suppressed_repeats", 0):
+            entry["suppressed_repeats"] = record.suppressed_repeats
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RepeatedTracebackFilter(logging.Filter):
+    """Rate-limits records whose traceback went through the same code path.
+
+    The key is built from the exception type and (file, line) of each frame,
+    which is cheap enough to compute on the event loop before any formatting.
+    """
+
+    def __init__(self, limit=LOG_REPEAT_LIMIT, window=LOG_REPEAT_WINDOW_SECONDS):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(exc_info):
+        exc_type, _, tb = exc_info
+        frames = []
+        while tb is not None:
+            frames.append((tb.tb_frame.f_code.co_filename, tb.tb_lineno))
+            tb = tb.tb_next
+        return (exc_type, tuple(frames))
+
+    def filter(self, record):
+        if not record.exc_info or not record.exc_info[0]:
+            return True
+        key = self._key(record.exc_info)
+        now = time.monotonic()
+        with self._lock:
+            window_start, count, suppressed = self._seen.get(key, (now, 0, 0))
+            if now - window_start >= self.window:
+                window_start, count = now, 0
+            if count < self.limit:
+                self._seen[key] = (window_start, count + 1, 0)
+                record.suppressed_repeats = suppressed
+                return True
+            self._seen[key] = (window_start, count, suppressed + 1)
+            if len(self._seen) > 1000:
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+            return False
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread and drops them if the queue is full"""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Render message and traceback now, while the exception is still live,
+        # so the listener never touches frames owned by the event loop thread.
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+class PlainFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        return f"{text} [request_id={request_id}]" if request_id else text
+
+
+_listener = None
+_queue_handler = None
+_previous_handlers = []
+
+
+def setup_logging():
+    """Route every log record through a queue so file and console writes happen off the event loop"""
+    global _listener, _queue_handler, _previous_handlers
+    if _listener is not None:
+        return _listener
+
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, delay=True)
+    file_handler.setLevel(LOG_FILE_LEVEL)
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(PlainFormatter("%(levelname)s:%(name)s:%(message)s"))
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(RepeatedTracebackFilter())
+
+    root = logging.getLogger()
+    _previous_handlers = list(root.handlers)
+    for handler in _previous_handlers:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    _queue_handler = queue_handler
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread.
+
+    The root logger gets its original handlers back first, so records logged
+    during teardown are written instead of queued for a stopped listener.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for handler in _previous_handlers:
+        root.addHandler(handler)
+    _queue_handler = None
+    _listener.stop()
+    _listener = None
@@ -0,0 +1,183 @@
+"""Storage for chat messages between two users.
+
+"document" mode (the default) keeps one `messages` document per message.
+"bucket" mode packs each user pair's messages into `message_buckets`
+documents of up to MESSAGE_BUCKET_SIZE messages spanning at most
+MESSAGE_BUCKET_DAYS. New messages are appended to the pair's open bucket with
+$push, and a thread view reads the newest bucket or two instead of sorting
+across every message. Both stores return messages in the same shape.
+
+Existing `messages` documents are converted with migrate_messages.py.
+"""
+
+import logging
+import os
+from datetime import timedelta
+from typing import List, Tuple
+
+from dates import as_datetime
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_STORAGE_MODE = os.environ.get("MESSAGE_STORAGE_MODE", "document")
+MESSAGE_BUCKET_SIZE = int(os.environ.get("MESSAGE_BUCKET_SIZE", "200"))
+MESSAGE_BUCKET_DAYS = float(os.environ.get("MESSAGE_BUCKET_DAYS", "30"))
+BUCKET_COLLECTION = "message_buckets"
+
+
+def pair_key(user_a: str, user_b: str) -> str:
+    """Same key whichever of the two users sends"""
+    return "|".join(sorted((user_a, user_b)))
+
+
+def other_user(users: List[str], user_id: str) -> str:
+    return next((u for u in users if u != user_id), user_id)
+
+
+def compact_message(message: dict) -> dict:
+    """Bucket entry: the receiver is implied by the pair, and a missing application_id means None"""
+    entry = {k: v for k, v in message.items() if k not in ("_id", "receiver_id")}
+    if entry.get("application_id") is None:
+        entry.pop("application_id", None)
+    return entry
+
+
+def expand_message(entry: dict, users: List[str]) -> dict:
+    return {
+        "message_id": entry["message_id"],
+        "sender_id": entry["sender_id"],
+        "receiver_id": other_user(users, entry["sender_id"]),
+        "content": entry["content"],
+        "application_id": entry.get("application_id"),
+        "created_at": entry["created_at"],
+        "read": entry.get("read", False),
+    }
+
+
+class DocumentMessageStore:
+    mode = "document"
+
+    def __init__(self, db):
+        self.db = db
+
+    async def ensure_indexes(self):
+        await self.db.messages.create_index([("sender_id", 1), ("receiver_id", 1), ("created_at", -1)])
+        await self.db.messages.create_index([("receiver_id", 1), ("read", 1)])
+
+    async def append(self, message: dict):
+        await self.db.messages.insert_one(message)
+        message.pop("_id", None)
+
+    async def thread(self, user_id: str, other_id: str, limit: int = 100) -> List[dict]:
+        """The latest `limit` messages between the two users, oldest first"""
+        messages = await self.db.messages.find({
+            "$or": [
+                {"sender_id": user_id, "receiver_id": other_id},
+                {"sender_id": other_id, "receiver_id": user_id}
+            ]
+        }, {"_id": 0}).sort("created_at", -1).to_list(limit)
+        messages.reverse()
+        return messages
+
+    async def mark_read(self, reader_id: str, other_id: str):
+        await self.db.messages.update_many(
+            {"sender_id": other_id, "receiver_id": reader_id, "read": False},
+            {"$set": {"read": True}}
+        )
+
+    async def latest_per_partner(self, user_id: str, limit: int = 100) -> List[Tuple[str, dict]]:
+        """(other user id, last message) for each conversation partner"""
+        conversations = await self.db.messages.aggregate([
+            {"$match": {"$or": [{"sender_id": user_id}, {"receiver_id": user_id}]}},
+            {"$sort": {"created_at": -1}},
+            {"$group": {
+                "_id": {
+                    "$cond": [
+                        {"$eq": ["$sender_id", user_id]},
+                        "$receiver_id",
+                        "$sender_id"
+                    ]
+                },
+                "last_message": {"$first": "$$ROOT"}
+            }}
+        ]).to_list(limit)
+        return [(conv["_id"], conv["last_message"]) for conv in conversations]
+
+
+class BucketMessageStore:
+    mode = "bucket"
+
+    def __init__(self, db, bucket_size: int = MESSAGE_BUCKET_SIZE, bucket_days: float = MESSAGE_BUCKET_DAYS):
+        self.db = db
+        self.bucket_size = bucket_size
+        self.bucket_days = bucket_days
+
+    @property
+    def buckets(self):
+        return self.db[BUCKET_COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.buckets.create_index([("pair", 1), ("end", -1)])
+        await self.buckets.create_index([("users", 1), ("end", -1)])
+
+    async def append(self, message: dict):
+        """Push onto the pair's open bucket, or start a new one when it is full or too old"""
+        sender, receiver = message["sender_id"], message["receiver_id"]
+        created_at = as_datetime(message["created_at"])
+        oldest_start = created_at - timedelta(days=self.bucket_days)
+        await self.buckets.update_one(
+            # Buckets written by migrate_messages.py are rebuilt on every run, so never append to them
+            {"pair": pair_key(sender, receiver), "count": {"$lt": self.bucket_size},
+             "start": {"$gte": oldest_start}, "migrated": {"$ne": True}},
+            {
+                "$push": {"messages": {**compact_message(message), "created_at": created_at}},
+                "$inc": {"count": 1, f"unread.{receiver}": 0 if message.get("read") else 1},
+                "$set": {"end": created_at},
+                "$setOnInsert": {"users": sorted((sender, receiver)), "start": created_at},
+            },
+            upsert=True
+        )
+
+    async def thread(self, user_id: str, other_id: str, limit: int = 100) -> List[dict]:
+        """The latest `limit` messages between the two users, oldest first"""
+        # A full bucket holds at least as many messages as the newest, possibly almost empty, one lacks
+        cursor = self.buckets.find(
+            {"pair": pair_key(user_id, other_id)},
+            {"_id": 0, "users": 1, "messages": {"$slice": -limit}}
+        ).sort("end", -1).limit(limit // self.bucket_size + 2)
+        entries, users = [], [user_id, other_id]
+        async for bucket in cursor:
+            users = bucket["users"]
+            entries[:0] = bucket["messages"]
+            if len(entries) >= limit:
+                break
+        return [expand_message(entry, users) for entry in entries[-limit:]]
+
+    async def mark_read(self, reader_id: str, other_id: str):
+        # Only buckets with unread messages for the reader are rewritten
+        await self.buckets.update_many(
+            {"pair": pair_key(reader_id, other_id), f"unread.{reader_id}": {"$gt": 0}},
+            {"$set": {"messages.$[m].read": True, f"unread.{reader_id}": 0}},
+            array_filters=[{"m.sender_id": other_id, "m.read": False}]
+        )
+
+    async def latest_per_partner(self, user_id: str, limit: int = 100) -> List[Tuple[str, dict]]:
+        """(other user id, last message) for each conversation partner"""
+        conversations = await self.buckets.aggregate([
+            {"$match": {"users": user_id}},
+            {"$sort": {"end": -1}},
+            {"$project": {"_id": 0, "pair": 1, "users": 1, "last": {"$arrayElemAt": ["$messages", -1]}}},
+            {"$group": {"_id": "$pair", "users": {"$first": "$users"}, "last": {"$first": "$last"}}},
+        ]).to_list(limit)
+        return [
+            (other_user(conv["users"], user_id), expand_message(conv["last"], conv["users"]))
+            for conv in conversations
+        ]
+
+
+def create_message_store(db, mode: str = MESSAGE_STORAGE_MODE):
+    if mode == "bucket":
+        return BucketMessageStore(db)
+    if mode != "document":
+        logger.warning(f"Unknown MESSAGE_STORAGE_MODE {mode!r}, using document storage")
+    return DocumentMessageStore(db)
@@ -0,0 +1,173 @@
+"""Copy collections into business-id storage, where `_id` is the business key.
+
+Each collection in business_ids.BUSINESS_KEYS is copied into `<name>__keyed`
+with its key (`user_id`, `job_id`, ...) as `_id`, in `_id` order, one batch
+per bulk write. Copies are idempotent replaces, and progress is saved in
+`migrations` after every batch, so the copy can run while the app is live and
+resume after an interruption. Secondary indexes are recreated on the copy,
+except the one on the key itself, which the `_id` index replaces.
+
+Documents updated or deleted after their batch was copied are only picked up
+by `--swap`. Stop writes to the collection (maintenance mode), then:
+
+    python migrate_business_ids.py --dry-run               # duplicate keys and sizes
+    python migrate_business_ids.py --collections jobs      # live copy
+    python migrate_business_ids.py --collections jobs --swap
+
+`--swap` copies everything again, drops copies whose source is gone, renames
+`<name>` to `<name>__objectid_backup` and `<name>__keyed` to `<name>`. Restart
+the workers with `jobs` in BUSINESS_ID_COLLECTIONS before allowing writes.
+"""
+
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, MongoClient, ReplaceOne
+
+load_dotenv()
+
+from business_ids import BUSINESS_KEYS, to_stored  # noqa: E402
+from dates import utcnow  # noqa: E402
+from migrate_messages import collection_sizes  # noqa: E402
+
+PROGRESS_COLLECTION = "migrations"
+KEYED_SUFFIX = "__keyed"
+BACKUP_SUFFIX = "__objectid_backup"
+
+
+def key_problems(db, name, key):
+    """Documents without the key and keys held by more than one document; either blocks the copy"""
+    missing = db[name].count_documents({key: {"$exists": False}})
+    duplicates = list(db[name].aggregate([
+        {"$group": {"_id": f"${key}", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": 10},
+    ], allowDiskUse=True))
+    return missing, [(d["_id"], d["count"]) for d in duplicates]
+
+
+def copy_indexes(db, name, key):
+    """Recreate the source's secondary indexes on the copy, with the key renamed to _id"""
+    created = []
+    for index_name, info in db[name].index_information().items():
+        fields = [(field, order) for field, order in info["key"]]
+        if index_name == "_id_" or [field for field, _ in fields] == [key]:
+            continue
+        fields = [("_id" if field == key else field, order) for field, order in fields]
+        options = {k: v for k, v in info.items() if k in ("unique", "sparse", "partialFilterExpression",
+                                                          "expireAfterSeconds", "2dsphereIndexVersion")}
+        created.append(db[name + KEYED_SUFFIX].create_index(fields, name=index_name, **options))
+    return created
+
+
+def copy_collection(db, name, key, batch_size, max_docs_per_second, restart=False):
+    progress_id = f"business_ids:{name}"
+    progress = {} if restart else db[PROGRESS_COLLECTION].find_one({"_id": progress_id}) or {}
+    last_id = progress.get("last_id")
+    copied = progress.get("copied", 0) if last_id else 0
+    target = db[name + KEYED_SUFFIX]
+
+    while True:
+        started = time.monotonic()
+        query = {"_id": {"$gt": last_id}} if last_id else {}
+        docs = list(db[name].find(query).sort("_id", ASCENDING).limit(batch_size))
+        if not docs:
+            break
+        operations = []
+        for doc in docs:
+            stored = to_stored(doc, key)
+            operations.append(ReplaceOne({"_id": stored["_id"]}, stored, upsert=True))
+        target.bulk_write(operations, ordered=False)
+        copied += len(docs)
+        last_id = docs[-1]["_id"]
+        db[PROGRESS_COLLECTION].update_one(
+            {"_id": progress_id},
+            {"$set": {"last_id": last_id, "copied": copied, "updated_at": utcnow()}},
+            upsert=True
+        )
+        print(f"  {name}: {copied:,} copied, at _id {last_id}")
+        # Throttle so the copy never takes more than its share of the primary
+        time.sleep(max(0.0, len(docs) / max_docs_per_second - (time.monotonic() - started)))
+    return copied
+
+
+def stale_copies(db, name, key):
+    """Keys in the copy that no longer exist in the source, found by merging both key orders"""
+    source = db[name].find({}, {"_id": 0, key: 1}).sort(key, ASCENDING)
+    source_key = next(source, {}).get(key)
+    stale = []
+    for doc in db[name + KEYED_SUFFIX].find({}, {"_id": 1}).sort("_id", ASCENDING):
+        while source_key is not None and source_key < doc["_id"]:
+            source_key = next(source, {}).get(key)
+        if source_key != doc["_id"]:
+            stale.append(doc["_id"])
+    return stale
+
+
+def swap(db, name, key, batch_size, max_docs_per_second):
+    copy_collection(db, name, key, batch_size, max_docs_per_second, restart=True)
+    stale = stale_copies(db, name, key)
+    if stale:
+        db[name + KEYED_SUFFIX].delete_many({"_id": {"$in": stale}})
+    copy_indexes(db, name, key)
+    source, copy = db[name].estimated_document_count(), db[name + KEYED_SUFFIX].estimated_document_count()
+    if source != copy:
+        raise SystemExit(f"{name}: {source:,} documents but {copy:,} copies, not swapping")
+    db[name].rename(name + BACKUP_SUFFIX)
+    db[name + KEYED_SUFFIX].rename(name)
+    db[PROGRESS_COLLECTION].delete_one({"_id": f"business_ids:{name}"})
+    print(f"{name}: swapped, {len(stale):,} stale copies dropped, original kept as {name + BACKUP_SUFFIX}")
+
+
+def report(db, name):
+    for collection in (name, name + KEYED_SUFFIX, name + BACKUP_SUFFIX):
+        if collection not in db.list_collection_names():
+            continue
+        sizes = collection_sizes(db, collection)
+        print(f"  {collection:<32} {sizes['count']:>12,} docs {sizes['size_bytes'] / 2**20:>10.1f}MB data "
+              f"{sizes['index_bytes'] / 2**20:>10.1f}MB indexes ({', '.join(db[collection].index_information())})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME"))
+    parser.add_argument("--collections", help=f"comma-separated subset of {', '.join(BUSINESS_KEYS)}")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-docs-per-second", type=float, default=5000)
+    parser.add_argument("--restart", action="store_true", help="copy from the first document again")
+    parser.add_argument("--swap", action="store_true", help="final copy and rename; stop writes first")
+    parser.add_argument("--dry-run", action="store_true", help="only check keys and report sizes")
+    args = parser.parse_args()
+    if not args.db_name:
+        parser.error("--db-name or DB_NAME is required")
+
+    names = args.collections.split(",") if args.collections else list(BUSINESS_KEYS)
+    unknown = set(names) - set(BUSINESS_KEYS)
+    if unknown:
+        parser.error(f"no business key known for {', '.join(sorted(unknown))}")
+
+    db = MongoClient(args.mongo_url)[args.db_name]
+    for name in names:
+        key = BUSINESS_KEYS[name]
+        missing, duplicates = key_problems(db, name, key)
+        if missing or duplicates:
+            print(f"{name}: {missing:,} documents without {key}, duplicated keys {duplicates}; fix these first")
+            continue
+        if not args.dry_run:
+            started = time.perf_counter()
+            if args.swap:
+                swap(db, name, key, args.batch_size, args.max_docs_per_second)
+            else:
+                copied = copy_collection(db, name, key, args.batch_size, args.max_docs_per_second,
+                                         restart=args.restart)
+                indexes = copy_indexes(db, name, key)
+                print(f"{name}: {copied:,} documents copied, indexes {indexes}, "
+                      f"{time.perf_counter() - started:.1f}s")
+        report(db, name)
+
+
+if __name__ == "__main__":
+    main()
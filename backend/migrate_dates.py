@@ -0,0 +1,140 @@
+"""Rewrite ISO-string timestamps as native BSON dates while the app is live.
+
+Walks each collection in dates.DATE_FIELDS by descending `_id` and converts
+one batch of documents per bulk write. An update only applies if the field
+still holds the string that was read, so a concurrent write is never
+overwritten. Progress is saved in `migrations` after every batch, so an
+interrupted run picks up where it stopped.
+
+MongoDB only compares `_id`s of the same BSON type, so the walk covers one
+type at a time: ObjectId `_id`s, then string ones (collections stored by
+business ID, see business_ids.py, may hold both during their rollout).
+Only ObjectIds order by creation time, so only for them does the walk
+convert the newest documents first; string `_id`s are visited in no
+particular order.
+
+    python migrate_dates.py --dry-run                       # strings left per field
+    python migrate_dates.py --batch-size 500 --max-docs-per-second 1000
+    python migrate_dates.py --collections jobs,applications
+    python migrate_dates.py --restart                       # ignore saved progress
+"""
+
+import argparse
+import os
+import time
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import DESCENDING, MongoClient, UpdateOne
+
+load_dotenv()
+
+from dates import DATE_FIELDS, as_datetime, utcnow  # noqa: E402
+
+PROGRESS_COLLECTION = "migrations"
+# `_id` BSON types walked, in order; a range filter on `_id` only matches one of them
+ID_TYPES = ("objectId", "string")
+
+
+def id_type(value) -> str:
+    return "objectId" if isinstance(value, ObjectId) else "string"
+
+
+def remaining_strings(db, collection, fields):
+    return {field: db[collection].count_documents({field: {"$type": "string"}}) for field in fields}
+
+
+def convert(doc, fields):
+    """(filter, $set) for one document, or None when nothing parses"""
+    guard, values = {"_id": doc["_id"]}, {}
+    for field in fields:
+        value = doc.get(field)
+        if not isinstance(value, str):
+            continue
+        try:
+            values[field] = as_datetime(value)
+        except ValueError:
+            print(f"  {field} of {doc['_id']} is not an ISO timestamp: {value!r}")
+            continue
+        guard[field] = value
+    return (guard, {"$set": values}) if values else None
+
+
+def migrate_collection(db, collection, fields, batch_size, max_docs_per_second, restart=False):
+    progress_id = f"dates:{collection}"
+    progress = db[PROGRESS_COLLECTION].find_one({"_id": progress_id}) or {}
+    # A finished run starts over: old workers may have written strings since
+    if restart or progress.get("done"):
+        progress = {}
+    last_id = progress.get("last_id")
+    converted = progress.get("converted", 0) if last_id is not None else 0
+    # Progress saved before the walk was split by type has no id_type
+    resume_type = progress.get("id_type") or (id_type(last_id) if last_id is not None else ID_TYPES[0])
+    any_string = {"$or": [{field: {"$type": "string"}} for field in fields]}
+
+    for walked_type in ID_TYPES[ID_TYPES.index(resume_type):]:
+        if walked_type != resume_type:
+            last_id = None
+        while True:
+            started = time.monotonic()
+            id_filter = {"$type": walked_type} if last_id is None else {"$type": walked_type, "$lt": last_id}
+            docs = list(db[collection].find({**any_string, "_id": id_filter}, {field: 1 for field in fields})
+                        .sort("_id", DESCENDING).limit(batch_size))
+            if not docs:
+                break
+            updates = [convert(doc, fields) for doc in docs]
+            operations = [UpdateOne(*update) for update in updates if update]
+            if operations:
+                converted += db[collection].bulk_write(operations, ordered=False).modified_count
+            last_id = docs[-1]["_id"]
+            db[PROGRESS_COLLECTION].update_one(
+                {"_id": progress_id},
+                {"$set": {"id_type": walked_type, "last_id": last_id, "converted": converted, "done": False,
+                          "updated_at": utcnow()}},
+                upsert=True
+            )
+            print(f"  {collection}: {converted:,} converted, at _id {last_id}")
+            # Throttle so the migration never takes more than its share of the primary
+            time.sleep(max(0.0, len(docs) / max_docs_per_second - (time.monotonic() - started)))
+
+    db[PROGRESS_COLLECTION].update_one(
+        {"_id": progress_id},
+        {"$set": {"converted": converted, "done": True, "updated_at": utcnow()}},
+        upsert=True
+    )
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME"))
+    parser.add_argument("--collections", help=f"comma-separated subset of {', '.join(DATE_FIELDS)}")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-docs-per-second", type=float, default=2000)
+    parser.add_argument("--restart", action="store_true", help="ignore saved progress and walk from the start")
+    parser.add_argument("--dry-run", action="store_true", help="only report how many strings are left")
+    args = parser.parse_args()
+    if not args.db_name:
+        parser.error("--db-name or DB_NAME is required")
+
+    names = args.collections.split(",") if args.collections else list(DATE_FIELDS)
+    unknown = set(names) - set(DATE_FIELDS)
+    if unknown:
+        parser.error(f"no date fields known for {', '.join(sorted(unknown))}")
+
+    db = MongoClient(args.mongo_url)[args.db_name]
+    for name in names:
+        if not args.dry_run:
+            started = time.perf_counter()
+            converted = migrate_collection(db, name, DATE_FIELDS[name], args.batch_size, args.max_docs_per_second,
+                                           restart=args.restart)
+            print(f"{name}: {converted:,} documents converted in {time.perf_counter() - started:.1f}s")
+        left = remaining_strings(db, name, DATE_FIELDS[name])
+        print(f"{name}: strings left {left}")
+
+    print("\nWhen no strings are left anywhere, set DATE_STRING_COMPAT=false.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Convert `messages` documents into per-pair `message_buckets`.
+
+Run it before switching workers to MESSAGE_STORAGE_MODE=bucket, then once
+more after every worker has switched, to pick up messages written during the
+rollout. Each run rebuilds the migrated buckets of every pair it visits from
+`messages`, so reruns are safe. Buckets appended by bucket-mode workers are
+never touched. `messages` is left in place; drop it once the bucket store
+has been verified.
+
+    python migrate_messages.py --dry-run    # count pairs and buckets, report sizes
+    python migrate_messages.py              # write buckets and report index sizes
+"""
+
+import argparse
+import os
+import time
+from datetime import timedelta
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING, DESCENDING, MongoClient
+
+load_dotenv()
+
+from dates import as_datetime  # noqa: E402
+from message_store import BUCKET_COLLECTION, MESSAGE_BUCKET_DAYS, MESSAGE_BUCKET_SIZE, compact_message  # noqa: E402
+
+PAIR_EXPRESSION = {"$cond": [
+    {"$lte": ["$sender_id", "$receiver_id"]},
+    {"$concat": ["$sender_id", "|", "$receiver_id"]},
+    {"$concat": ["$receiver_id", "|", "$sender_id"]},
+]}
+
+
+def collection_sizes(db, name):
+    if name not in db.list_collection_names():
+        return {"count": 0, "size_bytes": 0, "index_bytes": 0}
+    stats = db.command("collStats", name)
+    return {"count": stats["count"], "size_bytes": stats["size"], "index_bytes": stats["totalIndexSize"]}
+
+
+def pair_buckets(pair, messages, bucket_size, bucket_days):
+    """Cut one pair's messages (oldest first) into buckets of at most bucket_size spanning bucket_days"""
+    users = pair.split("|")
+    buckets, current = [], None
+    for message in messages:
+        # Buckets always store native dates, whichever form the message still has
+        created_at = as_datetime(message["created_at"])
+        if (current is None or current["count"] >= bucket_size
+                or created_at - current["start"] > timedelta(days=bucket_days)):
+            current = {"pair": pair, "users": users, "start": created_at, "end": created_at, "count": 0,
+                       "unread": {}, "messages": [], "migrated": True}
+            buckets.append(current)
+        current["messages"].append({**compact_message(message), "created_at": created_at})
+        current["count"] += 1
+        current["end"] = created_at
+        if not message.get("read"):
+            receiver = message["receiver_id"]
+            current["unread"][receiver] = current["unread"].get(receiver, 0) + 1
+    return buckets
+
+
+def migrate(db, bucket_size, bucket_days, dry_run=False):
+    buckets = db[BUCKET_COLLECTION]
+    if not dry_run:
+        buckets.create_index([("pair", ASCENDING), ("end", DESCENDING)])
+        buckets.create_index([("users", ASCENDING), ("end", DESCENDING)])
+
+    cursor = db.messages.aggregate([
+        {"$addFields": {"pair": PAIR_EXPRESSION}},
+        {"$sort": {"pair": 1, "created_at": 1}},
+    ], allowDiskUse=True)
+
+    totals = {"pairs": 0, "messages": 0, "buckets": 0}
+
+    def flush(pair, pair_messages):
+        docs = pair_buckets(pair, pair_messages, bucket_size, bucket_days)
+        totals["pairs"] += 1
+        totals["messages"] += len(pair_messages)
+        totals["buckets"] += len(docs)
+        if not dry_run:
+            buckets.delete_many({"pair": pair, "migrated": True})
+            buckets.insert_many(docs, ordered=True)
+        if totals["pairs"] % 1000 == 0:
+            print(f"  {totals['pairs']:,} pairs, {totals['messages']:,} messages")
+
+    pair, pair_messages = None, []
+    for message in cursor:
+        if message["pair"] != pair:
+            if pair_messages:
+                flush(pair, pair_messages)
+            pair, pair_messages = message["pair"], []
+        message.pop("pair")
+        # Stored by business ID (BUSINESS_ID_COLLECTIONS), message_id is the _id that compact_message drops
+        message.setdefault("message_id", message["_id"])
+        pair_messages.append(message)
+    if pair_messages:
+        flush(pair, pair_messages)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME"))
+    parser.add_argument("--bucket-size", type=int, default=MESSAGE_BUCKET_SIZE)
+    parser.add_argument("--bucket-days", type=float, default=MESSAGE_BUCKET_DAYS)
+    parser.add_argument("--dry-run", action="store_true", help="count what would be written without writing")
+    args = parser.parse_args()
+    if not args.db_name:
+        parser.error("--db-name or DB_NAME is required")
+
+    db = MongoClient(args.mongo_url)[args.db_name]
+    start = time.perf_counter()
+    totals = migrate(db, args.bucket_size, args.bucket_days, dry_run=args.dry_run)
+    elapsed = time.perf_counter() - start
+    print(f"{'Would write' if args.dry_run else 'Wrote'} {totals['buckets']:,} buckets for {totals['pairs']:,} pairs "
+          f"from {totals['messages']:,} messages in {elapsed:.1f}s")
+
+    for name in ("messages", BUCKET_COLLECTION):
+        sizes = collection_sizes(db, name)
+        print(f"  {name:<16} {sizes['count']:>12,} docs {sizes['size_bytes'] / 2**20:>10.1f}MB data "
+              f"{sizes['index_bytes'] / 2**20:>10.1f}MB indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import logging
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Callable, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# "memory" for a single worker, "mongo" to share buckets between workers
+RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("MAX_CONCURRENT_REQUESTS", "200"))
+TRUST_PROXY_HEADERS = os.environ.get("TRUST_PROXY_HEADERS", "false").lower() == "true"
+RATE_LIMIT_COLLECTION = "rate_limits"
+
+
+@dataclass
+class RateLimitRule:
+    """A token bucket applied to requests whose method and path match"""
+    name: str
+    path: str  # regex matched against the request path
+    capacity: int  # burst size
+    refill_per_second: float
+    methods: Optional[List[str]] = None
+    per: str = "user"  # "user" falls back to IP for anonymous requests; "ip" always uses the IP
+
+    def __post_init__(self):
+        self._pattern = re.compile(self.path)
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.methods is None or method in self.methods) and bool(self._pattern.match(path))
+
+
+class InMemoryBucketBackend:
+    """Token buckets in a bounded LRU dict; correct for one worker process"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def take(self, key: str, capacity: int, refill_per_second: float):
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        retry_after = 0 if allowed else (1 - tokens) / refill_per_second
+        return allowed, retry_after
+
+
+class MongoBucketBackend:
+    """Token buckets shared by all workers through one atomic update per request"""
+
+    def __init__(self, db, fail_open=True):
+        self.collection = db[RATE_LIMIT_COLLECTION]
+        self.fail_open = fail_open
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def take(self, key: str, capacity: int, refill_per_second: float):
+        now = time.time()
+        idle_seconds = capacity / refill_per_second
+        refilled = {"$min": [capacity, {"$add": [
+            {"$ifNull": ["$tokens", capacity]},
+            {"$multiply": [{"$subtract": [now, {"$ifNull": ["$ts", now]}]}, refill_per_second]},
+        ]}]}
+        try:
+            bucket = await self.collection.find_one_and_update(
+                {"_id": key},
+                [
+                    {"$set": {"tokens": refilled, "ts": now}},
+                    {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                    {"$set": {
+                        "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                        # A full bucket carries no state, so let the TTL index drop it
+                        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=idle_seconds),
+                    }},
+                ],
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except PyMongoError as e:
+            logger.error(f"Rate limit backend unavailable: {e}")
+            return self.fail_open, 1
+        allowed = bucket["allowed"]
+        retry_after = 0 if allowed else (1 - bucket["tokens"]) / refill_per_second
+        return allowed, retry_after
+
+
+def client_ip(conn: HTTPConnection) -> str:
+    if TRUST_PROXY_HEADERS:
+        forwarded = conn.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return conn.client.host if conn.client else "unknown"
+
+
+class AdmissionControlMiddleware:
+    """Sheds load before a request reaches a handler.
+
+    A global in-flight cap answers 503 immediately instead of letting requests
+    queue until they time out; per-route token buckets answer 429. Both carry
+    a Retry-After header.
+    """
+
+    def __init__(self, app, rules: List[RateLimitRule], backend=None, max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+                 identify: Optional[Callable[[HTTPConnection], Optional[str]]] = None, path_prefix: str = "/api"):
+        self.app = app
+        self.rules = rules
+        self.backend = backend or InMemoryBucketBackend()
+        self.max_concurrency = max_concurrency
+        self.identify = identify
+        self.path_prefix = path_prefix
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight >= self.max_concurrency:
+            response = JSONResponse({"detail": "Server busy, please retry"}, status_code=503, headers={"Retry-After": "1"})
+            await response(scope, receive, send)
+            return
+
+        rule = next((r for r in self.rules if r.matches(scope["method"], scope["path"])), None)
+        if rule is not None:
+            conn = HTTPConnection(scope)
+            identity = self.identify(conn) if self.identify and rule.per == "user" else None
+            key = f"{rule.name}:{'u:' + identity if identity else 'ip:' + client_ip(conn)}"
+            allowed, retry_after = await self.backend.take(key, rule.capacity, rule.refill_per_second)
+            if not allowed:
+                response = JSONResponse(
+                    {"detail": "Too many requests"},
+                    status_code=429,
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+                await response(scope, receive, send)
+                return
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
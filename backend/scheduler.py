@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_TICK_SECONDS = float(os.environ.get("SCHEDULER_TICK_SECONDS", "30"))
+SCHEDULER_LEASE_SECONDS = float(os.environ.get("SCHEDULER_LEASE_SECONDS", "600"))
+LEASE_COLLECTION = "scheduler_leases"
+
+
+@dataclass
+class PeriodicTask:
+    """A sweep run at most once per interval across all workers.
+
+    `run` returns the number of documents it touched.
+    """
+    name: str
+    interval_seconds: float
+    run: Callable[[], Awaitable[int]]
+    metrics: Dict = field(default_factory=dict)
+
+
+class Scheduler:
+    """In-process periodic task runner, safe to start in every worker.
+
+    Each task has a lease document in `scheduler_leases`. A worker runs a task
+    only after it wins that lease with one conditional update: the task must be
+    due and the lease free or expired. Two workers cannot both win.
+    """
+
+    def __init__(self, db, tick_seconds=SCHEDULER_TICK_SECONDS, lease_seconds=SCHEDULER_LEASE_SECONDS):
+        self.leases = db[LEASE_COLLECTION]
+        self.tick_seconds = tick_seconds
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.tasks: Dict[str, PeriodicTask] = {}
+        self._next_check: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, task: PeriodicTask):
+        self.tasks[task.name] = task
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            for task in self.tasks.values():
+                if time.monotonic() < self._next_check.get(task.name, 0):
+                    continue
+                try:
+                    await self.run_if_leader(task)
+                except PyMongoError as e:
+                    logger.error(f"Scheduler could not run {task.name}: {e}")
+            await asyncio.sleep(self.tick_seconds)
+
+    async def _acquire(self, task: PeriodicTask) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await self.leases.find_one_and_update(
+                {
+                    "_id": task.name,
+                    "$and": [
+                        # No next_run_at: a first run that never finished (cancelled, or its final write failed)
+                        {"$or": [{"next_run_at": {"$lte": now}}, {"next_run_at": {"$exists": False}}]},
+                        {"$or": [{"lease_until": {"$lte": now}}, {"owner": self.worker_id}]},
+                    ]
+                },
+                {
+                    "$set": {"owner": self.worker_id, "lease_until": now + timedelta(seconds=self.lease_seconds)},
+                    # Due now until the run records the next one, so an unfinished run is retried after the lease
+                    "$setOnInsert": {"next_run_at": now},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return True
+        except DuplicateKeyError:
+            # The lease document exists but is held elsewhere or not yet due
+            return False
+
+    async def run_if_leader(self, task: PeriodicTask) -> bool:
+        if not await self._acquire(task):
+            lease = await self.leases.find_one({"_id": task.name}, {"next_run_at": 1})
+            self._schedule_local_check(task, lease.get("next_run_at") if lease else None)
+            return False
+
+        started = time.perf_counter()
+        started_at = datetime.now(timezone.utc)
+        touched, error = 0, None
+        try:
+            touched = await task.run()
+        except Exception as e:
+            error = str(e)
+            logger.error(f"Scheduled task {task.name} failed: {e}", exc_info=True)
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        next_run_at = started_at + timedelta(seconds=task.interval_seconds)
+
+        task.metrics = {
+            "last_run_at": started_at,
+            "duration_ms": duration_ms,
+            "documents_touched": touched,
+            "error": error,
+            "runs": task.metrics.get("runs", 0) + 1,
+        }
+        await self.leases.update_one(
+            {"_id": task.name, "owner": self.worker_id},
+            {
+                "$set": {
+                    "lease_until": datetime.now(timezone.utc),
+                    "next_run_at": next_run_at,
+                    "last_run": {
+                        "worker": self.worker_id,
+                        "started_at": started_at,
+                        "duration_ms": duration_ms,
+                        "documents_touched": touched,
+                        "error": error,
+                    }
+                },
+                "$inc": {"runs": 1, "documents_touched_total": touched}
+            }
+        )
+        self._schedule_local_check(task, next_run_at)
+        logger.info(f"Scheduled task {task.name} touched {touched} documents in {duration_ms}ms")
+        return True
+
+    def _schedule_local_check(self, task: PeriodicTask, next_run_at):
+        # Skip lease round trips until the task is due again
+        if next_run_at is None:
+            self._next_check[task.name] = time.monotonic() + self.tick_seconds
+            return
+        if next_run_at.tzinfo is None:
+            next_run_at = next_run_at.replace(tzinfo=timezone.utc)
+        wait = (next_run_at - datetime.now(timezone.utc)).total_seconds()
+        self._next_check[task.name] = time.monotonic() + max(0.0, wait)
+
+    async def status(self):
+        """Cluster-wide view of every task's lease and last run"""
+        leases = await self.leases.find({"_id": {"$in": list(self.tasks)}}).to_list(len(self.tasks))
+        by_name = {lease.pop("_id"): lease for lease in leases}
+        return [
+            {"task": name, "interval_seconds": task.interval_seconds, **by_name.get(name, {})}
+            for name, task in self.tasks.items()
+        ]
+
+
+async def batched_update(collection, query: dict, update: dict, key: str, batch_size: int = 1000) -> int:
+    """Apply `update` to documents matching `query` in id batches.
+
+    Each batch is bounded, so a large sweep never holds one long-running write
+    and other operations interleave between batches.
+    """
+    touched = 0
+    while True:
+        docs = await collection.find(query, {"_id": 0, key: 1}).limit(batch_size).to_list(batch_size)
+        if not docs:
+            return touched
+        result = await collection.update_many({**query, key: {"$in": [d[key] for d in docs]}}, update)
+        touched += result.modified_count
+        if len(docs) < batch_size or result.modified_count == 0:
+            return touched
+        await asyncio.sleep(0)
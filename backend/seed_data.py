@@ -0,0 +1,362 @@
+"""Seeded synthetic dataset generator for scale testing.
+
+Produces coherent users, profiles, jobs, applications and message threads in
+the same shapes `register`, `create_job`, `apply_to_job` and `send_message`
+write. Every ID and attribute is derived from (seed, entity index), so worker
+processes can generate disjoint index ranges in parallel and still agree on
+cross-references (job -> recruiter, application -> job, message -> application).
+
+    python seed_data.py --db-name naya_job_scale --users 1000000 --jobs 200000 --workers 8 --drop
+"""
+
+import argparse
+import hashlib
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone, timedelta
+
+import bcrypt
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from geo import location_fields
+
+load_dotenv()
+
+from applicant_counts import count_stages, empty_applicant_counts, tally  # noqa: E402
+from business_ids import KEYED_COLLECTIONS, to_stored  # noqa: E402
+
+SKILLS = [
+    "Python", "JavaScript", "React", "SQL", "Java", "Node.js", "AWS", "Docker", "TypeScript", "MongoDB",
+    "Excel", "Communication", "Sales", "Marketing", "Django", "FastAPI", "Kubernetes", "Go", "C++", "Figma",
+    "Tally", "Accounting", "Customer Support", "Data Analysis", "Machine Learning", "Spring Boot", "Flutter",
+    "Android", "iOS", "Photoshop", "SEO", "Content Writing", "Recruitment", "HR", "Operations", "Logistics",
+]
+LOCATIONS = [
+    "Bengaluru, Karnataka", "Pune, Maharashtra", "Mumbai, Maharashtra", "Hyderabad, Telangana",
+    "Delhi, Delhi", "Gurugram, Haryana", "Noida, Uttar Pradesh", "Chennai, Tamil Nadu", "Kolkata, West Bengal",
+    "Ahmedabad, Gujarat", "Jaipur, Rajasthan", "Kochi, Kerala", "Indore, Madhya Pradesh", "Remote",
+]
+TITLES = ["Engineer", "Developer", "Analyst", "Manager", "Executive", "Designer", "Consultant", "Associate"]
+JOB_TYPES = ["full_time", "full_time", "full_time", "part_time", "contract", "remote"]
+PLANS = ["free"] * 6 + ["basic"] * 2 + ["premium", "enterprise"]
+PLAN_JOB_LIMITS = {"free": 1, "basic": 10, "premium": 50, "enterprise": 999}
+APPLICATION_STATUSES = ["pending"] * 6 + ["shortlisted"] * 2 + ["rejected", "accepted"]
+RECRUITER_SHARE = 0.1
+HISTORY_DAYS = 365
+BATCH_SIZE = 1000
+
+
+def zipf_cum_weights(n, s=1.1):
+    """Cumulative weights for a Zipf distribution over n ranked items"""
+    return list(itertools.accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def rng_for(seed, kind, index):
+    return random.Random(f"{seed}:{kind}:{index}")
+
+
+def hex_id(seed, kind, index):
+    return hashlib.md5(f"{seed}:{kind}:{index}".encode()).hexdigest()[:12]
+
+
+def timestamp(rng, now, max_days=HISTORY_DAYS):
+    return now - timedelta(seconds=rng.uniform(0, max_days * 86400))
+
+
+class Generator:
+    """Derives every document from the seed and entity index"""
+
+    def __init__(self, seed, users, jobs, applications_per_seeker, messages_per_thread, chat_share):
+        self.seed = seed
+        self.recruiters = max(1, int(users * RECRUITER_SHARE))
+        self.seekers = max(1, users - self.recruiters)
+        self.jobs = jobs
+        self.applications_per_seeker = applications_per_seeker
+        self.messages_per_thread = messages_per_thread
+        self.chat_share = chat_share
+        self.now = datetime.now(timezone.utc)
+        self.skill_weights = zipf_cum_weights(len(SKILLS))
+        self.location_weights = zipf_cum_weights(len(LOCATIONS), s=0.8)
+        # A few hot recruiters own most postings and a few viral jobs draw most applicants
+        self.recruiter_weights = zipf_cum_weights(self.recruiters, s=1.2)
+        self.job_weights = zipf_cum_weights(self.jobs, s=1.0)
+        # One shared hash keeps generation CPU-cheap; passlib verifies it like any other
+        self.password_hash = bcrypt.hashpw(b"SeedPassword123!", bcrypt.gensalt()).decode()
+
+    def seeker_id(self, i):
+        return f"user_{hex_id(self.seed, 'seeker', i)}"
+
+    def recruiter_id(self, i):
+        return f"user_{hex_id(self.seed, 'recruiter', i)}"
+
+    def job_id(self, j):
+        return f"job_{hex_id(self.seed, 'job', j)}"
+
+    def job_recruiter(self, j):
+        rng = rng_for(self.seed, "job-owner", j)
+        return rng.choices(range(self.recruiters), cum_weights=self.recruiter_weights)[0]
+
+    def skills(self, rng, k):
+        return list(dict.fromkeys(rng.choices(SKILLS, cum_weights=self.skill_weights, k=k)))
+
+    # ---- users & profiles ----
+
+    def seeker_docs(self, i):
+        rng = rng_for(self.seed, "seeker", i)
+        user_id = self.seeker_id(i)
+        salary_min = rng.choice([None, 200000, 400000, 600000, 900000, 1500000])
+        user = {
+            "user_id": user_id,
+            "email": f"seeker{i}_{self.seed}@example.com",
+            "name": f"Seeker {i}",
+            "role": "job_seeker",
+            "password_hash": self.password_hash,
+            "picture": None,
+            "created_at": timestamp(rng, self.now),
+        }
+        profile = {
+            "user_id": user_id,
+            "skills": self.skills(rng, rng.randint(0, 8)),
+            "experience_years": min(30, int(rng.expovariate(1 / 4))),
+            "location": rng.choices(LOCATIONS, cum_weights=self.location_weights)[0],
+            "resume_url": None,
+            "preferred_job_types": rng.sample(["full_time", "part_time", "contract", "remote"], rng.randint(0, 2)),
+            "preferred_salary_min": salary_min,
+            "preferred_salary_max": salary_min * 2 if salary_min else None,
+            "bio": None,
+        }
+        profile.update(location_fields(profile["location"]))
+        return user, profile
+
+    def recruiter_docs(self, i):
+        rng = rng_for(self.seed, "recruiter", i)
+        user_id = self.recruiter_id(i)
+        plan = rng.choice(PLANS)
+        user = {
+            "user_id": user_id,
+            "email": f"recruiter{i}_{self.seed}@example.com",
+            "name": f"Recruiter {i}",
+            "role": "recruiter",
+            "password_hash": self.password_hash,
+            "picture": None,
+            "created_at": timestamp(rng, self.now),
+        }
+        start = timestamp(rng, self.now, 60) if plan != "free" else None
+        profile = {
+            "user_id": user_id,
+            "company_name": f"Company {i}",
+            "company_website": None,
+            "company_description": None,
+            "subscription_plan": plan,
+            "subscription_status": "active" if plan != "free" else "inactive",
+            "subscription_start": start,
+            "subscription_end": start + timedelta(days=30) if start else None,
+            "jobs_posted_this_month": rng.randint(0, 3),
+            "job_limit": PLAN_JOB_LIMITS[plan],
+            "quota_period": self.now.strftime("%Y-%m"),
+        }
+        return user, profile
+
+    # ---- jobs ----
+
+    def job_doc(self, j):
+        rng = rng_for(self.seed, "job", j)
+        owner = self.job_recruiter(j)
+        skills = self.skills(rng, rng.randint(2, 6))
+        posted_at = timestamp(rng, self.now)
+        salary_min = rng.choice([None, 250000, 400000, 600000, 900000, 1200000, 2000000])
+        job = {
+            "job_id": self.job_id(j),
+            "recruiter_id": self.recruiter_id(owner),
+            "title": f"{skills[0]} {rng.choice(TITLES)}",
+            "description": f"We are hiring for a role requiring {', '.join(skills)}.",
+            "company_name": f"Company {owner}",
+            "location": rng.choices(LOCATIONS, cum_weights=self.location_weights)[0],
+            "salary_min": salary_min,
+            "salary_max": int(salary_min * 1.5) if salary_min else None,
+            "job_type": rng.choice(JOB_TYPES),
+            "required_skills": skills,
+            "experience_required": min(15, int(rng.expovariate(1 / 3))),
+            "status": "approved" if rng.random() < 0.85 else rng.choice(["closed", "pending", "rejected"]),
+            # Filled in by seed_applicant_counts once every application is written
+            "applicant_counts": empty_applicant_counts(),
+            "posted_at": posted_at,
+            "approved_at": posted_at,
+        }
+        job.update(location_fields(job["location"]))
+        return job
+
+    # ---- applications & messages ----
+
+    def seeker_activity(self, i):
+        """Applications of seeker i plus the chat threads that grew out of them"""
+        rng = rng_for(self.seed, "applications", i)
+        seeker_id = self.seeker_id(i)
+        count = min(self.jobs, int(rng.expovariate(1 / self.applications_per_seeker)))
+        job_indices = set()
+        while len(job_indices) < count:
+            job_indices.update(rng.choices(range(self.jobs), cum_weights=self.job_weights, k=count - len(job_indices)))
+
+        applications, messages = [], []
+        for j in sorted(job_indices):
+            recruiter_id = self.recruiter_id(self.job_recruiter(j))
+            applied_at = timestamp(rng, self.now, 180)
+            status = rng.choice(APPLICATION_STATUSES)
+            application_id = f"app_{hex_id(self.seed, f'app:{i}', j)}"
+            applications.append({
+                "application_id": application_id,
+                "job_id": self.job_id(j),
+                "job_seeker_id": seeker_id,
+                "recruiter_id": recruiter_id,
+                "status": status,
+                "cover_letter": None,
+                "resume_url": None,
+                "applied_at": applied_at,
+                "updated_at": applied_at + timedelta(days=rng.randint(0, 10)) if status != "pending" else applied_at,
+            })
+            if rng.random() < self.chat_share:
+                messages.extend(self.thread(rng, application_id, seeker_id, recruiter_id, applied_at))
+        return applications, messages
+
+    def thread(self, rng, application_id, seeker_id, recruiter_id, started_at):
+        # Pareto lengths: most threads are short, a few run to hundreds of messages
+        length = min(2000, max(1, int(rng.paretovariate(1.3) * self.messages_per_thread / 4)))
+        created = started_at
+        messages = []
+        for n in range(length):
+            created = created + timedelta(minutes=rng.expovariate(1 / 90))
+            recruiter_sends = rng.random() < 0.5
+            messages.append({
+                "message_id": f"msg_{hex_id(self.seed, f'msg:{application_id}', n)}",
+                "sender_id": recruiter_id if recruiter_sends else seeker_id,
+                "receiver_id": seeker_id if recruiter_sends else recruiter_id,
+                "content": f"Message {n} about {application_id}",
+                "application_id": application_id,
+                "created_at": created,
+                "read": created < self.now - timedelta(days=1),
+            })
+        return messages
+
+
+# ============ WRITERS ============
+
+_worker = {}
+
+
+def _init_worker(mongo_url, db_name, generator_args):
+    _worker["db"] = MongoClient(mongo_url)[db_name]
+    _worker["gen"] = Generator(*generator_args)
+
+
+def _flush(collection, docs, counts):
+    if docs:
+        key = KEYED_COLLECTIONS.get(collection)
+        if key:
+            docs[:] = [to_stored(doc, key) for doc in docs]
+        _worker["db"][collection].insert_many(docs, ordered=False)
+        counts[collection] = counts.get(collection, 0) + len(docs)
+        docs.clear()
+
+
+def _write_range(task):
+    """Generate and insert one index range of one entity kind"""
+    kind, start, stop = task
+    gen = _worker["gen"]
+    counts = {}
+    buffers = {}
+
+    def add(collection, doc):
+        buffer = buffers.setdefault(collection, [])
+        buffer.append(doc)
+        if len(buffer) >= BATCH_SIZE:
+            _flush(collection, buffer, counts)
+
+    for index in range(start, stop):
+        if kind == "seekers":
+            user, profile = gen.seeker_docs(index)
+            add("users", user)
+            add("job_seeker_profiles", profile)
+        elif kind == "recruiters":
+            user, profile = gen.recruiter_docs(index)
+            add("users", user)
+            add("recruiter_profiles", profile)
+        elif kind == "jobs":
+            add("jobs", gen.job_doc(index))
+        elif kind == "activity":
+            applications, messages = gen.seeker_activity(index)
+            for doc in applications:
+                add("applications", doc)
+            for doc in messages:
+                add("messages", doc)
+
+    for collection, buffer in buffers.items():
+        _flush(collection, buffer, counts)
+    return counts
+
+
+def seed_applicant_counts(db):
+    """Set applicant_counts on every job that received applications, as apply_to_job would have"""
+    key = "_id" if "jobs" in KEYED_COLLECTIONS else "job_id"
+    counts = tally(db.applications.aggregate(count_stages({}), allowDiskUse=True))
+    operations = [UpdateOne({key: job_id}, {"$set": {"applicant_counts": job_counts}})
+                  for job_id, job_counts in counts.items()]
+    for start in range(0, len(operations), BATCH_SIZE):
+        db.jobs.bulk_write(operations[start:start + BATCH_SIZE], ordered=False)
+    return len(operations)
+
+
+def plan_tasks(gen, chunk):
+    tasks = []
+    for kind, total in (("recruiters", gen.recruiters), ("seekers", gen.seekers), ("jobs", gen.jobs), ("activity", gen.seekers)):
+        tasks.extend((kind, start, min(start + chunk, total)) for start in range(0, total, chunk))
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", required=True, help="target database; use a dedicated scale-test database")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--applications-per-seeker", type=float, default=4.0)
+    parser.add_argument("--messages-per-thread", type=float, default=12.0)
+    parser.add_argument("--chat-share", type=float, default=0.15, help="fraction of applications with a chat thread")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--chunk", type=int, default=5000, help="entities per worker task")
+    parser.add_argument("--drop", action="store_true", help="drop the seeded collections first")
+    args = parser.parse_args()
+
+    generator_args = (args.seed, args.users, args.jobs, args.applications_per_seeker, args.messages_per_thread, args.chat_share)
+    db = MongoClient(args.mongo_url)[args.db_name]
+    if args.drop:
+        for name in ("users", "job_seeker_profiles", "recruiter_profiles", "jobs", "applications", "messages"):
+            db.drop_collection(name)
+
+    gen = Generator(*generator_args)
+    tasks = plan_tasks(gen, args.chunk)
+    print(f"Seeding {args.db_name}: {gen.seekers} seekers, {gen.recruiters} recruiters, {gen.jobs} jobs "
+          f"in {len(tasks)} tasks on {args.workers} workers")
+
+    start = time.perf_counter()
+    totals = {}
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(args.mongo_url, args.db_name, generator_args)) as pool:
+        for counts in pool.map(_write_range, tasks):
+            for collection, n in counts.items():
+                totals[collection] = totals.get(collection, 0) + n
+    counted = seed_applicant_counts(db)
+    elapsed = time.perf_counter() - start
+
+    for collection, n in sorted(totals.items()):
+        print(f"  {collection:<22} {n:>12,}")
+    print(f"  applicant_counts set on {counted:,} jobs")
+    print(f"Inserted {sum(totals.values()):,} documents in {elapsed:.1f}s ({sum(totals.values()) / elapsed:,.0f} docs/s)")
+
+
+if __name__ == "__main__":
+    main()
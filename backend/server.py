@@ -1,48 +1,73 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Cookie, Response, Request, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
-from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
 import uuid
+import hashlib
 from datetime import datetime, timezone, timedelta
 import jwt
-import razorpay
 from passlib.context import CryptContext
-import httpx
-# from emergentintegrations.llm.chat import LlmChat, UserMessage
-class LlmChat:
-    def __init__(self, *args, **kwargs): pass
-    def with_model(self, *args, **kwargs): return self
-    async def send_message(self, *args, **kwargs): return ""
-class UserMessage:
-    def __init__(self, *args, **kwargs): pass
-
+from dotenv import load_dotenv
 
 ROOT_DIR = Path(__file__).parent
+# Before the local imports below, which read their settings at import time
 load_dotenv(ROOT_DIR / '.env', override=True)
 
+from applicant_counts import APPLICATION_STATUSES, count_stages, empty_applicant_counts, tally
+from archival import ARCHIVE_ENABLED, ARCHIVE_SWEEP_SECONDS, Archiver
+from auth_tokens import ACCEPT_LEGACY_TOKENS, REVOCATION_COLLECTION, RevocationList, TokenIssuer
+from business_ids import BUSINESS_KEYS
+from cache import CACHES, TTLCache
+from change_streams import ChangeStreamListener
+from database import RoutedDatabase, create_client, read_profile
+from dates import as_datetime, date_range, utcnow
+from geo import geocode, location_fields, location_update, parse_point
+from integrations import (
+    close_http_client, get_http_client, get_razorpay_client, llm_classes, razorpay_module, warm_http_client,
+)
+from log_pipeline import request_id_var, setup_logging, stop_logging
+from message_store import create_message_store
+from rate_limit import (
+    RATE_LIMIT_BACKEND, RATE_LIMIT_ENABLED, AdmissionControlMiddleware, InMemoryBucketBackend,
+    MongoBucketBackend, RateLimitRule,
+)
+from scheduler import SCHEDULER_ENABLED, PeriodicTask, Scheduler, batched_update
+from singleflight import FLIGHTS, SingleFlight, query_key
+from slow_query import SLOW_QUERY_ENABLED, slow_query_recorder, slow_query_report
+from talent_index import TALENT_PROJECTION, ApplicantRanking, TalentIndex
+from typeahead import KINDS as TYPEAHEAD_KINDS, TYPEAHEAD_PROJECTION, TypeaheadIndex
+
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-# Razorpay configuration
-razorpay_key_id = os.environ.get('RAZORPAY_KEY_ID', '')
-razorpay_key_secret = os.environ.get('RAZORPAY_KEY_SECRET', '')
-razorpay_client = razorpay.Client(auth=(razorpay_key_id, razorpay_key_secret)) if razorpay_key_id and razorpay_key_secret else None
+client = create_client(mongo_url)
+db = RoutedDatabase(client[os.environ['DB_NAME']])
+# Invalidates in-process caches when any worker writes; caches subscribe where they are defined
+change_listener = ChangeStreamListener(db)
+# Moves closed jobs and old messages to *_archive collections; handlers read through on a miss
+archiver = Archiver(db)
 
 # JWT configuration
 JWT_SECRET = os.environ.get('JWT_SECRET_KEY')
 if not JWT_SECRET:
     raise RuntimeError("JWT_SECRET_KEY environment variable is required")
 JWT_ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_DAYS = 7
+# Legacy single tokens, or short-lived access tokens with role claims plus refresh tokens (AUTH_TOKEN_MODE)
+token_issuer = TokenIssuer(JWT_SECRET, JWT_ALGORITHM)
+revocations = RevocationList(db)
+change_listener.subscribe(REVOCATION_COLLECTION, revocations.apply_change)
 
 # Fix for passlib + bcrypt >= 4.0.0 compatibility
 import bcrypt
@@ -54,16 +79,61 @@ if not hasattr(bcrypt, "__about__"):
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await on_startup()
+    try:
+        yield
+    finally:
+        await on_shutdown()
+
 # Create the main app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 PUBLIC_BASE_URL = os.environ.get("PUBLIC_BASE_URL", "http://localhost:8001").rstrip("/")
 
+# Outbound integrations; startup opens a connection to each host before /readyz reports ready
+OAUTH_SESSION_URL = "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data"
+PLACFY_APPLICATION_WEBHOOK_URL = "http://localhost:8000/api/v1/jobs/webhook/application/"
+HTTP_WARM_URLS = [url.strip() for url in os.environ.get(
+    "HTTP_WARM_URLS", f"{OAUTH_SESSION_URL},{PLACFY_APPLICATION_WEBHOOK_URL}"
+).split(",") if url.strip()]
 
 
 
-import traceback
-from fastapi.responses import JSONResponse
+
+# Rate limiting - first matching rule wins; added before CORS so 429/503
+# responses still carry CORS headers
+RATE_LIMIT_RULES = [
+    RateLimitRule("login", r"^/api/auth/login$", capacity=10, refill_per_second=10 / 60, methods=["POST"], per="ip"),
+    RateLimitRule("register", r"^/api/auth/register$", capacity=5, refill_per_second=5 / 300, methods=["POST"], per="ip"),
+    RateLimitRule("job_search", r"^/api/jobs$", capacity=60, refill_per_second=5, methods=["GET"]),
+    RateLimitRule("api", r"^/api/", capacity=120, refill_per_second=20),
+]
+
+def rate_limit_identity(conn) -> Optional[str]:
+    """Key buckets by user_id for valid JWTs and by session for OAuth tokens, without touching the DB"""
+    token = conn.cookies.get("session_token")
+    auth_header = conn.headers.get("Authorization")
+    if not token and auth_header and auth_header.startswith("Bearer "):
+        token = auth_header.split(" ")[1]
+    if not token:
+        return None
+    if token.startswith("eyJ"):
+        try:
+            return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM]).get("user_id")
+        except jwt.PyJWTError:
+            return None
+    return "s:" + hashlib.sha256(token.encode()).hexdigest()[:16]
+
+rate_limit_backend = MongoBucketBackend(db) if RATE_LIMIT_BACKEND == "mongo" else InMemoryBucketBackend()
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        rules=RATE_LIMIT_RULES,
+        backend=rate_limit_backend,
+        identify=rate_limit_identity,
+    )
 
 # Add CORS middleware - reads allowed origins from CORS_ORIGINS env var
 _cors_env = os.environ.get("CORS_ORIGINS", "")
@@ -87,21 +157,35 @@ static_dir = Path(__file__).parent / "static"
 static_dir.mkdir(exist_ok=True)
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Tag every log record of a request with an ID the client can quote back"""
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    # Not reset afterwards: each request runs in its own task context, and the
+    # exception handler further out still needs the ID
+    request_id_var.set(request_id)
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    error_msg = f"Global Exception: {exc}\n{traceback.format_exc()}"
-    logger.error(error_msg)
-    # Also write to a file for debugging
-    with open("backend_error.log", "a") as f:
-        f.write(f"\n[{datetime.now()}] {error_msg}\n")
+    # Goes through the queue-based pipeline: the JSON error log is written by
+    # the listener thread, never on the event loop
+    logger.error(
+        f"Global Exception: {exc}",
+        exc_info=(type(exc), exc, exc.__traceback__),
+        extra={"method": request.method, "path": request.url.path},
+    )
     return JSONResponse(
         status_code=500,
-        content={"message": "Internal Server Error", "detail": str(exc)},
+        content={"message": "Internal Server Error", "detail": str(exc), "request_id": request_id_var.get()},
+        headers={"X-Request-ID": request_id_var.get() or ""},
     )
 
 api_router = APIRouter(prefix="/api")
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # ============ MODELS ============
@@ -114,6 +198,12 @@ class User(BaseModel):
     picture: Optional[str] = None
     created_at: datetime
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 class UserCreate(BaseModel):
     email: EmailStr
     password: str
@@ -222,6 +312,103 @@ class SubscriptionSyncRequest(BaseModel):
     job_limit: Optional[int] = None
     secret: str
 
+# ============ SUBSCRIPTION QUOTA ============
+
+# Job posting limits per plan (jobs/month)
+PLAN_JOB_LIMITS = {
+    "free": 1,
+    "basic": 10,
+    "premium": 50,
+    "enterprise": 999
+}
+
+# Recomputes the precomputed `job_limit` on a recruiter profile: the Placfy
+# custom_job_limit override if set, otherwise the plan's limit
+JOB_LIMIT_STAGE = {"$set": {"job_limit": {"$ifNull": ["$custom_job_limit", {"$switch": {
+    "branches": [{"case": {"$eq": ["$subscription_plan", plan]}, "then": limit} for plan, limit in PLAN_JOB_LIMITS.items()],
+    "default": 0
+}}]}}}
+
+def current_quota_period() -> str:
+    """Calendar month that jobs_posted_this_month counts against"""
+    return datetime.now(timezone.utc).strftime("%Y-%m")
+
+def literal_set(fields: dict) -> dict:
+    """$set stage for a pipeline update; $literal keeps user strings like "$x" from being read as field paths"""
+    return {"$set": {k: {"$literal": v} for k, v in fields.items()}}
+
+def posted_this_period(period: str) -> dict:
+    """jobs_posted_this_month as of `period`: a count left over from an earlier month is 0"""
+    return {"$cond": [
+        {"$lt": [{"$ifNull": ["$quota_period", period]}, period]},
+        0,
+        {"$ifNull": ["$jobs_posted_this_month", 0]}
+    ]}
+
+async def reserve_job_quota(user_id: str, count: int = 1) -> Optional[dict]:
+    """Check and reserve `count` job posts in one atomic round trip.
+
+    Returns the updated profile, or None if the recruiter has no active plan
+    or not enough quota left. Concurrent posts cannot overshoot the limit
+    because the check and the increment happen in the same document update.
+    A profile still counting last month is reset in that same update, so a
+    new month's quota doesn't wait for reset_monthly_quotas.
+    """
+    period = current_quota_period()
+    return await db.recruiter_profiles.find_one_and_update(
+        {
+            "user_id": user_id,
+            "$or": [{"subscription_plan": "free"}, {"subscription_status": "active"}],
+            "$expr": {"$lte": [{"$add": [posted_this_period(period), count]}, "$job_limit"]}
+        },
+        [{"$set": {"jobs_posted_this_month": {"$add": [posted_this_period(period), count]}, "quota_period": period}}],
+        projection={"_id": 0, "jobs_posted_this_month": 1, "job_limit": 1, "quota_period": 1},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def release_job_quota(user_id: str, count: int, reservation: dict):
+    """Give back a reservation whose job insert failed, unless its month has already been reset"""
+    await db.recruiter_profiles.update_one(
+        {"user_id": user_id, "quota_period": reservation["quota_period"]},
+        {"$inc": {"jobs_posted_this_month": -count}}
+    )
+
+async def reserve_job_quota_or_raise(user_id: str, count: int = 1) -> dict:
+    reservation = await reserve_job_quota(user_id, count)
+    if reservation is not None:
+        return reservation
+    
+    # Rejected: read the profile only now, to explain why
+    profile = await db.recruiter_profiles.find_one({"user_id": user_id}, {"_id": 0})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Recruiter profile not found")
+    
+    subscription_plan = profile.get("subscription_plan", "free")
+    subscription_status = profile.get("subscription_status", "inactive")
+    
+    # Check if subscription is active (except for free plan's first job)
+    if subscription_plan != "free" and subscription_status != "active":
+        raise HTTPException(
+            status_code=402,
+            detail="Your subscription has expired. Please renew to post more jobs."
+        )
+    
+    job_limit = profile.get("custom_job_limit")
+    if job_limit is None:
+        job_limit = PLAN_JOB_LIMITS.get(subscription_plan, 0)
+    
+    if profile.get("job_limit") is None:
+        # Profile predates the precomputed limit: backfill it and retry once
+        await db.recruiter_profiles.update_one({"user_id": user_id}, [JOB_LIMIT_STAGE])
+        reservation = await reserve_job_quota(user_id, count)
+        if reservation is not None:
+            return reservation
+    
+    raise HTTPException(
+        status_code=402,
+        detail=f"You have reached your job posting limit ({job_limit} jobs/month) for the {subscription_plan} plan. Please upgrade your subscription."
+    )
+
 # ============ AUTH HELPERS ============
 
 async def get_current_user(request: Request, session_token: Optional[str] = Cookie(None)) -> User:
@@ -240,23 +427,38 @@ async def get_current_user(request: Request, session_token: Optional[str] = Cook
     # Check if it's a JWT token (for email/password auth)
     if token.startswith('eyJ'):
         try:
-            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+            payload = token_issuer.decode(token)
             user_id = payload.get('user_id')
             if not user_id:
-                print(f"DEBUG AUTH: No user_id in payload: {payload}")
+                logger.info("Auth rejected: no user_id in token payload")
+                raise HTTPException(status_code=401, detail="Invalid token")
+            if revocations.is_revoked(payload):
+                logger.info(f"Auth rejected: token of {user_id} revoked")
+                raise HTTPException(status_code=401, detail="Token revoked")
+            
+            token_type = payload.get('typ')
+            if token_type == 'access':
+                # Stateless: everything a handler needs is in the signed claims
+                return User(**{k: v for k, v in payload.items() if k in User.model_fields})
+            if token_type is not None or not ACCEPT_LEGACY_TOKENS:
+                logger.info(f"Auth rejected: {token_type or 'legacy'} token used for access")
                 raise HTTPException(status_code=401, detail="Invalid token")
             
             user_doc = await db.users.find_one({"user_id": user_id}, {"_id": 0})
             if not user_doc:
-                print(f"DEBUG AUTH: User {user_id} not found in DB")
+                logger.info(f"Auth rejected: user {user_id} not found")
                 raise HTTPException(status_code=401, detail="User not found")
+            if payload.get("ver", 0) < user_doc.get("token_version", 0):
+                # Outlives the in-memory entry, which expires before tokens issued without exp do
+                logger.info(f"Auth rejected: token of {user_id} predates a revoke_user")
+                raise HTTPException(status_code=401, detail="Token revoked")
             
             return User(**user_doc)
         except jwt.ExpiredSignatureError:
-            print("DEBUG AUTH: Token expired")
+            logger.info("Auth rejected: token expired")
             raise HTTPException(status_code=401, detail="Token expired")
         except jwt.PyJWTError as e:
-            print(f"DEBUG AUTH: PyJWTError: {e}")
+            logger.info(f"Auth rejected: {e}")
             raise HTTPException(status_code=401, detail="Invalid token")
     
     # Otherwise, check session in database (for OAuth)
@@ -264,12 +466,8 @@ async def get_current_user(request: Request, session_token: Optional[str] = Cook
     if not session_doc:
         raise HTTPException(status_code=401, detail="Invalid session")
     
-    expires_at = session_doc["expires_at"]
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    if expires_at < datetime.now(timezone.utc):
+    expires_at = as_datetime(session_doc["expires_at"])
+    if expires_at < utcnow():
         raise HTTPException(status_code=401, detail="Session expired")
     
     user_doc = await db.users.find_one({"user_id": session_doc["user_id"]}, {"_id": 0})
@@ -312,7 +510,7 @@ async def register(user_data: UserCreate):
         "role": user_data.role,
         "password_hash": hashed_password,
         "picture": None,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": utcnow()
     }
     
     await db.users.insert_one(user_doc)
@@ -331,6 +529,7 @@ async def register(user_data: UserCreate):
             "bio": None
         }
         await db.job_seeker_profiles.insert_one(profile_doc)
+        talent_index.update(profile_doc)
     elif user_data.role == "recruiter":
         profile_doc = {
             "user_id": user_id,
@@ -341,15 +540,13 @@ async def register(user_data: UserCreate):
             "subscription_status": "inactive",
             "subscription_start": None,
             "subscription_end": None,
-            "jobs_posted_this_month": 0
+            "jobs_posted_this_month": 0,
+            "job_limit": PLAN_JOB_LIMITS["free"],
+            "quota_period": current_quota_period()
         }
         await db.recruiter_profiles.insert_one(profile_doc)
     
-    # Create JWT token
-    token_data = {"user_id": user_id}
-    token = jwt.encode(token_data, JWT_SECRET, algorithm=JWT_ALGORITHM)
-    
-    return {"token": token, "user": User(**{k: v for k, v in user_doc.items() if k != "password_hash"})}
+    return {**token_issuer.issue(user_doc), "user": User(**{k: v for k, v in user_doc.items() if k != "password_hash"})}
 
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
@@ -361,14 +558,34 @@ async def login(credentials: UserLogin):
     if not pwd_context.verify(credentials.password, user_doc.get("password_hash", "")):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Create JWT token
-    token_data = {"user_id": user_doc["user_id"]}
-    token = jwt.encode(token_data, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    tokens = token_issuer.issue(user_doc)
     
     user_doc.pop("_id", None)
     user_doc.pop("password_hash", None)
     
-    return {"token": token, "user": User(**user_doc)}
+    return {**tokens, "user": User(**user_doc)}
+
+@api_router.post("/auth/refresh")
+async def refresh_tokens(data: RefreshRequest):
+    """Exchange a refresh token for a new access/refresh pair (stateless token mode)"""
+    try:
+        claims = token_issuer.decode(data.refresh_token)
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if claims.get("typ") != "refresh":
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    
+    # Single use: a second use means the token leaked, so end every session of the user
+    if not await revocations.revoke_token(claims):
+        logger.warning(f"Refresh token reused for {claims['user_id']}, revoking all of their tokens")
+        await revocations.revoke_user(claims["user_id"])
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    
+    # The one database read per access token lifetime: picks up role changes and revoke_user
+    user_doc = await db.users.find_one({"user_id": claims["user_id"]}, {"_id": 0, "password_hash": 0})
+    if not user_doc or user_doc.get("token_version", 0) != claims.get("ver", 0):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return token_issuer.issue(user_doc)
 
 @api_router.get("/auth/session")
 async def get_session_data(request: Request):
@@ -378,13 +595,12 @@ async def get_session_data(request: Request):
         raise HTTPException(status_code=400, detail="Missing session_id")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-                headers={"X-Session-ID": session_id}
-            )
-            response.raise_for_status()
-            oauth_data = response.json()
+        response = await get_http_client().get(
+            OAUTH_SESSION_URL,
+            headers={"X-Session-ID": session_id}
+        )
+        response.raise_for_status()
+        oauth_data = response.json()
     except Exception as e:
         logger.error(f"OAuth session exchange failed: {e}")
         raise HTTPException(status_code=401, detail="Invalid session")
@@ -408,7 +624,7 @@ async def get_session_data(request: Request):
             "name": oauth_data["name"],
             "role": "job_seeker",  # Default role
             "picture": oauth_data["picture"],
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": utcnow()
         }
         await db.users.insert_one(user_doc)
         
@@ -425,14 +641,15 @@ async def get_session_data(request: Request):
             "bio": None
         }
         await db.job_seeker_profiles.insert_one(profile_doc)
+        talent_index.update(profile_doc)
     
     # Create session
     session_token = oauth_data["session_token"]
     session_doc = {
         "user_id": user_id,
         "session_token": session_token,
-        "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
-        "created_at": datetime.now(timezone.utc)
+        "expires_at": utcnow() + timedelta(days=7),
+        "created_at": utcnow()
     }
     await db.user_sessions.insert_one(session_doc)
     
@@ -447,14 +664,36 @@ async def get_current_user_info(request: Request, session_token: Optional[str] =
     return user
 
 @api_router.post("/auth/logout")
-async def logout(request: Request, response: Response, session_token: Optional[str] = Cookie(None)):
+async def logout(
+    request: Request,
+    response: Response,
+    data: Optional[LogoutRequest] = None,
+    session_token: Optional[str] = Cookie(None)
+):
     """Logout user"""
     if session_token:
         await db.user_sessions.delete_many({"session_token": session_token})
     
+    # Revoke the presented JWTs until they expire
+    auth_header = request.headers.get("Authorization") or ""
+    for token in (auth_header[7:] if auth_header.startswith("Bearer ") else None, data and data.refresh_token):
+        if token and token.startswith("eyJ"):
+            try:
+                await revocations.revoke_token(token_issuer.decode(token))
+            except jwt.PyJWTError:
+                pass
+    
     response.delete_cookie("session_token")
     return {"message": "Logged out successfully"}
 
+@api_router.post("/auth/logout-all")
+async def logout_everywhere(request: Request, session_token: Optional[str] = Cookie(None)):
+    """Revoke every token issued to the current user"""
+    user = await get_current_user(request, session_token)
+    await revocations.revoke_user(user.user_id)
+    await db.user_sessions.delete_many({"user_id": user.user_id})
+    return {"message": "Logged out everywhere"}
+
 # ============ PROFILE ENDPOINTS ============
 
 @api_router.get("/profile/job-seeker/{user_id}")
@@ -470,12 +709,14 @@ async def update_job_seeker_profile(profile_data: JobSeekerProfile, request: Req
     if user.role != "job_seeker":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    profile_dict = profile_data.model_dump()
+    update = location_update(profile_data.location)
+    update["$set"] = {**profile_data.model_dump(), **update["$set"]}
     await db.job_seeker_profiles.update_one(
         {"user_id": user.user_id},
-        {"$set": profile_dict},
+        update,
         upsert=True
     )
+    talent_index.update({"user_id": user.user_id, **update["$set"]})
     return {"message": "Profile updated successfully"}
 
 @api_router.get("/profile/recruiter/{user_id}")
@@ -492,27 +733,125 @@ async def update_recruiter_profile(profile_data: RecruiterProfile, request: Requ
     profile_dict = profile_data.model_dump()
     await db.recruiter_profiles.update_one(
         {"user_id": user.user_id},
-        {"$set": profile_dict},
+        [literal_set(profile_dict), JOB_LIMIT_STAGE],
         upsert=True
     )
     return {"message": "Profile updated successfully"}
 
-# ============ JOB ENDPOINTS ============
+# ============ TALENT SEARCH ============
 
-@api_router.get("/jobs")
-async def get_jobs(
-    status: Optional[str] = "approved",
-    location: Optional[str] = None,
-    job_type: Optional[str] = None,
+async def load_talent_profiles():
+    return await db.job_seeker_profiles.find({}, TALENT_PROJECTION).to_list(None)
+
+# Recruiters' candidate search; updated per profile write, like the job typeahead
+talent_index = TalentIndex(load_talent_profiles, synced=change_listener.streaming)
+change_listener.subscribe("job_seeker_profiles", talent_index.apply_change)
+MAX_TALENT_RESULTS = 100
+
+@api_router.get("/talent/search")
+async def search_talent(
+    request: Request,
     skills: Optional[str] = None,
-    salary_min: Optional[int] = None
+    min_experience: Optional[float] = None,
+    max_experience: Optional[float] = None,
+    location: Optional[str] = None,
+    salary_max: Optional[float] = None,
+    job_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20,
+    session_token: Optional[str] = Cookie(None)
 ):
-    """Get all jobs with filters"""
+    """Job seekers matching every filter, ranked by fit for one of the recruiter's jobs when given"""
+    user = await get_current_recruiter(request, session_token)
+    job = None
+    if job_id:
+        job = await db.jobs.find_one({"job_id": job_id}, {"_id": 0, "description": 0})
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job["recruiter_id"] != user.user_id:
+            raise HTTPException(status_code=403, detail="Not authorized")
+    
+    result = talent_index.search(
+        skills=skills.split(",") if skills else (),
+        min_experience=min_experience,
+        max_experience=max_experience,
+        location=location,
+        salary_max=salary_max,
+        job=job,
+        skip=max(0, skip),
+        limit=max(1, min(limit, MAX_TALENT_RESULTS)),
+    )
+    user_ids = [candidate["user_id"] for candidate in result["candidates"]]
+    users = {u["user_id"]: u async for u in db.users.find(
+        {"user_id": {"$in": user_ids}}, {"_id": 0, "user_id": 1, "name": 1, "picture": 1}
+    )}
+    for candidate in result["candidates"]:
+        candidate.update(users.get(candidate["user_id"], {}))
+    return result
+
+# ============ JOB FACETS ============
+
+SALARY_BANDS = [0, 300000, 600000, 1000000, 1500000, 2500000, 5000000]
+JOB_FACETS_TTL_SECONDS = float(os.environ.get("JOB_FACETS_TTL_SECONDS", "300"))
+# Facet counts per filter combination; any job write can move any count, so writes clear it all
+job_facets = TTLCache("job_facets", JOB_FACETS_TTL_SECONDS, max_entries=2000)
+# Applicant counter updates don't change what a search matches
+JOB_SEARCH_FIELDS = (
+    "status", "location", "location_normalized", "location_point", "job_type",
+    "required_skills", "salary_min", "posted_at", "title", "company_name",
+)
+change_listener.clear_cache("jobs", job_facets, fields=JOB_SEARCH_FIELDS)
+
+def job_facet_stages() -> dict:
+    return {
+        "job_type": [{"$sortByCount": "$job_type"}],
+        "location": [
+            {"$match": {"location_normalized": {"$nin": ["", None]}}},
+            {"$sortByCount": "$location_normalized"},
+            {"$limit": 20},
+        ],
+        "skills": [{"$unwind": "$required_skills"}, {"$sortByCount": "$required_skills"}, {"$limit": 20}],
+        "salary": [{"$bucket": {
+            "groupBy": "$salary_min",
+            "boundaries": SALARY_BANDS + [10 ** 12],
+            "default": "unspecified",
+            "output": {"count": {"$sum": 1}},
+        }}],
+        "total": [{"$count": "count"}],
+    }
+
+def shape_facets(raw: dict) -> dict:
+    bands = dict(zip(SALARY_BANDS, SALARY_BANDS[1:] + [None]))
+    return {
+        "total": raw["total"][0]["count"] if raw["total"] else 0,
+        "job_type": [{"value": b["_id"], "count": b["count"]} for b in raw["job_type"]],
+        "location": [{"value": b["_id"], "count": b["count"]} for b in raw["location"]],
+        "skills": [{"value": b["_id"], "count": b["count"]} for b in raw["skills"]],
+        "salary": [
+            {"min": b["_id"], "max": bands.get(b["_id"]), "count": b["count"]} if b["_id"] != "unspecified"
+            else {"min": None, "max": None, "count": b["count"]}
+            for b in sorted(raw["salary"], key=lambda b: (b["_id"] == "unspecified", b["_id"] if b["_id"] != "unspecified" else 0))
+        ],
+    }
+
+# ============ JOB ENDPOINTS ============
+
+def build_job_query(status=None, location=None, job_type=None, skills=None, salary_min=None) -> dict:
+    """Translate job search filters into a Mongo query"""
     query = {}
     if status:
         query["status"] = status
     if location:
-        query["location"] = {"$regex": location, "$options": "i"}
+        # Known cities also match their aliases ("Bangalore" finds "Bengaluru"); the substring
+        # match is kept alongside, so "Mumbai" still finds "Navi Mumbai" and ungeocoded text
+        place = geocode(location)
+        if place:
+            query["$or"] = [
+                {"location_normalized": place.name},
+                {"location": {"$regex": location, "$options": "i"}},
+            ]
+        else:
+            query["location"] = {"$regex": location, "$options": "i"}
     if job_type:
         query["job_type"] = job_type
     if skills:
@@ -520,87 +859,225 @@ async def get_jobs(
         query["required_skills"] = {"$in": skill_list}
     if salary_min:
         query["salary_min"] = {"$gte": salary_min}
-    
-    jobs = await db.jobs.find(query, {"_id": 0}).sort("posted_at", -1).to_list(100)
-    return jobs
+    return query
+
+MAX_SEARCH_RADIUS_KM = 500
+# Concurrent identical job reads share one in-flight query (results are shared, never mutate them)
+job_flights = SingleFlight("job_by_id")
+job_search_flights = SingleFlight("job_search")
+
+async def coalesced(flights: SingleFlight, key, fetch):
+    try:
+        return await flights.do(key, fetch)
+    except asyncio.TimeoutError:
+        logger.warning(f"{flights.name} query for {key} exceeded {flights.timeout_seconds}s")
+        raise HTTPException(status_code=503, detail="Database is busy, please retry")
+
+async def load_typeahead_jobs():
+    return await db.jobs.find({"status": "approved"}, TYPEAHEAD_PROJECTION).to_list(None)
+
+# Suggestions for the search box; updated per job write, never per keystroke query
+job_typeahead = TypeaheadIndex(load_typeahead_jobs, synced=change_listener.streaming)
+change_listener.subscribe("jobs", job_typeahead.apply_change)
+MAX_SUGGESTIONS = 20
+
+def on_job_write(job_id: Optional[str] = None, jobs: List[dict] = ()):
+    """Drop this worker's cached views of jobs; other workers hear about it from the change stream.
+
+    `jobs` are the written documents as they now stand, used to update the typeahead index.
+    """
+    if job_id:
+        job_snapshots.invalidate(job_id)
+        applicant_rankings.invalidate(job_id)
+    job_facets.clear()
+    for job in jobs:
+        job_typeahead.update(job)
+
+@api_router.get("/jobs")
+@read_profile("secondary_preferred")
+async def get_jobs(
+    status: Optional[str] = "approved",
+    location: Optional[str] = None,
+    job_type: Optional[str] = None,
+    skills: Optional[str] = None,
+    salary_min: Optional[int] = None,
+    near: Optional[str] = None,
+    radius_km: float = 25,
+    facets: bool = False
+):
+    """Get all jobs with filters; with `near` (a city or "lat,lon"), nearest first.
+
+    With `facets=true` the response is {"jobs", "facets"}, where facets holds
+    counts per job type, location, skill and salary band for the same filters.
+    """
+    if near:
+        point = parse_point(near)
+        if point is None:
+            raise HTTPException(status_code=400, detail="Unknown location for near")
+        if not 0 < radius_km <= MAX_SEARCH_RADIUS_KM:
+            raise HTTPException(status_code=400, detail=f"radius_km must be between 0 and {MAX_SEARCH_RADIUS_KM}")
+        base = [{"$geoNear": {
+            "near": {"type": "Point", "coordinates": list(point)},
+            "key": "location_point",
+            "distanceField": "distance_km",
+            "distanceMultiplier": 0.001,
+            "maxDistance": radius_km * 1000,
+            "spherical": True,
+            "query": build_job_query(status, None, job_type, skills, salary_min),
+        }}]
+        results = [{"$limit": 100}, {"$project": {"_id": 0}}]
+    else:
+        base = [{"$match": build_job_query(status, location, job_type, skills, salary_min)}]
+        results = [{"$sort": {"posted_at": -1}}, {"$limit": 100}, {"$project": {"_id": 0}}]
+    
+    async def fetch_page():
+        if near:
+            return await db.jobs.aggregate(base + results).to_list(100)
+        return await db.jobs.find(base[0]["$match"], {"_id": 0}).sort("posted_at", -1).to_list(100)
+    
+    async def shared_page():
+        # Identical searches arriving together share one query
+        return await coalesced(job_search_flights, query_key(base, results), fetch_page)
+    
+    if not facets:
+        return await shared_page()
+    
+    facet_key = (status, location if not near else None, job_type, skills, salary_min, near, radius_km if near else None)
+    cached = job_facets.get(facet_key)
+    if cached is not None:
+        return {"jobs": await shared_page(), "facets": cached}
+    
+    async def fetch_with_facets():
+        # Results and every facet in a single aggregation
+        raw = await db.jobs.aggregate(base + [{"$facet": {"jobs": results, **job_facet_stages()}}]).to_list(1)
+        shaped = shape_facets(raw[0])
+        job_facets.set(facet_key, shaped)
+        return {"jobs": raw[0]["jobs"], "facets": shaped}
+    
+    return await coalesced(job_search_flights, query_key("facets", base, results), fetch_with_facets)
+
+@api_router.get("/jobs/suggest")
+async def suggest_jobs(q: str = "", limit: int = 8, kind: Optional[str] = None):
+    """Typeahead suggestions from approved jobs' titles, companies and skills"""
+    if kind is not None and kind not in TYPEAHEAD_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(TYPEAHEAD_KINDS)}")
+    return job_typeahead.suggest(q, max(1, min(limit, MAX_SUGGESTIONS)), kind)
 
 @api_router.get("/jobs/{job_id}")
+@read_profile("secondary_preferred")
 async def get_job(job_id: str):
-    job = await db.jobs.find_one({"job_id": job_id}, {"_id": 0})
+    async def fetch_job():
+        job = await db.jobs.find_one({"job_id": job_id}, {"_id": 0})
+        return job or await archiver.find_one("jobs", {"job_id": job_id}, {"_id": 0})
+    
+    job = await coalesced(job_flights, job_id, fetch_job)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
 
+def new_job_doc(recruiter_id: str, job_data: JobCreate) -> dict:
+    job_id = f"job_{uuid.uuid4().hex[:12]}"
+    now = utcnow()
+    return {
+        "job_id": job_id,
+        "recruiter_id": recruiter_id,
+        **job_data.model_dump(),
+        **location_fields(job_data.location),
+        "status": "approved",
+        "applicant_counts": empty_applicant_counts(),
+        "posted_at": now,
+        "approved_at": now
+    }
+
 @api_router.post("/jobs")
 async def create_job(job_data: JobCreate, request: Request, session_token: Optional[str] = Cookie(None)):
     """Create a new job (requires active subscription)"""
     user = await get_current_recruiter(request, session_token)
     
-    # Check recruiter subscription
-    profile = await db.recruiter_profiles.find_one({"user_id": user.user_id}, {"_id": 0})
-    if not profile:
-        raise HTTPException(status_code=404, detail="Recruiter profile not found")
-    
-    # Define job limits per plan
-    plan_limits = {
-        "free": 1,
-        "basic": 10,
-        "premium": 50,
-        "enterprise": 999
-    }
-    
-    subscription_plan = profile.get("subscription_plan", "free")
-    subscription_status = profile.get("subscription_status", "inactive")
-    jobs_posted = profile.get("jobs_posted_this_month", 0)
-    
-    # Check for custom limit (Placfy Override)
-    job_limit = profile.get("custom_job_limit")
-    if job_limit is None:
-        job_limit = plan_limits.get(subscription_plan, 0)
-    
-    # Check if subscription is active (except for free plan's first job)
-    if subscription_plan != "free" and subscription_status != "active":
-        raise HTTPException(
-            status_code=402,
-            detail="Your subscription has expired. Please renew to post more jobs."
-        )
-    
-    # Check job posting limit
-    if jobs_posted >= job_limit:
-        raise HTTPException(
-            status_code=402,
-            detail=f"You have reached your job posting limit ({job_limit} jobs/month) for the {subscription_plan} plan. Please upgrade your subscription."
-        )
-    
-    # Increment jobs posted count
-    await db.recruiter_profiles.update_one(
-        {"user_id": user.user_id},
-        {"$inc": {"jobs_posted_this_month": 1}}
-    )
+    # Check and reserve quota in one round trip
+    reservation = await reserve_job_quota_or_raise(user.user_id)
     
     # Create job
-    job_id = f"job_{uuid.uuid4().hex[:12]}"
-    job_doc = {
-        "job_id": job_id,
-        "recruiter_id": user.user_id,
-        **job_data.model_dump(),
-        "status": "approved",
-        "posted_at": datetime.now(timezone.utc).isoformat(),
-        "approved_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    await db.jobs.insert_one(job_doc)
+    job_doc = new_job_doc(user.user_id, job_data)
+    try:
+        await db.jobs.insert_one(job_doc)
+    except PyMongoError:
+        await release_job_quota(user.user_id, 1, reservation)
+        raise
+    on_job_write(jobs=[job_doc])
     job_doc.pop("_id", None)
     
     return job_doc
 
+@api_router.post("/jobs/bulk")
+async def create_jobs_bulk(jobs_data: List[JobCreate], request: Request, session_token: Optional[str] = Cookie(None)):
+    """Create several jobs against a single quota reservation"""
+    user = await get_current_recruiter(request, session_token)
+    if not jobs_data:
+        return []
+    
+    reservation = await reserve_job_quota_or_raise(user.user_id, len(jobs_data))
+    
+    job_docs = [new_job_doc(user.user_id, job_data) for job_data in jobs_data]
+    try:
+        await db.jobs.insert_many(job_docs, ordered=True)
+    except BulkWriteError as e:
+        # Ordered inserts stop at the first failure: release the unused part
+        inserted = e.details.get("nInserted", 0)
+        await release_job_quota(user.user_id, len(job_docs) - inserted, reservation)
+        on_job_write(jobs=job_docs[:inserted])
+        raise
+    except PyMongoError:
+        await release_job_quota(user.user_id, len(job_docs), reservation)
+        raise
+    on_job_write(jobs=job_docs)
+    for job_doc in job_docs:
+        job_doc.pop("_id", None)
+    
+    return job_docs
+
 @api_router.get("/jobs/recruiter/my-jobs")
 async def get_my_jobs(request: Request, session_token: Optional[str] = Cookie(None)):
     """Get jobs posted by current recruiter"""
     user = await get_current_recruiter(request, session_token)
     jobs = await db.jobs.find({"recruiter_id": user.user_id}, {"_id": 0}).sort("posted_at", -1).to_list(100)
+    for job in jobs:
+        job["applicant_counts"] = {**empty_applicant_counts(), **job.get("applicant_counts", {})}
     return jobs
 
+@api_router.get("/jobs/recruiter/dashboard")
+async def get_recruiter_dashboard(request: Request, session_token: Optional[str] = Cookie(None)):
+    """All of the recruiter's jobs with their applicant funnels, plus totals, in one query"""
+    user = await get_current_recruiter(request, session_token)
+    
+    count_fields = ["total", *APPLICATION_STATUSES]
+    result = await db.jobs.aggregate([
+        {"$match": {"recruiter_id": user.user_id}},
+        {"$sort": {"posted_at": -1}},
+        {"$facet": {
+            "jobs": [
+                {"$limit": 100},
+                {"$project": {
+                    "_id": 0, "job_id": 1, "title": 1, "location": 1, "job_type": 1, "status": 1, "posted_at": 1,
+                    "description": 1, "required_skills": 1,
+                    "applicant_counts": {f: {"$ifNull": [f"$applicant_counts.{f}", 0]} for f in count_fields},
+                }},
+            ],
+            "totals": [
+                {"$group": {
+                    "_id": None,
+                    "jobs": {"$sum": 1},
+                    "open_jobs": {"$sum": {"$cond": [{"$eq": ["$status", "approved"]}, 1, 0]}},
+                    **{f: {"$sum": {"$ifNull": [f"$applicant_counts.{f}", 0]}} for f in count_fields},
+                }},
+                {"$project": {"_id": 0}},
+            ],
+        }},
+    ]).to_list(1)
+    facets = result[0] if result else {"jobs": [], "totals": []}
+    totals = facets["totals"][0] if facets["totals"] else {"jobs": 0, "open_jobs": 0, **empty_applicant_counts()}
+    return {"jobs": facets["jobs"], "totals": totals}
+
 @api_router.put("/jobs/{job_id}")
 async def update_job(job_id: str, job_data: JobCreate, request: Request, session_token: Optional[str] = Cookie(None)):
     user = await get_current_recruiter(request, session_token)
@@ -611,10 +1088,10 @@ async def update_job(job_id: str, job_data: JobCreate, request: Request, session
     if job["recruiter_id"] != user.user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    await db.jobs.update_one(
-        {"job_id": job_id},
-        {"$set": job_data.model_dump()}
-    )
+    update = location_update(job_data.location)
+    update["$set"] = {**job_data.model_dump(), **update["$set"]}
+    await db.jobs.update_one({"job_id": job_id}, update)
+    on_job_write(job_id, [{**job, **update["$set"]}])
     return {"message": "Job updated successfully"}
 
 @api_router.delete("/jobs/{job_id}")
@@ -629,12 +1106,36 @@ async def delete_job(job_id: str, request: Request, session_token: Optional[str]
     
     await db.jobs.update_one(
         {"job_id": job_id},
-        {"$set": {"status": "closed"}}
+        {"$set": {"status": "closed", "closed_at": utcnow()}}
     )
+    on_job_write(job_id, [{**job, "status": "closed"}])
     return {"message": "Job closed successfully"}
 
 # ============ APPLICATION ENDPOINTS ============
 
+# Apply only needs a job's owner, which doesn't change, so keep it in-process
+JOB_SNAPSHOT_TTL_SECONDS = float(os.environ.get("JOB_SNAPSHOT_TTL_SECONDS", "60"))
+job_snapshots = TTLCache("job_snapshots", JOB_SNAPSHOT_TTL_SECONDS)
+
+change_listener.invalidate_cache("jobs", job_snapshots, key="job_id", fields=("recruiter_id",))
+
+# Fit-ranked applicants per job; profile edits are caught by ApplicantRanking.refresh
+APPLICANT_RANKING_TTL_SECONDS = float(os.environ.get("APPLICANT_RANKING_TTL_SECONDS", "600"))
+applicant_rankings = TTLCache("applicant_rankings", APPLICANT_RANKING_TTL_SECONDS, max_entries=500)
+applicant_ranking_flights = SingleFlight("applicant_ranking")
+JOB_FIT_FIELDS = ("required_skills", "experience_required", "location", "location_normalized", "salary_min", "salary_max")
+change_listener.invalidate_cache("jobs", applicant_rankings, key="job_id", fields=JOB_FIT_FIELDS)
+change_listener.invalidate_cache("applications", applicant_rankings, key="job_id", fields=("status",))
+
+async def get_job_snapshot(job_id: str) -> Optional[dict]:
+    """Return {recruiter_id} for a job, from cache when possible"""
+    snapshot = job_snapshots.get(job_id)
+    if snapshot is None:
+        snapshot = await db.jobs.find_one({"job_id": job_id}, {"_id": 0, "recruiter_id": 1})
+        if snapshot:
+            job_snapshots.set(job_id, snapshot)
+    return snapshot
+
 @api_router.post("/applications")
 async def apply_to_job(
     job_id: str = Form(...),
@@ -648,21 +1149,13 @@ async def apply_to_job(
     if user.role != "job_seeker":
         raise HTTPException(status_code=403, detail="Only job seekers can apply")
     
-    # Check if job exists
-    job = await db.jobs.find_one({"job_id": job_id}, {"_id": 0})
+    job = await get_job_snapshot(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    # Check if already applied
-    existing = await db.applications.find_one({
-        "job_id": job_id,
-        "job_seeker_id": user.user_id
-    })
-    if existing:
-        raise HTTPException(status_code=400, detail="Already applied to this job")
-    
     # Handle Resume Upload
     resume_url = None
+    file_path = None
     if resume:
         # Ensure static/resumes directory exists
         upload_dir = ROOT_DIR / "static" / "resumes"
@@ -681,6 +1174,7 @@ async def apply_to_job(
 
     # Create application
     application_id = f"app_{uuid.uuid4().hex[:12]}"
+    now = utcnow()
     application_doc = {
         "application_id": application_id,
         "job_id": job_id,
@@ -689,108 +1183,199 @@ async def apply_to_job(
         "status": "pending",
         "cover_letter": cover_letter,
         "resume_url": resume_url,
-        "applied_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "applied_at": now,
+        "updated_at": now
     }
     
-    await db.applications.insert_one(application_doc)
+    # The unique (job_id, job_seeker_id) index rejects duplicates, including
+    # two submissions racing each other
+    try:
+        await db.applications.insert_one(application_doc)
+    except DuplicateKeyError:
+        if file_path is not None:
+            file_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="Already applied to this job")
+    applicant_rankings.invalidate(job_id)
+    await db.jobs.update_one(
+        {"job_id": job_id},
+        {"$inc": {"applicant_counts.total": 1, "applicant_counts.pending": 1}}
+    )
     
     # Sync to Placfy (Fire and Forget)
     try:
-        async with httpx.AsyncClient() as client:
-            webhook_url = "http://localhost:8000/api/v1/jobs/webhook/application/"
-            payload = {
-                "naya_application_id": application_id,
-                "job_id": job_id,
-                "candidate_name": user.name,
-                "candidate_email": user.email,
-                "cover_letter": cover_letter or "",
-                "resume_url": resume_url or "",
-                "applied_at": application_doc["applied_at"]
-            }
-            # We don't await response to avoid blocking, or we catch errors
-            # Actually better to await to log errors
-            r = await client.post(webhook_url, json=payload, timeout=5.0)
-            if r.status_code != 201:
-                logger.error(f"Failed to sync application to Placfy: {r.text}")
-            else:
-                logger.info(f"Successfully synced application {application_id} to Placfy")
+        payload = {
+            "naya_application_id": application_id,
+            "job_id": job_id,
+            "candidate_name": user.name,
+            "candidate_email": user.email,
+            "cover_letter": cover_letter or "",
+            "resume_url": resume_url or "",
+            "applied_at": application_doc["applied_at"].isoformat()
+        }
+        # We don't await response to avoid blocking, or we catch errors
+        # Actually better to await to log errors
+        r = await get_http_client().post(PLACFY_APPLICATION_WEBHOOK_URL, json=payload, timeout=5.0)
+        if r.status_code != 201:
+            logger.error(f"Failed to sync application to Placfy: {r.text}")
+        else:
+            logger.info(f"Successfully synced application {application_id} to Placfy")
     except Exception as e:
         logger.error(f"Error syncing application to Placfy: {e}")
 
     application_doc.pop("_id", None)
     return application_doc
 
+# Only the fields the applications pages render; the joins run inside MongoDB
+APPLICATION_FIELDS = {
+    "_id": 0, "application_id": 1, "job_id": 1, "job_seeker_id": 1, "status": 1,
+    "cover_letter": 1, "resume_url": 1, "applied_at": 1, "updated_at": 1,
+}
+APPLICATION_JOB_FIELDS = {"_id": 0, "job_id": 1, "title": 1, "company_name": 1, "location": 1, "job_type": 1, "status": 1}
+APPLICANT_USER_FIELDS = {"_id": 0, "user_id": 1, "name": 1, "email": 1, "picture": 1}
+APPLICANT_PROFILE_FIELDS = {"_id": 0, "experience_years": 1, "location": 1, "skills": 1, "resume_url": 1}
+MAX_APPLICATIONS_PAGE = 100
+
+def first_joined(field: str) -> dict:
+    """Unwrap a one-element $lookup result, keeping null when nothing matched"""
+    return {"$ifNull": [{"$arrayElemAt": [f"${field}", 0]}, None]}
+
+def applications_page_pipeline(match: dict, skip: int, limit: int, lookups: List[dict], joined: dict) -> List[dict]:
+    limit = max(1, min(limit, MAX_APPLICATIONS_PAGE))
+    return [
+        {"$match": match},
+        {"$sort": {"applied_at": -1}},
+        {"$skip": max(0, skip)},
+        {"$limit": limit},
+        # Join after paging so only one page of applications is looked up
+        *[{"$lookup": lookup} for lookup in lookups],
+        {"$project": {**APPLICATION_FIELDS, **{field: first_joined(field) for field in joined}}},
+    ]
+
 @api_router.get("/applications/my-applications")
-async def get_my_applications(request: Request, session_token: Optional[str] = Cookie(None)):
+async def get_my_applications(
+    request: Request,
+    session_token: Optional[str] = Cookie(None),
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = MAX_APPLICATIONS_PAGE
+):
     """Get applications by current job seeker"""
     user = await get_current_user(request, session_token)
     if user.role != "job_seeker":
         raise HTTPException(status_code=403, detail="Access denied")
     
-    applications = await db.applications.find({"job_seeker_id": user.user_id}, {"_id": 0}).sort("applied_at", -1).to_list(100)
-    
-    # Collect all unique job IDs
-    job_ids = list(set(app["job_id"] for app in applications))
-    
-    # Fetch all jobs in one query
-    jobs_cursor = db.jobs.find({"job_id": {"$in": job_ids}}, {"_id": 0})
-    jobs_dict = {job["job_id"]: job async for job in jobs_cursor}
-    
-    # Enrich applications with job details
-    for app in applications:
-        app["job"] = jobs_dict.get(app["job_id"])
-    
-    return applications
+    match = {"job_seeker_id": user.user_id}
+    if status:
+        match["status"] = status
+    pipeline = applications_page_pipeline(match, skip, limit, [
+        {"from": "jobs", "localField": "job_id", "foreignField": "job_id",
+         "pipeline": [{"$project": APPLICATION_JOB_FIELDS}], "as": "job"},
+    ], ["job"])
+    return await db.applications.aggregate(pipeline).to_list(MAX_APPLICATIONS_PAGE)
 
 @api_router.get("/applications/job/{job_id}")
-async def get_job_applications(job_id: str, request: Request, session_token: Optional[str] = Cookie(None)):
-    """Get all applications for a specific job"""
+async def get_job_applications(
+    job_id: str,
+    request: Request,
+    session_token: Optional[str] = Cookie(None),
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = MAX_APPLICATIONS_PAGE,
+    sort: str = "recent",
+    min_score: Optional[float] = None,
+    top_n: Optional[int] = None
+):
+    """Get all applications for a specific job, newest first or (sort=fit) best profile fit first"""
     user = await get_current_recruiter(request, session_token)
+    if sort not in ("recent", "fit"):
+        raise HTTPException(status_code=400, detail="sort must be recent or fit")
     
-    # Verify job belongs to recruiter
-    job = await db.jobs.find_one({"job_id": job_id})
+    # Verify job belongs to recruiter; archived jobs keep their applications in the archive
+    job = await get_job_snapshot(job_id)
+    applications = db.applications
+    if not job:
+        job = await archiver.find_one("jobs", {"job_id": job_id}, {"_id": 0, "recruiter_id": 1})
+        applications = archiver.archive("applications")
     if not job or job["recruiter_id"] != user.user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    applications = await db.applications.find({"job_id": job_id}, {"_id": 0}).sort("applied_at", -1).to_list(100)
-    
-    # Collect all unique job seeker IDs
-    seeker_ids = list(set(app["job_seeker_id"] for app in applications))
-    
-    # Fetch all users and profiles in bulk
-    users_cursor = db.users.find({"user_id": {"$in": seeker_ids}}, {"_id": 0, "password_hash": 0})
-    users_dict = {user["user_id"]: user async for user in users_cursor}
-    
-    profiles_cursor = db.job_seeker_profiles.find({"user_id": {"$in": seeker_ids}}, {"_id": 0})
-    profiles_dict = {profile["user_id"]: profile async for profile in profiles_cursor}
-    
-    # Enrich applications with job seeker details
-    for app in applications:
-        app["job_seeker"] = users_dict.get(app["job_seeker_id"])
-        app["profile"] = profiles_dict.get(app["job_seeker_id"])
-    
-    return applications
+    lookups = [
+        {"from": "users", "localField": "job_seeker_id", "foreignField": "user_id",
+         "pipeline": [{"$project": APPLICANT_USER_FIELDS}], "as": "job_seeker"},
+        {"from": "job_seeker_profiles", "localField": "job_seeker_id", "foreignField": "user_id",
+         "pipeline": [{"$project": APPLICANT_PROFILE_FIELDS}], "as": "profile"},
+    ]
+    if sort == "fit":
+        ranking = await get_applicant_ranking(job_id, applications, archived=job.get("archived", False))
+        _, scored = ranking.page(max(0, skip), max(1, min(limit, MAX_APPLICATIONS_PAGE)), min_score, top_n, status)
+        if not scored:
+            return []
+        match = {"job_id": job_id, "application_id": {"$in": [entry["application_id"] for entry in scored]}}
+        pipeline = applications_page_pipeline(match, 0, len(scored), lookups, ["job_seeker", "profile"])
+        docs = {doc["application_id"]: doc for doc in await applications.aggregate(pipeline).to_list(MAX_APPLICATIONS_PAGE)}
+        # Applications deleted since the ranking was built are skipped
+        return [{**docs[entry["application_id"]], **entry} for entry in scored if entry["application_id"] in docs]
+    
+    match = {"job_id": job_id}
+    if status:
+        match["status"] = status
+    pipeline = applications_page_pipeline(match, skip, limit, lookups, ["job_seeker", "profile"])
+    return await applications.aggregate(pipeline).to_list(MAX_APPLICATIONS_PAGE)
+
+async def get_applicant_ranking(job_id: str, applications, archived: bool = False) -> ApplicantRanking:
+    """Every applicant of `job_id` scored for fit, from cache unless the job or its applications changed"""
+    ranking = applicant_rankings.get(job_id)
+    if ranking is not None:
+        ranking.refresh()
+        return ranking
+    
+    async def build():
+        fit_projection = {"_id": 0, **{field: 1 for field in JOB_FIT_FIELDS}}
+        if archived:
+            job = await archiver.find_one("jobs", {"job_id": job_id}, fit_projection)
+        else:
+            job = await db.jobs.find_one({"job_id": job_id}, fit_projection)
+        docs = await applications.find(
+            {"job_id": job_id}, {"_id": 0, "application_id": 1, "job_seeker_id": 1, "status": 1}
+        ).sort("applied_at", -1).to_list(None)
+        ranking = ApplicantRanking(talent_index, job or {}, docs)
+        applicant_rankings.set(job_id, ranking)
+        return ranking
+    
+    return await coalesced(applicant_ranking_flights, job_id, build)
 
 @api_router.put("/applications/{application_id}/status")
 async def update_application_status(application_id: str, status: str, request: Request, session_token: Optional[str] = Cookie(None)):
     """Update application status (recruiter only)"""
     user = await get_current_recruiter(request, session_token)
-    
-    application = await db.applications.find_one({"application_id": application_id})
-    if not application:
+    if status not in APPLICATION_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid application status")
+    
+    # Returns the previous status so the job's counters move by exactly one
+    previous = await db.applications.find_one_and_update(
+        {"application_id": application_id, "recruiter_id": user.user_id},
+        {"$set": {"status": status, "updated_at": utcnow()}},
+        projection={"_id": 0, "job_id": 1, "status": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    if not previous:
+        if await db.applications.find_one({"application_id": application_id}, {"_id": 1}):
+            raise HTTPException(status_code=403, detail="Not authorized")
         raise HTTPException(status_code=404, detail="Application not found")
-    if application["recruiter_id"] != user.user_id:
-        raise HTTPException(status_code=403, detail="Not authorized")
     
-    await db.applications.update_one(
-        {"application_id": application_id},
-        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc).isoformat()}}
-    )
+    if previous.get("status") != status:
+        applicant_rankings.invalidate(previous["job_id"])
+        await db.jobs.update_one(
+            {"job_id": previous["job_id"]},
+            {"$inc": {f"applicant_counts.{previous.get('status', 'pending')}": -1, f"applicant_counts.{status}": 1}}
+        )
     return {"message": "Application status updated"}
 
 # ============ MESSAGING ENDPOINTS ============
 
+# One document per message, or per-pair buckets when MESSAGE_STORAGE_MODE=bucket
+message_store = create_message_store(db)
+
 @api_router.post("/messages")
 async def send_message(message_data: MessageCreate, request: Request, session_token: Optional[str] = Cookie(None)):
     """Send a message"""
@@ -803,12 +1388,11 @@ async def send_message(message_data: MessageCreate, request: Request, session_to
         "receiver_id": message_data.receiver_id,
         "content": message_data.content,
         "application_id": message_data.application_id,
-        "created_at": datetime.now(timezone.utc).isoformat(),
+        "created_at": utcnow(),
         "read": False
     }
     
-    await db.messages.insert_one(message_doc)
-    message_doc.pop("_id", None)
+    await message_store.append(message_doc)
     
     return message_doc
 
@@ -817,20 +1401,16 @@ async def get_conversation(other_user_id: str, request: Request, session_token:
     """Get messages between current user and another user"""
     user = await get_current_user(request, session_token)
     
-    messages = await db.messages.find({
-        "$or": [
-            {"sender_id": user.user_id, "receiver_id": other_user_id},
-            {"sender_id": other_user_id, "receiver_id": user.user_id}
-        ]
-    }, {"_id": 0}).sort("created_at", 1).to_list(100)
+    thread = await message_store.thread(user.user_id, other_user_id, limit=100)
+    if len(thread) < 100 and message_store.mode == "document":
+        # Older read messages may have been archived
+        before = thread[0]["created_at"] if thread else None
+        thread[:0] = await archiver.older_messages(user.user_id, other_user_id, before, 100 - len(thread))
     
     # Mark messages as read
-    await db.messages.update_many(
-        {"sender_id": other_user_id, "receiver_id": user.user_id, "read": False},
-        {"$set": {"read": True}}
-    )
+    await message_store.mark_read(user.user_id, other_user_id)
     
-    return messages
+    return thread
 
 @api_router.get("/messages/conversations")
 async def get_conversations(request: Request, session_token: Optional[str] = Cookie(None)):
@@ -838,25 +1418,10 @@ async def get_conversations(request: Request, session_token: Optional[str] = Coo
     user = await get_current_user(request, session_token)
     
     # Get unique users who have messaged with current user
-    pipeline = [
-        {"$match": {"$or": [{"sender_id": user.user_id}, {"receiver_id": user.user_id}]}},
-        {"$sort": {"created_at": -1}},
-        {"$group": {
-            "_id": {
-                "$cond": [
-                    {"$eq": ["$sender_id", user.user_id]},
-                    "$receiver_id",
-                    "$sender_id"
-                ]
-            },
-            "last_message": {"$first": "$$ROOT"}
-        }}
-    ]
-    
-    conversations = await db.messages.aggregate(pipeline).to_list(100)
+    conversations = await message_store.latest_per_partner(user.user_id, limit=100)
     
     # Collect all unique user IDs
-    user_ids = [conv["_id"] for conv in conversations]
+    user_ids = [other_id for other_id, _ in conversations]
     
     # Fetch all users in bulk
     users_cursor = db.users.find({"user_id": {"$in": user_ids}}, {"_id": 0, "password_hash": 0})
@@ -864,18 +1429,31 @@ async def get_conversations(request: Request, session_token: Optional[str] = Coo
     
     # Enrich conversations with user details
     result = []
-    for conv in conversations:
-        other_user = users_dict.get(conv["_id"])
+    for other_id, last_message in conversations:
+        other_user = users_dict.get(other_id)
         if other_user:
             result.append({
                 "user": other_user,
-                "last_message": conv["last_message"]
+                "last_message": last_message
             })
     
     return result
 
 # ============ AI JOB MATCHING ============
 
+def rank_jobs_by_skill_overlap(profile: dict, jobs: List[dict], limit: int = 5) -> List[dict]:
+    """Rank jobs by how many required skills the profile has"""
+    user_skills = set(profile.get('skills', []))
+    matched_jobs = []
+    for job in jobs:
+        job_skills = set(job.get('required_skills', []))
+        match_score = len(user_skills & job_skills)
+        if match_score > 0:
+            matched_jobs.append((match_score, job))
+    
+    matched_jobs.sort(reverse=True, key=lambda x: x[0])
+    return [j[1] for j in matched_jobs[:limit]]
+
 @api_router.get("/ai/job-recommendations")
 async def get_job_recommendations(request: Request, session_token: Optional[str] = Cookie(None)):
     """Get AI-powered job recommendations"""
@@ -897,6 +1475,7 @@ async def get_job_recommendations(request: Request, session_token: Optional[str]
     # Use AI to match jobs
     try:
         llm_key = os.environ.get('EMERGENT_LLM_KEY')
+        LlmChat, UserMessage = llm_classes()
         chat = LlmChat(
             api_key=llm_key,
             session_id=f"job_match_{user.user_id}",
@@ -917,16 +1496,7 @@ async def get_job_recommendations(request: Request, session_token: Optional[str]
     except Exception as e:
         logger.error(f"AI job matching failed: {e}")
         # Fallback to simple matching
-        user_skills = set(profile.get('skills', []))
-        matched_jobs = []
-        for job in jobs:
-            job_skills = set(job.get('required_skills', []))
-            match_score = len(user_skills & job_skills)
-            if match_score > 0:
-                matched_jobs.append((match_score, job))
-        
-        matched_jobs.sort(reverse=True, key=lambda x: x[0])
-        return [j[1] for j in matched_jobs[:5]]
+        return rank_jobs_by_skill_overlap(profile, jobs)
 
 # ============ SUBSCRIPTION & PAYMENT ENDPOINTS ============
 
@@ -948,6 +1518,7 @@ async def create_subscription_order(plan: str, request: Request, session_token:
     plan_details = plans[plan]
     
     # Check if Razorpay is configured
+    razorpay_client = get_razorpay_client()
     if not razorpay_client:
         # Demo mode - return mock order
         logger.warning("Razorpay not configured - running in demo mode")
@@ -983,7 +1554,7 @@ async def create_subscription_order(plan: str, request: Request, session_token:
             "razorpay_order_id": order["id"],
             "razorpay_payment_id": None,
             "status": "created",
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": utcnow()
         }
         await db.payments.insert_one(payment_doc)
         
@@ -991,7 +1562,7 @@ async def create_subscription_order(plan: str, request: Request, session_token:
             "order_id": order["id"],
             "amount": order["amount"],
             "currency": order["currency"],
-            "key_id": razorpay_key_id,
+            "key_id": os.environ.get('RAZORPAY_KEY_ID', ''),
             "demo_mode": False
         }
     except Exception as e:
@@ -1032,20 +1603,21 @@ async def verify_subscription_payment(
         plan = payment.get("subscription_plan", "basic")
         
         # Activate subscription
-        subscription_start = datetime.now(timezone.utc)
+        subscription_start = utcnow()
         subscription_end = subscription_start + timedelta(days=30)
         
         await db.recruiter_profiles.update_one(
             {"user_id": user.user_id},
-            {
-                "$set": {
+            [
+                literal_set({
                     "subscription_plan": plan,
                     "subscription_status": "active",
-                    "subscription_start": subscription_start.isoformat(),
-                    "subscription_end": subscription_end.isoformat(),
+                    "subscription_start": subscription_start,
+                    "subscription_end": subscription_end,
                     "jobs_posted_this_month": 0
-                }
-            }
+                }),
+                JOB_LIMIT_STAGE
+            ]
         )
         
         # Update payment status
@@ -1066,6 +1638,7 @@ async def verify_subscription_payment(
         }
     
     # Real Razorpay verification
+    razorpay_client = get_razorpay_client()
     if not razorpay_client:
         raise HTTPException(status_code=500, detail="Payment gateway not configured")
     
@@ -1087,20 +1660,21 @@ async def verify_subscription_payment(
         plan = payment["subscription_plan"]
         
         # Activate subscription
-        subscription_start = datetime.now(timezone.utc)
+        subscription_start = utcnow()
         subscription_end = subscription_start + timedelta(days=30)
         
         await db.recruiter_profiles.update_one(
             {"user_id": user.user_id},
-            {
-                "$set": {
+            [
+                literal_set({
                     "subscription_plan": plan,
                     "subscription_status": "active",
-                    "subscription_start": subscription_start.isoformat(),
-                    "subscription_end": subscription_end.isoformat(),
+                    "subscription_start": subscription_start,
+                    "subscription_end": subscription_end,
                     "jobs_posted_this_month": 0
-                }
-            }
+                }),
+                JOB_LIMIT_STAGE
+            ]
         )
         
         # Update payment status
@@ -1120,7 +1694,7 @@ async def verify_subscription_payment(
             "valid_until": subscription_end.isoformat()
         }
         
-    except razorpay.errors.SignatureVerificationError as e:
+    except razorpay_module().errors.SignatureVerificationError as e:
         logger.error(f"Payment signature verification failed: {e}")
         raise HTTPException(status_code=400, detail="Payment verification failed")
     except Exception as e:
@@ -1140,7 +1714,10 @@ async def get_all_users(skip: int = 0, limit: int = 100, request: Request = None
 async def delete_user(user_id: str, request: Request, session_token: Optional[str] = Cookie(None)):
     """Delete a user (admin only)"""
     await get_current_admin(request, session_token)
+    # Stateless tokens would otherwise stay valid until they expire
+    await revocations.revoke_user(user_id)
     await db.users.delete_one({"user_id": user_id})
+    talent_index.remove(user_id)
     return {"message": "User deleted"}
 
 @api_router.get("/admin/jobs")
@@ -1158,10 +1735,13 @@ async def approve_job(job_id: str, request: Request, session_token: Optional[str
     """Approve a job (admin only)"""
     await get_current_admin(request, session_token)
     
-    await db.jobs.update_one(
+    job = await db.jobs.find_one_and_update(
         {"job_id": job_id},
-        {"$set": {"status": "approved", "approved_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"status": "approved", "approved_at": utcnow()}},
+        projection=TYPEAHEAD_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
+    on_job_write(job_id, [job] if job else [])
     return {"message": "Job approved"}
 
 @api_router.put("/admin/jobs/{job_id}/reject")
@@ -1171,8 +1751,9 @@ async def reject_job(job_id: str, request: Request, session_token: Optional[str]
     
     await db.jobs.update_one(
         {"job_id": job_id},
-        {"$set": {"status": "rejected"}}
+        {"$set": {"status": "rejected", "closed_at": utcnow()}}
     )
+    on_job_write(job_id, [{"job_id": job_id, "status": "rejected"}])
     return {"message": "Job rejected"}
 
 @api_router.get("/admin/analytics")
@@ -1206,15 +1787,271 @@ async def get_analytics(request: Request, session_token: Optional[str] = Cookie(
         }
     }
 
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries(since_minutes: int = 1440, limit: int = 50, request: Request = None, session_token: Optional[str] = Cookie(None)):
+    """Get slow Mongo operations grouped by query fingerprint (admin only)"""
+    await get_current_admin(request, session_token)
+    return await slow_query_report(db, since_minutes=since_minutes, limit=limit)
+
+@api_router.get("/admin/scheduler")
+async def get_scheduler_status(request: Request, session_token: Optional[str] = Cookie(None)):
+    """Get periodic task leases and last-run metrics (admin only)"""
+    await get_current_admin(request, session_token)
+    return await scheduler.status()
+
+@api_router.get("/admin/caches")
+async def get_cache_status(request: Request, session_token: Optional[str] = Cookie(None)):
+    """Get in-process cache stats and change-stream invalidation lag for this worker (admin only)"""
+    await get_current_admin(request, session_token)
+    return {
+        "invalidation": change_listener.status(),
+        "caches": {name: cache.stats() for name, cache in CACHES.items()},
+        "typeahead": job_typeahead.stats(),
+        "talent_index": talent_index.stats(),
+        "revocations": revocations.stats(),
+        "singleflight": {name: flights.stats() for name, flights in FLIGHTS.items()},
+    }
+
+@api_router.get("/admin/archive")
+async def get_archive_report(request: Request, session_token: Optional[str] = Cookie(None)):
+    """Hot and archive collection sizes and the working set reclaimed by archival (admin only)"""
+    await get_current_admin(request, session_token)
+    return await archiver.report()
+
+# ============ BACKGROUND JOBS ============
+
+async def expire_lapsed_subscriptions() -> int:
+    """Mark active subscriptions whose subscription_end has passed as expired"""
+    return await batched_update(
+        db.recruiter_profiles,
+        {"subscription_status": "active", **date_range("subscription_end", lt=utcnow())},
+        {"$set": {"subscription_status": "expired"}},
+        key="user_id"
+    )
+
+async def reset_monthly_quotas() -> int:
+    """Zero jobs_posted_this_month for profiles still counting a previous month"""
+    period = current_quota_period()
+    # Profiles from before quota periods existed start counting now, without a reset
+    touched = await batched_update(
+        db.recruiter_profiles,
+        {"quota_period": None},
+        {"$set": {"quota_period": period}},
+        key="user_id"
+    )
+    touched += await batched_update(
+        db.recruiter_profiles,
+        {"quota_period": {"$lt": period}},
+        {"$set": {"jobs_posted_this_month": 0, "quota_period": period}},
+        key="user_id"
+    )
+    return touched
+
+# Applications written this recently may still be waiting for their job's counter $inc
+APPLICANT_COUNT_GRACE_SECONDS = 60
+APPLICANT_COUNT_BATCH_SIZE = 500
+
+async def reconcile_applicant_counts() -> int:
+    """Rewrite applicant_counts on jobs whose counters drifted from the applications collection.
+
+    Jobs are recounted a batch at a time. A rewrite only applies while the
+    counters still hold the value read before counting, and jobs with
+    applications written in the last APPLICANT_COUNT_GRACE_SECONDS wait for the
+    next run, so a concurrent apply or status change is never overwritten.
+    """
+    touched, last_job_id = 0, None
+    while True:
+        query = {"job_id": {"$gt": last_job_id}} if last_job_id else {}
+        jobs = await db.jobs.find(query, {"_id": 0, "job_id": 1, "applicant_counts": 1}).sort("job_id", 1) \
+            .limit(APPLICANT_COUNT_BATCH_SIZE).to_list(APPLICANT_COUNT_BATCH_SIZE)
+        if not jobs:
+            return touched
+        last_job_id = jobs[-1]["job_id"]
+        rows = await db.applications.aggregate(count_stages({"job_id": {"$in": [job["job_id"] for job in jobs]}})).to_list(None)
+        actual = tally(rows)
+        cutoff = utcnow() - timedelta(seconds=APPLICANT_COUNT_GRACE_SECONDS)
+        busy = {row["_id"]["job_id"] for row in rows if row.get("last_updated_at") and as_datetime(row["last_updated_at"]) > cutoff}
+        for job in jobs:
+            expected = actual.get(job["job_id"], empty_applicant_counts())
+            if job.get("applicant_counts") == expected or job["job_id"] in busy:
+                continue
+            result = await db.jobs.update_one(
+                {"job_id": job["job_id"], "applicant_counts": job.get("applicant_counts")},
+                {"$set": {"applicant_counts": expected}}
+            )
+            touched += result.modified_count
+        if len(jobs) < APPLICANT_COUNT_BATCH_SIZE:
+            return touched
+        await asyncio.sleep(0)
+
+async def geocode_missing_locations() -> int:
+    """Derive location_normalized/location_point for documents saved before geocoding existed"""
+    touched = 0
+    for collection in (db.jobs, db.job_seeker_profiles):
+        while True:
+            # null matches only documents never looked at; unknown places are stored as ""
+            docs = await collection.find({"location_normalized": None}, {"_id": 0, "location": 1}).limit(1000).to_list(1000)
+            if not docs:
+                break
+            # Few distinct location strings repeat across many documents, so update by text
+            batch_touched = 0
+            for text in {d.get("location") for d in docs}:
+                result = await collection.update_many(
+                    {"location_normalized": None, "location": text},
+                    location_update(text)
+                )
+                batch_touched += result.modified_count
+            touched += batch_touched
+            if batch_touched == 0:
+                break
+            await asyncio.sleep(0)
+    return touched
+
+scheduler = Scheduler(db)
+scheduler.register(PeriodicTask("expire_subscriptions", float(os.environ.get("SUBSCRIPTION_SWEEP_SECONDS", "900")), expire_lapsed_subscriptions))
+scheduler.register(PeriodicTask("reset_monthly_quotas", float(os.environ.get("QUOTA_RESET_SWEEP_SECONDS", "3600")), reset_monthly_quotas))
+scheduler.register(PeriodicTask("geocode_missing_locations", float(os.environ.get("GEOCODE_SWEEP_SECONDS", "3600")), geocode_missing_locations))
+scheduler.register(PeriodicTask("reconcile_applicant_counts", float(os.environ.get("APPLICANT_COUNT_SWEEP_SECONDS", "21600")), reconcile_applicant_counts))
+if ARCHIVE_ENABLED:
+    scheduler.register(PeriodicTask("archive_cold_documents", ARCHIVE_SWEEP_SECONDS, archiver.run))
+
 # Include router
 # Include router (Moved to end to ensure all routes are registered)
 # app.include_router(api_router)
 
 
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
+# ============ LIFECYCLE ============
+
+MONGO_WARM_CONNECTIONS = int(os.environ.get("MONGO_WARM_CONNECTIONS", "5"))
+READINESS_PING_TIMEOUT_SECONDS = float(os.environ.get("READINESS_PING_TIMEOUT_SECONDS", "2"))
+# Startup phases and their durations, reported by /readyz
+startup_report = {"ready": False, "import_ms": None, "startup_ms": None, "phases": {}}
+
+async def create_indexes():
+    """Indexes the hot queries depend on; creating an existing index is a no-op"""
+    try:
+        # Business-id collections skip these, their _id index already covers the key
+        for collection, key in BUSINESS_KEYS.items():
+            await db[collection].create_index(key, unique=True)
+    except PyMongoError as e:
+        logger.error(f"Business key index creation failed: {e}")
+    try:
+        await db.recruiter_profiles.create_index("user_id", unique=True)
+        # Only active subscriptions can lapse, so keep the expiry sweep's index small
+        await db.recruiter_profiles.create_index(
+            "subscription_end",
+            partialFilterExpression={"subscription_status": "active"}
+        )
+        await db.recruiter_profiles.create_index("quota_period")
+    except PyMongoError as e:
+        logger.error(f"Index creation failed: {e}")
+    try:
+        # apply_to_job relies on this index to reject duplicate applications
+        await db.applications.create_index([("job_id", 1), ("job_seeker_id", 1)], unique=True)
+    except PyMongoError as e:
+        logger.error(f"Unique application index failed, remove duplicate applications and restart: {e}")
+    try:
+        await db.jobs.create_index([("location_point", "2dsphere")])
+        await db.jobs.create_index([("location_normalized", 1), ("status", 1), ("posted_at", -1)])
+        await db.job_seeker_profiles.create_index([("location_point", "2dsphere")])
+        await db.job_seeker_profiles.create_index("location_normalized")
+    except PyMongoError as e:
+        logger.error(f"Location index creation failed: {e}")
+    try:
+        await message_store.ensure_indexes()
+    except PyMongoError as e:
+        logger.error(f"Message index creation failed: {e}")
+
+async def warm_mongo_pool():
+    """Open connections before traffic arrives so the first requests skip the handshakes"""
+    await asyncio.gather(*[client.admin.command("ping") for _ in range(max(1, MONGO_WARM_CONNECTIONS))])
+
+async def start_slow_query_recorder():
+    if SLOW_QUERY_ENABLED:
+        await slow_query_recorder.start(db)
+
+async def create_rate_limit_indexes():
+    if RATE_LIMIT_ENABLED and isinstance(rate_limit_backend, MongoBucketBackend):
+        await rate_limit_backend.ensure_indexes()
+
+async def start_scheduler():
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+
+async def start_change_listener():
+    change_listener.start()
+
+async def build_typeahead():
+    await job_typeahead.rebuild()
+
+async def build_talent_index():
+    await talent_index.rebuild()
+
+async def warm_outbound_http():
+    warmed = await warm_http_client(HTTP_WARM_URLS)
+    logger.info(f"Pre-connected to {warmed} outbound host(s)")
+
+async def load_revocations():
+    # Start polling first, so a failed initial load is retried
+    revocations.start()
+    await revocations.ensure_indexes()
+    await revocations.sync()
+
+STARTUP_PHASES = [
+    ("mongo_pool", warm_mongo_pool),
+    ("http_pool", warm_outbound_http),
+    ("indexes", create_indexes),
+    ("slow_query_recorder", start_slow_query_recorder),
+    ("rate_limit_indexes", create_rate_limit_indexes),
+    ("scheduler", start_scheduler),
+    # Before the change stream, so events replayed from the resume token apply on top of the build
+    ("typeahead", build_typeahead),
+    ("talent_index", build_talent_index),
+    ("revocations", load_revocations),
+    ("change_streams", start_change_listener),
+]
+
+async def on_startup():
+    started = time.perf_counter()
+    for name, phase in STARTUP_PHASES:
+        phase_started = time.perf_counter()
+        try:
+            await phase()
+        except Exception as e:
+            # Keep booting; /readyz reports whether Mongo is reachable
+            logger.error(f"Startup phase {name} failed: {e}", exc_info=True)
+        startup_report["phases"][name] = round((time.perf_counter() - phase_started) * 1000, 1)
+    startup_report["startup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    startup_report["ready"] = True
+    logger.info(f"Startup finished in {startup_report['startup_ms']}ms (imports {startup_report['import_ms']}ms): {startup_report['phases']}")
+
+async def on_shutdown():
+    startup_report["ready"] = False
+    await scheduler.stop()
+    await revocations.stop()
+    await change_listener.stop()
+    if SLOW_QUERY_ENABLED:
+        await slow_query_recorder.stop()
+    await close_http_client()
     client.close()
+    stop_logging()
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving the event loop"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: startup finished and MongoDB answers a ping"""
+    if not startup_report["ready"]:
+        return JSONResponse(status_code=503, content={"status": "starting", **startup_report})
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), READINESS_PING_TIMEOUT_SECONDS)
+    except (PyMongoError, asyncio.TimeoutError) as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "error": str(e), **startup_report})
+    return {"status": "ready", **startup_report}
 
 @api_router.post("/integrations/placfy/sync-subscription")
 async def sync_placfy_subscription(data: SubscriptionSyncRequest):
@@ -1240,7 +2077,7 @@ async def sync_placfy_subscription(data: SubscriptionSyncRequest):
             "role": "recruiter",
             "password_hash": hashed_password,
             "picture": None,
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": utcnow()
         }
         await db.users.insert_one(user_doc)
         
@@ -1250,7 +2087,9 @@ async def sync_placfy_subscription(data: SubscriptionSyncRequest):
             "company_name": "",
             "subscription_plan": "free",
             "subscription_status": "inactive",
-            "jobs_posted_this_month": 0
+            "jobs_posted_this_month": 0,
+            "job_limit": PLAN_JOB_LIMITS["free"],
+            "quota_period": current_quota_period()
         }
         await db.recruiter_profiles.insert_one(profile_doc)
         user = user_doc
@@ -1259,7 +2098,7 @@ async def sync_placfy_subscription(data: SubscriptionSyncRequest):
         if data.password:
             hashed_password = pwd_context.hash(data.password)
             await db.users.update_one(
-                {"_id": user["_id"]},
+                {"user_id": user["user_id"]},
                 {"$set": {"password_hash": hashed_password}}
             )
     
@@ -1267,14 +2106,14 @@ async def sync_placfy_subscription(data: SubscriptionSyncRequest):
     update_data = {
         "subscription_plan": data.plan_name,
         "subscription_status": data.status,
-        "updated_at": datetime.now(timezone.utc).isoformat()
+        "updated_at": utcnow()
     }
     if data.job_limit is not None:
         update_data["custom_job_limit"] = data.job_limit
         
     await db.recruiter_profiles.update_one(
         {"user_id": user["user_id"]},
-        {"$set": update_data},
+        [literal_set(update_data), JOB_LIMIT_STAGE],
         upsert=True
     )
     
@@ -1282,3 +2121,5 @@ async def sync_placfy_subscription(data: SubscriptionSyncRequest):
 
 # Include router at the end to ensure all routes are registered
 app.include_router(api_router)
+
+startup_report["import_ms"] = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
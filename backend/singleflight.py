@@ -0,0 +1,112 @@
+"""Coalesce concurrent identical reads into one database call.
+
+When many requests ask for the same thing at once (a job going viral), the
+first caller for a key starts the lookup and every caller arriving while it
+is in flight waits for the same result instead of issuing its own query.
+Nothing is kept once the call finishes, so this caps database load during
+spikes without serving anything staler than the query itself.
+
+The call runs in its own task, so a caller that disconnects does not cancel
+it for the others. Callers stop waiting after the key's timeout, and a
+flight older than its timeout is no longer joined, so one stuck query cannot
+hold a key forever. Waiters share the result object and must not mutate it.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+SINGLEFLIGHT_ENABLED = os.environ.get("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+SINGLEFLIGHT_TIMEOUT_SECONDS = float(os.environ.get("SINGLEFLIGHT_TIMEOUT_SECONDS", "5"))
+
+# Every group registers itself here so /admin/caches can report them
+FLIGHTS: Dict[str, "SingleFlight"] = {}
+
+
+def query_key(*parts) -> str:
+    """One key for logically identical queries: dict key order and spacing don't matter"""
+    return json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+
+
+class _Flight:
+    __slots__ = ("future", "deadline", "waiters", "task")
+
+    def __init__(self, deadline: float):
+        self.future = asyncio.get_running_loop().create_future()
+        self.deadline = deadline
+        self.waiters = 1
+        self.task = None
+
+
+class SingleFlight:
+    def __init__(self, name: str, timeout_seconds: float = SINGLEFLIGHT_TIMEOUT_SECONDS,
+                 enabled: bool = SINGLEFLIGHT_ENABLED):
+        self.name = name
+        self.timeout_seconds = timeout_seconds
+        self.enabled = enabled
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.max_waiters = 0
+        FLIGHTS[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """`await fn()`, or the result of the identical call already in flight for `key`.
+
+        Raises asyncio.TimeoutError once `timeout` seconds have passed since
+        the flight started.
+        """
+        if not self.enabled:
+            return await fn()
+        self.calls += 1
+        now = time.monotonic()
+        flight = self._inflight.get(key)
+        if flight is not None and now < flight.deadline:
+            self.shared += 1
+            flight.waiters += 1
+            self.max_waiters = max(self.max_waiters, flight.waiters)
+        else:
+            flight = _Flight(now + (self.timeout_seconds if timeout is None else timeout))
+            self._inflight[key] = flight
+            self.executions += 1
+            flight.task = asyncio.create_task(self._run(key, flight, fn))
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.future), flight.deadline - now)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    async def _run(self, key: Hashable, flight: _Flight, fn: Callable[[], Awaitable[Any]]):
+        try:
+            result = await fn()
+        except Exception as e:
+            self.errors += 1
+            flight.future.set_exception(e)
+            # Every waiter may have timed out already; don't warn about an unretrieved exception
+            flight.future.exception()
+        else:
+            flight.future.set_result(result)
+        finally:
+            if not flight.future.done():
+                # Cancelled (e.g. at shutdown): release the waiters now instead of at their timeout
+                flight.future.cancel()
+            if self._inflight.get(key) is flight:
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "timeout_seconds": self.timeout_seconds,
+            "calls": self.calls,
+            "executions": self.executions,
+            "shared": self.shared,
+            "coalescing_ratio": round(self.shared / self.calls, 4) if self.calls else None,
+            "max_waiters": self.max_waiters,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
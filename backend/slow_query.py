@@ -0,0 +1,263 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+from collections import deque
+from datetime import datetime, timezone, timedelta
+
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_COLLECTION = "slow_queries"
+SLOW_QUERY_ENABLED = os.environ.get("SLOW_QUERY_LOG_ENABLED", "true").lower() == "true"
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0.1"))
+SLOW_QUERY_CAP_BYTES = int(os.environ.get("SLOW_QUERY_CAP_BYTES", str(16 * 1024 * 1024)))
+SLOW_QUERY_FLUSH_SECONDS = float(os.environ.get("SLOW_QUERY_FLUSH_SECONDS", "5"))
+
+# Commands worth timing, and the fields of each that carry user-supplied literals
+_TRACKED_COMMANDS = {
+    "find": ("filter",),
+    "aggregate": ("pipeline",),
+    "count": ("query",),
+    "distinct": ("query",),
+    "findAndModify": ("query", "update"),
+    "update": ("updates",),
+    "delete": ("deletes",),
+}
+# Fields that never belong in an explain request
+_SESSION_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction"}
+
+
+def redact(value):
+    """Replace literals with '?' while keeping field names and operators"""
+    if isinstance(value, dict):
+        return {k: redact(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if value and all(not isinstance(v, (dict, list, tuple)) for v in value):
+            # $in lists of different lengths share a single shape
+            return ["?"]
+        return [redact(v) for v in value]
+    return "?"
+
+
+def command_shape(command_name: str, command: dict) -> dict:
+    """Build the redacted shape of a command; sort/projection are structural and kept as-is"""
+    shape = {}
+    for field in _TRACKED_COMMANDS[command_name]:
+        if field in command:
+            shape[field] = redact(command[field])
+    for field in ("sort", "projection", "key"):
+        if field in command:
+            shape[field] = command[field]
+    return shape
+
+
+def fingerprint(command_name: str, collection: str, shape: dict) -> str:
+    raw = json.dumps({"op": command_name, "ns": collection, "shape": shape}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _find_execution_stats(explain):
+    """Locate executionStats in find or aggregate explain output"""
+    if isinstance(explain, dict):
+        if "executionStats" in explain:
+            return explain["executionStats"]
+        for value in explain.values():
+            found = _find_execution_stats(value)
+            if found:
+                return found
+    elif isinstance(explain, list):
+        for value in explain:
+            found = _find_execution_stats(value)
+            if found:
+                return found
+    return None
+
+
+def _plan_stages(plan, stages=None):
+    """Collect stage names (COLLSCAN, IXSCAN, ...) from a winning plan"""
+    stages = [] if stages is None else stages
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for key in ("inputStage", "queryPlan"):
+            if key in plan:
+                _plan_stages(plan[key], stages)
+        for child in plan.get("inputStages", []):
+            _plan_stages(child, stages)
+    return stages
+
+
+def _find_winning_plan(explain):
+    if isinstance(explain, dict):
+        planner = explain.get("queryPlanner")
+        if isinstance(planner, dict) and "winningPlan" in planner:
+            return planner["winningPlan"]
+        for value in explain.values():
+            found = _find_winning_plan(value)
+            if found:
+                return found
+    elif isinstance(explain, list):
+        for value in explain:
+            found = _find_winning_plan(value)
+            if found:
+                return found
+    return None
+
+
+class SlowQueryRecorder(monitoring.CommandListener):
+    """Times Mongo commands and records the slow ones to a capped collection.
+
+    Driver callbacks run on Motor's executor threads, so they only append to a
+    deque; an asyncio task drains it, samples `explain` and writes the records.
+    """
+
+    def __init__(self, threshold_ms=SLOW_QUERY_THRESHOLD_MS, sample_rate=SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+                 flush_seconds=SLOW_QUERY_FLUSH_SECONDS, max_pending=1000):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.flush_seconds = flush_seconds
+        self._inflight = {}
+        self._pending = deque(maxlen=max_pending)
+        self._db = None
+        self._task = None
+
+    # ---- pymongo listener callbacks ----
+
+    def started(self, event):
+        if event.command_name not in _TRACKED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if collection == SLOW_QUERY_COLLECTION or not isinstance(collection, str):
+            return
+        self._inflight[(event.connection_id, event.request_id)] = (event.database_name, collection, event.command)
+
+    def succeeded(self, event):
+        started = self._inflight.pop((event.connection_id, event.request_id), None)
+        if started is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        if duration_ms < self.threshold_ms:
+            return
+        database, collection, command = started
+        n_returned = None
+        cursor = event.reply.get("cursor") if isinstance(event.reply, dict) else None
+        if cursor is not None:
+            n_returned = len(cursor.get("firstBatch", []))
+        elif "n" in event.reply:
+            n_returned = event.reply["n"]
+        self._record(event.command_name, database, collection, command, duration_ms, n_returned)
+
+    def failed(self, event):
+        self._inflight.pop((event.connection_id, event.request_id), None)
+
+    def _record(self, command_name, database, collection, command, duration_ms, n_returned):
+        shape = command_shape(command_name, command)
+        fp = fingerprint(command_name, collection, shape)
+        logger.warning(f"Slow Mongo {command_name} on {collection} took {duration_ms:.1f}ms (fingerprint {fp})")
+        self._pending.append({
+            "fingerprint": fp,
+            "op": command_name,
+            "collection": collection,
+            "database": database,
+            "shape": shape,
+            "duration_ms": round(duration_ms, 2),
+            "docs_returned": n_returned,
+            "recorded_at": datetime.now(timezone.utc),
+            # Kept in memory only so the sampled explain can replay the real query
+            "_command": command,
+        })
+
+    # ---- background flushing ----
+
+    async def start(self, db):
+        self._db = db
+        try:
+            await db.create_collection(SLOW_QUERY_COLLECTION, capped=True, size=SLOW_QUERY_CAP_BYTES)
+        except CollectionInvalid:
+            pass
+        except PyMongoError as e:
+            logger.error(f"Could not create slow query collection: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Slow query flush failed: {e}")
+
+    async def flush(self):
+        if self._db is None or not self._pending:
+            return
+        records = []
+        while self._pending:
+            record = self._pending.popleft()
+            command = record.pop("_command")
+            if random.random() < self.sample_rate:
+                record.update(await self._explain(record["database"], command))
+            records.append(record)
+        await self._db[SLOW_QUERY_COLLECTION].insert_many(records, ordered=False)
+
+    async def _explain(self, database, command):
+        explainable = {k: v for k, v in command.items() if not k.startswith("$") and k not in _SESSION_FIELDS}
+        if any("$out" in stage or "$merge" in stage for stage in explainable.get("pipeline", [])):
+            return {}
+        try:
+            explain = await self._db.client[database].command(
+                {"explain": explainable, "verbosity": "executionStats"}
+            )
+        except PyMongoError as e:
+            logger.info(f"Explain for slow query failed: {e}")
+            return {}
+        stats = _find_execution_stats(explain) or {}
+        return {
+            "explained": True,
+            "docs_examined": stats.get("totalDocsExamined"),
+            "keys_examined": stats.get("totalKeysExamined"),
+            "explain_returned": stats.get("nReturned"),
+            "plan_stages": _plan_stages(_find_winning_plan(explain)),
+        }
+
+
+async def slow_query_report(db, since_minutes: int = 1440, limit: int = 50):
+    """Group recorded slow operations by fingerprint, worst total time first"""
+    since = datetime.now(timezone.utc) - timedelta(minutes=since_minutes)
+    pipeline = [
+        {"$match": {"recorded_at": {"$gte": since}}},
+        {"$group": {
+            "_id": "$fingerprint",
+            "op": {"$first": "$op"},
+            "collection": {"$first": "$collection"},
+            "shape": {"$first": "$shape"},
+            "count": {"$sum": 1},
+            "total_ms": {"$sum": "$duration_ms"},
+            "avg_ms": {"$avg": "$duration_ms"},
+            "max_ms": {"$max": "$duration_ms"},
+            "avg_docs_examined": {"$avg": "$docs_examined"},
+            "avg_docs_returned": {"$avg": "$docs_returned"},
+            "plan_stages": {"$max": "$plan_stages"},
+            "last_seen": {"$max": "$recorded_at"},
+        }},
+        {"$sort": {"total_ms": -1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "fingerprint": "$_id", "op": 1, "collection": 1, "shape": 1, "count": 1,
+                      "total_ms": 1, "avg_ms": 1, "max_ms": 1, "avg_docs_examined": 1,
+                      "avg_docs_returned": 1, "plan_stages": 1, "last_seen": 1}},
+    ]
+    return await db[SLOW_QUERY_COLLECTION].aggregate(pipeline).to_list(limit)
+
+
+slow_query_recorder = SlowQueryRecorder()
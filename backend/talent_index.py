@@ -0,0 +1,490 @@
+"""In-memory talent search over job-seeker profiles, for recruiters.
+
+Each profile is one row of a set of numpy columns (experience, expected
+salary, location id). Skills are an inverted index from lowercase skill to
+the rows listing it, kept as sets for updates and turned into sorted arrays
+on first use. Experience and expected salary also have a `RangeIndex`, so
+range filters are two binary searches instead of a scan.
+
+Candidates are ranked by `fit_scores`, a vectorized score of how well each
+profile fits a job: the share of the job's required skills the profile has,
+experience against `experience_required`, same location, and whether the
+job's salary covers the candidate's expected minimum. Searching with a job
+ranks against that job; otherwise the filters themselves act as the job.
+
+`ApplicantRanking` applies the same score to every applicant of one job at
+once. It remembers the index version of each applicant's row, so a cached
+ranking can check for profile changes with one vector comparison.
+
+The index is maintained profile by profile from `update_job_seeker_profile`
+and change-stream events, like the job typeahead. Events it cannot apply
+(deletes, missed history) trigger a full rebuild from Mongo, and so does a
+read of an index older than TALENT_INDEX_MAX_AGE_SECONDS while the change
+stream is not running.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from change_streams import touches
+from geo import geocode, normalize as normalize_location
+
+logger = logging.getLogger(__name__)
+
+# Profile fields the index reads; updates touching none of them are ignored
+TALENT_FIELDS = (
+    "skills", "experience_years", "location", "location_normalized", "preferred_salary_min", "preferred_salary_max",
+)
+TALENT_PROJECTION = {"_id": 0, "user_id": 1, **{field: 1 for field in TALENT_FIELDS}}
+# Weights of the fit components; they add up to 1 so a perfect fit scores 1.0
+FIT_WEIGHTS = {"skills": 0.6, "experience": 0.2, "location": 0.1, "salary": 0.1}
+# Rows changed since the last sort are checked one by one until there are this many
+RESORT_MIN_DIRTY = 1024
+RESORT_DIRTY_FRACTION = 1 / 32
+_INITIAL_CAPACITY = 1024
+TALENT_INDEX_MAX_AGE_SECONDS = float(os.environ.get("TALENT_INDEX_MAX_AGE_SECONDS", "300"))
+
+
+def skill_key(skill: str) -> str:
+    return " ".join(skill.lower().split())
+
+
+def skill_keys(skills: Optional[Iterable[str]]) -> List[str]:
+    """Distinct non-empty keys of `skills`, in order"""
+    return list(dict.fromkeys(filter(None, (skill_key(s) for s in skills or () if isinstance(s, str)))))
+
+
+def location_key(location: Optional[str], normalized: Optional[str] = None) -> str:
+    """Geocoded place name when known, else the normalized text, so both sides compare alike"""
+    if normalized:
+        return normalized
+    if not location:
+        return ""
+    place = geocode(location)
+    return place.name if place else normalize_location(location)
+
+
+class RangeIndex:
+    """Rows ordered by one numeric column, answering lo <= value <= hi without a scan.
+
+    The order is sorted in bulk. Rows changed since are kept in a dirty set
+    and checked against the live column, until there are enough of them to
+    make a re-sort cheaper.
+    """
+
+    def __init__(self):
+        self.order = np.empty(0, dtype=np.int64)
+        self.sorted_values = np.empty(0, dtype=np.float64)
+        self.dirty: Set[int] = set()
+        self.sorts = 0
+
+    def sort(self, values: np.ndarray, rows: np.ndarray):
+        self.order = rows[np.argsort(values[rows], kind="stable")]
+        self.sorted_values = values[self.order]
+        self.dirty.clear()
+        self.sorts += 1
+
+    def needs_sort(self, row_count: int) -> bool:
+        return len(self.dirty) > max(RESORT_MIN_DIRTY, row_count * RESORT_DIRTY_FRACTION)
+
+    def rows_between(self, values: np.ndarray, lo: float = -np.inf, hi: float = np.inf) -> np.ndarray:
+        start = np.searchsorted(self.sorted_values, lo, side="left")
+        end = np.searchsorted(self.sorted_values, hi, side="right")
+        rows = self.order[start:end]
+        if self.dirty:
+            dirty = np.fromiter(self.dirty, dtype=np.int64, count=len(self.dirty))
+            # NaN (removed rows) fails both comparisons
+            current = values[dirty]
+            rows = np.concatenate([rows[~np.isin(rows, dirty)], dirty[(current >= lo) & (current <= hi)]])
+        return rows
+
+
+class TalentIndex:
+    def __init__(self, loader: Optional[Callable[[], Awaitable[Iterable[dict]]]] = None,
+                 synced: Optional[Callable[[], bool]] = None, max_age_seconds: float = TALENT_INDEX_MAX_AGE_SECONDS):
+        self.loader = loader
+        # Whether change-stream events are arriving; without them the index expires after max_age_seconds
+        self.synced = synced
+        self.max_age_seconds = max_age_seconds
+        self._built_at: Optional[float] = None
+        self._rows: Dict[str, int] = {}
+        self._profiles: List[Optional[dict]] = []
+        self._free_rows: List[int] = []
+        self._skills: Dict[str, Set[int]] = {}
+        self._postings: Dict[str, np.ndarray] = {}
+        self._row_skills: List[Tuple[str, ...]] = []
+        self._location_ids: Dict[str, int] = {}
+        self._allocate(_INITIAL_CAPACITY)
+        self._writes = 0
+        self.experience_range = RangeIndex()
+        self.salary_range = RangeIndex()
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._latencies_us = deque(maxlen=2000)
+        self.searches = 0
+        self.updates = 0
+        self.rebuilds = 0
+        self.last_build_ms = None
+
+    def _allocate(self, capacity: int):
+        self.live = np.zeros(capacity, dtype=bool)
+        # NaN marks free rows, so range filters never return them
+        self.experience = np.full(capacity, np.nan)
+        # Expected salary floor; profiles without one accept any salary
+        self.salary_min = np.full(capacity, np.nan)
+        self.location = np.full(capacity, -1, dtype=np.int32)
+        # Bumped on every write to a row, so cached scores can tell which rows changed
+        self.version = np.zeros(capacity, dtype=np.int64)
+
+    def _columns(self) -> tuple:
+        return self.live, self.experience, self.salary_min, self.location, self.version
+
+    def _grow(self):
+        old = self._columns()
+        self._allocate(len(self.live) * 2)
+        for new, values in zip(self._columns(), old):
+            new[:len(values)] = values
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._rows
+
+    # ============ BUILD ============
+
+    def build(self, profiles: Iterable[dict]):
+        """Replace the whole index with `profiles`"""
+        started = time.perf_counter()
+        self._rows, self._profiles, self._free_rows, self._row_skills = {}, [], [], []
+        self._skills, self._postings, self._location_ids = {}, {}, {}
+        self._allocate(_INITIAL_CAPACITY)
+        for profile in profiles:
+            self._store(profile)
+        self._sort_ranges()
+        self.rebuilds += 1
+        self._built_at = time.monotonic()
+        self.last_build_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def _sort_ranges(self):
+        rows = np.flatnonzero(self.live)
+        self.experience_range.sort(self.experience, rows)
+        self.salary_range.sort(self.salary_min, rows)
+
+    async def rebuild(self):
+        if self.loader is None:
+            return
+        self.build(await self.loader())
+        logger.info(f"Talent index rebuilt: {len(self._rows)} profiles, {len(self._skills)} skills "
+                    f"in {self.last_build_ms}ms")
+
+    def schedule_rebuild(self):
+        if self._rebuild_task is None or self._rebuild_task.done():
+            self._rebuild_task = asyncio.create_task(self._rebuild_logged())
+
+    async def _rebuild_logged(self):
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"Talent index rebuild failed: {e}", exc_info=True)
+
+    def refresh_if_expired(self):
+        """Rebuild in the background if other workers' writes may be missing; reads use the current index meanwhile"""
+        if self.loader is None or self.synced is None or self.synced():
+            return
+        if self._built_at is None or time.monotonic() - self._built_at > self.max_age_seconds:
+            self.schedule_rebuild()
+
+    # ============ INCREMENTAL UPDATES ============
+
+    def _store(self, profile: dict) -> int:
+        user_id = profile["user_id"]
+        row = self._rows.get(user_id)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                row = len(self._profiles)
+                if row == len(self.live):
+                    self._grow()
+                self._profiles.append(None)
+                self._row_skills.append(())
+            self._rows[user_id] = row
+        else:
+            self._unlink_skills(row)
+        skills = tuple(skill_keys(profile.get("skills")))
+        for skill in skills:
+            self._skills.setdefault(skill, set()).add(row)
+            self._postings.pop(skill, None)
+        self._row_skills[row] = skills
+        self._profiles[row] = {field: profile.get(field) for field in TALENT_PROJECTION if field != "_id"}
+        self.live[row] = True
+        self.experience[row] = profile.get("experience_years") or 0
+        self.salary_min[row] = profile.get("preferred_salary_min") or 0
+        key = location_key(profile.get("location"), profile.get("location_normalized"))
+        self.location[row] = self._location_ids.setdefault(key, len(self._location_ids)) if key else -1
+        self._touch(row)
+        return row
+
+    def _touch(self, row: int):
+        self._writes += 1
+        self.version[row] = self._writes
+
+    def _unlink_skills(self, row: int):
+        for skill in self._row_skills[row]:
+            rows = self._skills[skill]
+            rows.discard(row)
+            if not rows:
+                del self._skills[skill]
+            self._postings.pop(skill, None)
+        self._row_skills[row] = ()
+
+    def _mark(self, row: int):
+        self.experience_range.dirty.add(row)
+        self.salary_range.dirty.add(row)
+
+    def update(self, profile: dict):
+        """Re-index one profile from its current fields"""
+        self._mark(self._store(profile))
+        self.updates += 1
+
+    def remove(self, user_id: str):
+        row = self._rows.pop(user_id, None)
+        if row is None:
+            return
+        self._unlink_skills(row)
+        self._profiles[row] = None
+        self.live[row] = False
+        self.experience[row] = self.salary_min[row] = np.nan
+        self.location[row] = -1
+        self._touch(row)
+        self._free_rows.append(row)
+        self._mark(row)
+        self.updates += 1
+
+    def apply_change(self, change: dict):
+        """Change-stream callback for the job_seeker_profiles collection"""
+        document = change.get("fullDocument")
+        if change.get("operationType") in ("insert", "update", "replace") and document:
+            if touches(change, TALENT_FIELDS):
+                self.update(document)
+        else:
+            # Deletes only carry _id and "invalidate" means events were missed
+            self.schedule_rebuild()
+
+    # ============ SCORING ============
+
+    def rows_of(self, user_ids: List[str]) -> np.ndarray:
+        """Row of each of `user_ids`, -1 for users without an indexed profile"""
+        rows = self._rows
+        return np.fromiter((rows.get(user_id, -1) for user_id in user_ids), dtype=np.int64, count=len(user_ids))
+
+    def _posting(self, skill: str) -> np.ndarray:
+        posting = self._postings.get(skill)
+        if posting is None:
+            rows = self._skills.get(skill, ())
+            posting = self._postings[skill] = np.fromiter(sorted(rows), dtype=np.int64, count=len(rows))
+        return posting
+
+    def skill_hits(self, skills: Iterable[str], rows: np.ndarray) -> np.ndarray:
+        """How many of `skills` each of `rows` lists"""
+        if len(rows) * 8 < len(self._profiles):
+            # A few rows out of many (one job's applicants): look them up in each posting
+            hits = np.zeros(len(rows), dtype=np.int32)
+            for skill in skills:
+                hits += np.isin(rows, self._posting(skill), assume_unique=True)
+            return hits
+        counts = np.zeros(len(self.live), dtype=np.int32)
+        for skill in skills:
+            counts[self._posting(skill)] += 1
+        return counts[rows]
+
+    def fit_scores(self, job: dict, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """Per-component and total fit of `rows` for `job`, each in [0, 1]"""
+        required = skill_keys(job.get("required_skills"))
+        ones = np.ones(len(rows))
+        fit = {}
+        fit["skills"] = self.skill_hits(required, rows) / len(required) if required else ones
+
+        experience_required = job.get("experience_required") or 0
+        fit["experience"] = (np.clip(self.experience[rows] / experience_required, 0, 1)
+                             if experience_required > 0 else ones)
+
+        key = location_key(job.get("location"), job.get("location_normalized"))
+        if key:
+            location_id = self._location_ids.get(key, -2)
+            fit["location"] = (self.location[rows] == location_id).astype(np.float64)
+        else:
+            fit["location"] = ones
+
+        budget = job.get("salary_max") or job.get("salary_min")
+        if budget:
+            expected = self.salary_min[rows]
+            fit["salary"] = np.where(expected <= budget, 1.0, budget / np.maximum(expected, 1))
+        else:
+            fit["salary"] = ones
+
+        fit["score"] = sum(FIT_WEIGHTS[name] * fit[name] for name in FIT_WEIGHTS)
+        return fit
+
+    def ranked(self, fit: Dict[str, np.ndarray], rows: np.ndarray, skip: int, limit: int) -> np.ndarray:
+        """Positions into `rows` of the page, best fit first, then most experienced"""
+        wanted = min(len(rows), skip + limit)
+        if wanted <= 0:
+            return np.empty(0, dtype=np.int64)
+        score = np.round(fit["score"], 6)
+        candidates = np.arange(len(rows))
+        if wanted < len(rows):
+            # Only the first pages need a full sort; ties at the cut-off are kept and sorted below
+            threshold = np.partition(score, len(rows) - wanted)[len(rows) - wanted]
+            candidates = np.flatnonzero(score >= threshold)
+        order = np.lexsort((rows[candidates], -self.experience[rows[candidates]], -score[candidates]))
+        return candidates[order][skip:wanted]
+
+    # ============ SEARCH ============
+
+    def search(self, skills: Iterable[str] = (), min_experience: Optional[float] = None,
+               max_experience: Optional[float] = None, location: Optional[str] = None,
+               salary_max: Optional[float] = None, job: Optional[dict] = None,
+               skip: int = 0, limit: int = 20) -> dict:
+        """Profiles matching every filter, ranked by fit for `job` (or the filters themselves).
+
+        `skills` must all be listed, and `salary_max` keeps candidates whose
+        expected minimum salary it covers.
+        """
+        started = time.perf_counter()
+        self.refresh_if_expired()
+        for index in (self.experience_range, self.salary_range):
+            if index.needs_sort(len(self._rows)):
+                self._sort_ranges()
+                break
+
+        mask = self.live.copy()
+        if min_experience is not None or max_experience is not None:
+            mask &= self._mask(self.experience_range.rows_between(
+                self.experience,
+                -np.inf if min_experience is None else min_experience,
+                np.inf if max_experience is None else max_experience,
+            ))
+        if salary_max is not None:
+            mask &= self._mask(self.salary_range.rows_between(self.salary_min, hi=salary_max))
+        if location:
+            mask &= self.location == self._location_ids.get(location_key(location), -2)
+        required = skill_keys(skills)
+        # Rarest skill first, so the intersection shrinks as fast as possible
+        for skill in sorted(required, key=lambda s: len(self._skills.get(s, ()))):
+            mask &= self._mask(self._posting(skill))
+        rows = np.flatnonzero(mask)
+
+        if job is None:
+            job = {"required_skills": required, "experience_required": min_experience or 0,
+                   "location": location, "salary_max": salary_max}
+        fit = self.fit_scores(job, rows)
+        page = self.ranked(fit, rows, skip, limit)
+        job_skills = set(skill_keys(job.get("required_skills")))
+        candidates = [{
+            **self._profiles[rows[i]],
+            "score": round(float(fit["score"][i]), 4),
+            "fit": {name: round(float(fit[name][i]), 4) for name in FIT_WEIGHTS},
+            "matched_skills": [s for s in self._profiles[rows[i]].get("skills") or []
+                               if isinstance(s, str) and skill_key(s) in job_skills],
+        } for i in page]
+
+        self.searches += 1
+        self._latencies_us.append((time.perf_counter() - started) * 1e6)
+        return {"total": int(len(rows)), "candidates": candidates}
+
+    def _mask(self, rows: np.ndarray) -> np.ndarray:
+        mask = np.zeros(len(self.live), dtype=bool)
+        mask[rows] = True
+        return mask
+
+    # ============ METRICS ============
+
+    def memory_bytes(self) -> int:
+        """Size of the numpy columns, range orders and skill postings (not the profile dicts)"""
+        arrays = [self.live, self.experience, self.salary_min, self.location, *self._postings.values()]
+        for index in (self.experience_range, self.salary_range):
+            arrays += [index.order, index.sorted_values]
+        return sum(a.nbytes for a in arrays)
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies_us)
+        percentile = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1) if latencies else None  # noqa: E731
+        return {
+            "profiles": len(self._rows),
+            "skills": len(self._skills),
+            "locations": len(self._location_ids),
+            "capacity": len(self.live),
+            "memory_bytes": self.memory_bytes(),
+            "unsorted_rows": len(self.experience_range.dirty),
+            "range_sorts": self.experience_range.sorts,
+            "searches": self.searches,
+            "search_p50_us": percentile(0.5),
+            "search_p99_us": percentile(0.99),
+            "updates": self.updates,
+            "rebuilds": self.rebuilds,
+            "last_build_ms": self.last_build_ms,
+            "age_seconds": round(time.monotonic() - self._built_at, 1) if self._built_at is not None else None,
+        }
+
+
+class ApplicantRanking:
+    """One job's applicants, scored in one batch and ordered best fit first.
+
+    `applications` come newest first, which breaks ties. Applicants without
+    an indexed profile score 0. The caller drops the ranking when the job or
+    its applications change; profile changes are caught by `refresh`.
+    """
+
+    def __init__(self, index: TalentIndex, job: dict, applications: List[dict]):
+        self.index = index
+        self.job = job
+        self.application_ids = [application["application_id"] for application in applications]
+        self.user_ids = [application["job_seeker_id"] for application in applications]
+        self.statuses = np.array([application.get("status") or "pending" for application in applications])
+        self.score()
+
+    def score(self):
+        self.rows = self.index.rows_of(self.user_ids)
+        indexed = self.rows >= 0
+        self.versions = self.index.version[self.rows[indexed]]
+        self.unindexed = [user_id for user_id, row in zip(self.user_ids, self.rows) if row < 0]
+        fit = self.index.fit_scores(self.job, self.rows[indexed])
+        self.fit = {}
+        for name, values in fit.items():
+            self.fit[name] = np.zeros(len(self.rows))
+            self.fit[name][indexed] = values
+        self.indexed = indexed
+        self.order = np.lexsort((np.arange(len(self.rows)), -np.round(self.fit["score"], 6)))
+
+    def refresh(self) -> bool:
+        """Rescore if any applicant's profile changed since scoring; True if it did"""
+        self.index.refresh_if_expired()
+        current = self.index.version[self.rows[self.indexed]]
+        if np.array_equal(current, self.versions) and not any(user_id in self.index for user_id in self.unindexed):
+            return False
+        self.score()
+        return True
+
+    def page(self, skip: int = 0, limit: int = 20, min_score: Optional[float] = None,
+             top_n: Optional[int] = None, status: Optional[str] = None) -> Tuple[int, List[dict]]:
+        """Matching applicant count (capped at `top_n`) and one page of {application_id, score, fit}"""
+        order = self.order
+        if status:
+            order = order[self.statuses[order] == status]
+        if min_score is not None:
+            order = order[self.fit["score"][order] >= min_score]
+        if top_n is not None:
+            order = order[:max(0, top_n)]
+        page = [{
+            "application_id": self.application_ids[i],
+            "score": round(float(self.fit["score"][i]), 4),
+            "fit": {name: round(float(self.fit[name][i]), 4) for name in FIT_WEIGHTS} if self.indexed[i] else None,
+        } for i in order[skip:skip + limit]]
+        return len(order), page
@@ -0,0 +1,264 @@
+"""In-memory typeahead over job titles, company names and skills.
+
+Every term used by an approved job lives in one sorted array of lowercase
+keys, with a parallel array of term ids; a prefix lookup is two bisects and a
+scan of the matching slice. Each word start of a term gets its own key, so
+"eng" also finds "Senior Software Engineer". Terms are weighted by how many
+approved jobs use them.
+
+The index is maintained job by job from local writes and change-stream
+events. Only events it cannot apply (deletes, missed history) trigger a full
+rebuild from Mongo. While the change stream is not running, other workers'
+writes never arrive, so a lookup on an index older than
+TYPEAHEAD_MAX_AGE_SECONDS starts a rebuild in the background.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import sys
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from change_streams import touches
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("title", "company", "skill")
+# Job fields the index reads; updates touching none of them are ignored
+TYPEAHEAD_FIELDS = ("status", "title", "company_name", "required_skills")
+TYPEAHEAD_PROJECTION = {"_id": 0, "job_id": 1, **{field: 1 for field in TYPEAHEAD_FIELDS}}
+MAX_TERM_LENGTH = 100
+# Results per (prefix, kind, limit) are memoized until the next write
+MEMO_MAX_ENTRIES = 4096
+TYPEAHEAD_MAX_AGE_SECONDS = float(os.environ.get("TYPEAHEAD_MAX_AGE_SECONDS", "300"))
+_END = "\U0010ffff"
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())[:MAX_TERM_LENGTH]
+
+
+def job_terms(job: dict) -> Dict[Tuple[str, str], str]:
+    """(kind, key) -> display text for every term an approved job contributes"""
+    if job.get("status") != "approved":
+        return {}
+    values = [("title", job.get("title")), ("company", job.get("company_name"))]
+    values += [("skill", skill) for skill in job.get("required_skills") or []]
+    terms = {}
+    for kind, text in values:
+        if isinstance(text, str) and normalize(text):
+            terms.setdefault((kind, normalize(text)), text.strip())
+    return terms
+
+
+def word_starts(key: str) -> List[str]:
+    words = key.split(" ")
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class TypeaheadIndex:
+    def __init__(self, loader: Optional[Callable[[], Awaitable[Iterable[dict]]]] = None,
+                 synced: Optional[Callable[[], bool]] = None, max_age_seconds: float = TYPEAHEAD_MAX_AGE_SECONDS):
+        self.loader = loader
+        # Whether change-stream events are arriving; without them the index expires after max_age_seconds
+        self.synced = synced
+        self.max_age_seconds = max_age_seconds
+        self._built_at: Optional[float] = None
+        self._keys: List[str] = []
+        self._key_terms: List[int] = []
+        self._term_ids: Dict[Tuple[str, str], int] = {}
+        self._kind: List[str] = []
+        self._display: List[str] = []
+        self._weight: List[int] = []
+        self._free_ids: List[int] = []
+        self._jobs: Dict[str, Tuple[int, ...]] = {}
+        self._memo: Dict[tuple, list] = {}
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._latencies_us = deque(maxlen=2000)
+        self.lookups = 0
+        self.updates = 0
+        self.rebuilds = 0
+        self.last_build_ms = None
+
+    # ============ BUILD ============
+
+    def build(self, jobs: Iterable[dict]):
+        """Replace the whole index with the terms of `jobs`"""
+        started = time.perf_counter()
+        term_ids, kinds, displays, weights, job_map = {}, [], [], [], {}
+        for job in jobs:
+            ids = []
+            for term, display in job_terms(job).items():
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = term_ids[term] = len(kinds)
+                    kinds.append(term[0])
+                    displays.append(display)
+                    weights.append(0)
+                weights[term_id] += 1
+                ids.append(term_id)
+            if ids:
+                job_map[job["job_id"]] = tuple(ids)
+        entries = sorted((key, term_id) for (_, text), term_id in term_ids.items() for key in word_starts(text))
+
+        self._keys = [key for key, _ in entries]
+        self._key_terms = [term_id for _, term_id in entries]
+        self._term_ids, self._kind, self._display, self._weight = term_ids, kinds, displays, weights
+        self._free_ids = []
+        self._jobs = job_map
+        self._memo.clear()
+        self.rebuilds += 1
+        self._built_at = time.monotonic()
+        self.last_build_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    async def rebuild(self):
+        if self.loader is None:
+            return
+        self.build(await self.loader())
+        logger.info(f"Typeahead rebuilt: {len(self._term_ids)} terms from {len(self._jobs)} jobs in {self.last_build_ms}ms")
+
+    def schedule_rebuild(self):
+        if self._rebuild_task is None or self._rebuild_task.done():
+            self._rebuild_task = asyncio.create_task(self._rebuild_logged())
+
+    def expired(self) -> bool:
+        if self.loader is None or self.synced is None or self.synced():
+            return False
+        return self._built_at is None or time.monotonic() - self._built_at > self.max_age_seconds
+
+    async def _rebuild_logged(self):
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"Typeahead rebuild failed: {e}", exc_info=True)
+
+    # ============ INCREMENTAL UPDATES ============
+
+    def update(self, job: dict):
+        """Re-index one job from its current fields; jobs that are not approved drop out"""
+        terms = job_terms(job)
+        old_ids = self._jobs.pop(job["job_id"], ())
+        # Add before removing so a term the job keeps never leaves the arrays
+        new_ids = tuple(self._add_term(term, display) for term, display in terms.items())
+        for term_id in old_ids:
+            self._remove_term(term_id)
+        if new_ids:
+            self._jobs[job["job_id"]] = new_ids
+        if old_ids or new_ids:
+            self.updates += 1
+            self._memo.clear()
+
+    def remove(self, job_id: str):
+        self.update({"job_id": job_id, "status": None})
+
+    def apply_change(self, change: dict):
+        """Change-stream callback for the jobs collection"""
+        document = change.get("fullDocument")
+        if change.get("operationType") in ("insert", "update", "replace") and document:
+            if touches(change, TYPEAHEAD_FIELDS):
+                self.update(document)
+        elif change.get("operationType") == "delete" and "job_id" in change.get("documentKey", {}):
+            # Business-id storage: the deleted _id is the job_id
+            self.remove(change["documentKey"]["job_id"])
+        else:
+            # Deletes only carry _id and "invalidate" means events were missed
+            self.schedule_rebuild()
+
+    def _add_term(self, term: Tuple[str, str], display: str) -> int:
+        term_id = self._term_ids.get(term)
+        if term_id is not None:
+            self._weight[term_id] += 1
+            return term_id
+        if self._free_ids:
+            term_id = self._free_ids.pop()
+            self._kind[term_id], self._display[term_id], self._weight[term_id] = term[0], display, 1
+        else:
+            term_id = len(self._kind)
+            self._kind.append(term[0])
+            self._display.append(display)
+            self._weight.append(1)
+        self._term_ids[term] = term_id
+        for key in word_starts(term[1]):
+            i = bisect_left(self._keys, key)
+            self._keys.insert(i, key)
+            self._key_terms.insert(i, term_id)
+        return term_id
+
+    def _remove_term(self, term_id: int):
+        self._weight[term_id] -= 1
+        if self._weight[term_id] > 0:
+            return
+        term = (self._kind[term_id], normalize(self._display[term_id]))
+        for key in word_starts(term[1]):
+            i = bisect_left(self._keys, key)
+            while self._key_terms[i] != term_id:
+                i += 1
+            del self._keys[i]
+            del self._key_terms[i]
+        del self._term_ids[term]
+        self._display[term_id] = ""
+        self._free_ids.append(term_id)
+
+    # ============ LOOKUP ============
+
+    def suggest(self, prefix: str, limit: int = 8, kind: Optional[str] = None) -> List[dict]:
+        """Most used terms with a word starting with `prefix`, heaviest first"""
+        started = time.perf_counter()
+        if self.expired():
+            # Serve the current index meanwhile
+            self.schedule_rebuild()
+        key = normalize(prefix)
+        memo_key = (key, kind, limit)
+        results = self._memo.get(memo_key)
+        if results is None:
+            results = self._lookup(key, limit, kind) if key else []
+            if len(self._memo) >= MEMO_MAX_ENTRIES:
+                self._memo.clear()
+            self._memo[memo_key] = results
+        self.lookups += 1
+        self._latencies_us.append((time.perf_counter() - started) * 1e6)
+        return results
+
+    def _lookup(self, key: str, limit: int, kind: Optional[str]) -> List[dict]:
+        lo = bisect_left(self._keys, key)
+        hi = bisect_left(self._keys, key + _END, lo)
+        term_ids = set(self._key_terms[lo:hi])
+        if kind:
+            term_ids = [t for t in term_ids if self._kind[t] == kind]
+        weight, display = self._weight, self._display
+        best = heapq.nsmallest(limit, term_ids, key=lambda t: (-weight[t], display[t]))
+        return [{"text": display[t], "kind": self._kind[t], "count": weight[t]} for t in best]
+
+    # ============ METRICS ============
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the index structures, including the strings they hold"""
+        size = sum(sys.getsizeof(x) for x in (
+            self._keys, self._key_terms, self._term_ids, self._kind, self._display, self._weight, self._jobs,
+        ))
+        size += sum(sys.getsizeof(key) for key in self._keys)
+        size += sum(sys.getsizeof(display) for display in self._display)
+        size += sum(sys.getsizeof(term) for term in self._term_ids)
+        size += sum(sys.getsizeof(job_id) + sys.getsizeof(ids) for job_id, ids in self._jobs.items())
+        return size
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies_us)
+        percentile = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1) if latencies else None  # noqa: E731
+        return {
+            "jobs": len(self._jobs),
+            "terms": len(self._term_ids),
+            "keys": len(self._keys),
+            "memory_bytes": self.memory_bytes(),
+            "lookups": self.lookups,
+            "lookup_p50_us": percentile(0.5),
+            "lookup_p99_us": percentile(0.99),
+            "updates": self.updates,
+            "rebuilds": self.rebuilds,
+            "last_build_ms": self.last_build_ms,
+            "age_seconds": round(time.monotonic() - self._built_at, 1) if self._built_at is not None else None,
+        }
@@ -3,7 +3,7 @@ import { Link, useLocation, useNavigate } from 'react-router-dom';
 import { ChevronLeft, ChevronRight, LogOut } from 'lucide-react';
 import { Button } from './ui/button';
 import { toast } from 'sonner';
-import api from '../utils/api';
+import api, { clearTokens } from '../utils/api';
 import BrandLogo from './BrandLogo';
 import DashboardTopbar from './DashboardTopbar';
 
@@ -29,9 +29,8 @@ export default function DashboardLayout({ children, user, navigation }) {
 
   const handleLogout = async () => {
     try {
-      await api.post('/auth/logout');
-      localStorage.removeItem('token');
-      localStorage.removeItem('user');
+      await api.post('/auth/logout', { refresh_token: localStorage.getItem('refresh_token') });
+      clearTokens();
       toast.success('Logged out successfully');
       navigate('/login');
     } catch (error) {
@@ -5,7 +5,7 @@ import { Button } from '../components/ui/button';
 import { Input } from '../components/ui/input';
 import { Label } from '../components/ui/label';
 import { toast } from 'sonner';
-import api from '../utils/api';
+import api, { storeTokens } from '../utils/api';
 import AuthShell from '../components/auth/AuthShell';
 import AuthShowcase from '../components/auth/AuthShowcase';
 
@@ -24,9 +24,9 @@ export default function LoginPage() {
 
     try {
       const response = await api.post('/auth/login', formData);
-      const { token, user } = response.data;
+      const { user } = response.data;
 
-      localStorage.setItem('token', token);
+      storeTokens(response.data);
       localStorage.setItem('user', JSON.stringify(user));
 
       toast.success('Login successful!');
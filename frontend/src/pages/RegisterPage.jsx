@@ -5,7 +5,7 @@ import { Button } from '../components/ui/button';
 import { Input } from '../components/ui/input';
 import { Label } from '../components/ui/label';
 import { toast } from 'sonner';
-import api from '../utils/api';
+import api, { storeTokens } from '../utils/api';
 import AuthShell from '../components/auth/AuthShell';
 import RoleShowcase from '../components/auth/RoleShowcase';
 import { cn } from '@/lib/utils';
@@ -49,9 +49,9 @@ export default function RegisterPage() {
 
     try {
       const response = await api.post('/auth/register', formData);
-      const { token, user } = response.data;
+      const { user } = response.data;
 
-      localStorage.setItem('token', token);
+      storeTokens(response.data);
       localStorage.setItem('user', JSON.stringify(user));
 
       toast.success('Account created successfully!');
@@ -49,11 +49,34 @@ export default function JobSearch() {
   const [coverLetter, setCoverLetter] = useState('');
   const [resume, setResume] = useState(null);
   const [applying, setApplying] = useState(false);
+  const [suggestions, setSuggestions] = useState([]);
+  const [showSuggestions, setShowSuggestions] = useState(false);
 
   useEffect(() => {
     fetchJobs();
   }, []);
 
+  useEffect(() => {
+    const prefix = searchTerm.trim();
+    if (!prefix) {
+      setSuggestions([]);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await api.get('/jobs/suggest', { params: { q: prefix, limit: 8 } });
+        if (!cancelled) setSuggestions(response.data);
+      } catch (error) {
+        console.error('Error fetching suggestions:', error);
+      }
+    }, 120);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchTerm]);
+
   const fetchJobs = async () => {
     try {
       const response = await api.get('/jobs', { params: { status: 'approved' } });
@@ -70,7 +93,8 @@ export default function JobSearch() {
     return (
       job.title.toLowerCase().includes(query) ||
       job.company_name.toLowerCase().includes(query) ||
-      job.location.toLowerCase().includes(query)
+      job.location.toLowerCase().includes(query) ||
+      (job.required_skills || []).some((skill) => skill.toLowerCase().includes(query))
     );
   });
 
@@ -164,10 +188,41 @@ export default function JobSearch() {
                 type="text"
                 placeholder="Search by title, company, or location..."
                 value={searchTerm}
-                onChange={(e) => setSearchTerm(e.target.value)}
+                onChange={(e) => {
+                  setSearchTerm(e.target.value);
+                  setShowSuggestions(true);
+                }}
+                onFocus={() => setShowSuggestions(true)}
+                onBlur={() => setShowSuggestions(false)}
                 className="h-14 rounded-[1.25rem] border-slate-200 bg-slate-50 pl-12 pr-4 text-base font-medium"
                 data-testid="job-search-input"
               />
+              {showSuggestions && suggestions.length > 0 && (
+                <ul
+                  className="absolute left-0 right-0 top-full z-20 mt-2 overflow-hidden rounded-[1.25rem] border border-slate-200 bg-white py-2 shadow-lg"
+                  data-testid="job-search-suggestions"
+                >
+                  {suggestions.map((suggestion) => (
+                    <li key={`${suggestion.kind}-${suggestion.text}`}>
+                      <button
+                        type="button"
+                        // mousedown fires before the input's blur hides the list
+                        onMouseDown={(e) => {
+                          e.preventDefault();
+                          setSearchTerm(suggestion.text);
+                          setShowSuggestions(false);
+                        }}
+                        className="flex w-full items-center justify-between px-4 py-2 text-left text-sm text-slate-700 hover:bg-slate-50"
+                      >
+                        <span className="font-medium">{suggestion.text}</span>
+                        <span className="text-xs uppercase tracking-[0.14em] text-slate-400">
+                          {suggestion.kind} · {suggestion.count}
+                        </span>
+                      </button>
+                    </li>
+                  ))}
+                </ul>
+              )}
             </div>
 
             <div className="flex flex-wrap items-center gap-3 text-sm text-slate-600">
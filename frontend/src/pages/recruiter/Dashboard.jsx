@@ -44,6 +44,7 @@ export default function RecruiterDashboard() {
     jobs_posted_this_month: 0,
     custom_job_limit: null,
     jobs: [],
+    applicants: { total: 0, shortlisted: 0 },
   });
   const [loading, setLoading] = useState(true);
 
@@ -55,7 +56,7 @@ export default function RecruiterDashboard() {
     try {
       const [profileRes, jobsRes] = await Promise.all([
         api.get(`/profile/recruiter/${user.user_id}`),
-        api.get('/jobs/recruiter/my-jobs'),
+        api.get('/jobs/recruiter/dashboard'),
       ]);
       setStats({
         subscription_plan: profileRes.data.subscription_plan || 'free',
@@ -63,7 +64,8 @@ export default function RecruiterDashboard() {
         subscription_end: profileRes.data.subscription_end,
         jobs_posted_this_month: profileRes.data.jobs_posted_this_month || 0,
         custom_job_limit: profileRes.data.custom_job_limit,
-        jobs: jobsRes.data,
+        jobs: jobsRes.data.jobs,
+        applicants: jobsRes.data.totals,
       });
     } catch (error) {
       console.error('Error fetching data:', error);
@@ -155,8 +157,9 @@ export default function RecruiterDashboard() {
                 <div className="mt-3 text-3xl font-heading font-extrabold text-white">{approvedJobs}</div>
               </div>
               <div className="rounded-[1.5rem] border border-white/10 bg-white/[0.08] p-5 backdrop-blur-md">
-                <div className="text-xs uppercase tracking-[0.18em] text-white/50">Plan status</div>
-                <div className="mt-3 text-3xl font-heading font-extrabold capitalize text-white">{stats.subscription_plan}</div>
+                <div className="text-xs uppercase tracking-[0.18em] text-white/50">Applicants</div>
+                <div className="mt-3 text-3xl font-heading font-extrabold text-white">{stats.applicants.total}</div>
+                <p className="mt-2 text-sm text-white/70">{stats.applicants.shortlisted} shortlisted</p>
               </div>
             </div>
           </div>
@@ -248,6 +251,9 @@ export default function RecruiterDashboard() {
                           <div className="mt-2 text-sm font-semibold text-slate-900">
                             {new Date(job.posted_at).toLocaleDateString()}
                           </div>
+                          <div className="mt-2 text-xs font-medium text-slate-500">
+                            {job.applicant_counts.total} applicants, {job.applicant_counts.shortlisted} shortlisted
+                          </div>
                         </div>
 
                         {job.status === 'approved' ? (
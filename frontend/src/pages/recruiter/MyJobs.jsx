@@ -237,6 +237,13 @@ export default function MyJobs() {
                       </div>
 
                       <div className="grid gap-3 xl:min-w-[220px]">
+                        <div className="rounded-[1.25rem] border border-slate-200 bg-slate-50 px-4 py-3" data-testid={`job-funnel-${job.job_id}`}>
+                          <div className="text-[11px] font-semibold uppercase tracking-[0.18em] text-slate-500">Applicants</div>
+                          <div className="mt-2 text-sm font-semibold text-slate-900">
+                            {job.applicant_counts?.total || 0} applicants, {job.applicant_counts?.shortlisted || 0} shortlisted
+                          </div>
+                        </div>
+
                         <Link to={`/recruiter/jobs/${job.job_id}`}>
                           <Button variant="outline" className="w-full">
                             Review details
@@ -19,13 +19,56 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
-// Handle 401 responses
+export const storeTokens = ({ token, refresh_token: refreshToken }) => {
+  localStorage.setItem('token', token);
+  if (refreshToken) {
+    localStorage.setItem('refresh_token', refreshToken);
+  }
+};
+
+export const clearTokens = () => {
+  localStorage.removeItem('token');
+  localStorage.removeItem('refresh_token');
+  localStorage.removeItem('user');
+};
+
+// Concurrent 401s share one refresh; refresh tokens are single use
+let refreshing = null;
+
+const refreshTokens = () => {
+  if (!refreshing) {
+    const refreshToken = localStorage.getItem('refresh_token');
+    refreshing = axios
+      .post(`${API_URL}/auth/refresh`, { refresh_token: refreshToken }, { withCredentials: true })
+      .then((response) => storeTokens(response.data))
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
+// A 401 from these means bad credentials or a spent refresh token, not an expired access token
+const NO_REFRESH_URLS = ['/auth/login', '/auth/register', '/auth/refresh', '/auth/logout'];
+
+// Handle 401 responses: refresh an expired access token once, otherwise log out
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
-    if (error.response?.status === 401) {
-      localStorage.removeItem('token');
-      localStorage.removeItem('user');
+  async (error) => {
+    const { config, response } = error;
+    const path = config?.url?.split('?')[0];
+    const canRefresh = config && !config._retried && !NO_REFRESH_URLS.includes(path);
+    if (response?.status === 401 && canRefresh && localStorage.getItem('refresh_token')) {
+      config._retried = true;
+      try {
+        await refreshTokens();
+        return api(config);
+      } catch (refreshError) {
+        // Fall through to logging out
+      }
+    }
+    if (response?.status === 401) {
+      clearTokens();
       if (!window.location.pathname.includes('/login')) {
         window.location.href = '/login';
       }
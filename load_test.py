@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""Local load harness for the naya-job API.
+
+Runs weighted user journeys against a locally started `server:app` backed by a
+local mongod and reports RPS and p50/p95/p99 latency per route. Results are
+written as JSON under test_reports/ so runs can be compared between commits.
+
+    python load_test.py --spawn --concurrency 50 --duration 60
+    python load_test.py --base-url http://localhost:8001 --processes 4 --compare test_reports/load_abc123.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+ROOT_DIR = Path(__file__).parent
+BACKEND_DIR = ROOT_DIR / "backend"
+REPORTS_DIR = ROOT_DIR / "test_reports"
+
+SKILLS = ["Python", "JavaScript", "React", "MongoDB", "FastAPI", "AWS", "Docker", "SQL", "Java", "Go"]
+LOCATIONS = ["Pune", "Bengaluru", "Mumbai", "Delhi", "Hyderabad", "Chennai", "Remote"]
+JOB_TYPES = ["full_time", "part_time", "contract", "remote"]
+RESUME_BYTES = b"%PDF-1.4\n% naya-job load test resume\n" + b"0" * 2048
+SYNC_SECRET = os.environ.get("PLACFY_INTERNAL_SECRET", "placfy_naya_sync_secret")
+
+# Journey name -> relative weight
+JOURNEY_WEIGHTS = {
+    "seeker_browse": 50,
+    "seeker_apply": 15,
+    "seeker_chat": 15,
+    "recruiter_post_and_review": 15,
+    "admin_analytics": 5,
+}
+
+
+class Recorder:
+    """Collects (route, status, latency) samples for one worker"""
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, route, status, elapsed_ms, ok):
+        bucket = self.samples.setdefault(route, {"latencies": [], "errors": 0, "statuses": {}})
+        bucket["latencies"].append(elapsed_ms)
+        bucket["statuses"][str(status)] = bucket["statuses"].get(str(status), 0) + 1
+        if not ok:
+            bucket["errors"] += 1
+
+
+class LoadClient:
+    """Thin wrapper around httpx that times every call under a route template"""
+
+    def __init__(self, http, recorder):
+        self.http = http
+        self.recorder = recorder
+
+    async def call(self, route, method, path, token=None, expected=(200,), **kwargs):
+        headers = kwargs.pop("headers", {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        start = time.perf_counter()
+        try:
+            response = await self.http.request(method, path, headers=headers, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, "exception"
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.recorder.add(route, status, elapsed_ms, status in expected)
+        if response is not None and status in expected:
+            try:
+                return response.json()
+            except ValueError:
+                return {}
+        return None
+
+
+# ============ FIXTURES ============
+
+async def register(http, role, index, run_id):
+    response = await http.post("/api/auth/register", json={
+        "email": f"load_{run_id}_{role}_{index}@example.com",
+        "password": "LoadTest123!",
+        "name": f"Load {role} {index}",
+        "role": role,
+    })
+    response.raise_for_status()
+    return response.json()
+
+
+async def build_fixtures(base_url, seekers, recruiters, jobs_per_recruiter):
+    """Create the users, profiles and jobs the journeys operate on"""
+    run_id = uuid.uuid4().hex[:8]
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as http:
+        seeker_accounts = [await register(http, "job_seeker", i, run_id) for i in range(seekers)]
+        recruiter_accounts = [await register(http, "recruiter", i, run_id) for i in range(recruiters)]
+        admin_account = await register(http, "admin", 0, run_id)
+
+        for account in seeker_accounts:
+            await http.put("/api/profile/job-seeker", headers={"Authorization": f"Bearer {account['token']}"}, json={
+                "user_id": account["user"]["user_id"],
+                "skills": random.sample(SKILLS, 3),
+                "experience_years": random.randint(0, 10),
+                "location": random.choice(LOCATIONS),
+            })
+
+        job_ids = []
+        for account in recruiter_accounts:
+            # Lift the free-plan limit so recruiter journeys can keep posting
+            await http.post("/api/integrations/placfy/sync-subscription", json={
+                "email": account["user"]["email"],
+                "plan_name": "enterprise",
+                "status": "active",
+                "job_limit": 1_000_000,
+                "secret": SYNC_SECRET,
+            })
+            for _ in range(jobs_per_recruiter):
+                response = await http.post("/api/jobs", headers={"Authorization": f"Bearer {account['token']}"},
+                                           json=job_payload(account["user"]["name"]))
+                response.raise_for_status()
+                job_ids.append(response.json()["job_id"])
+
+    return {
+        "seekers": [{"token": a["token"], "user_id": a["user"]["user_id"]} for a in seeker_accounts],
+        "recruiters": [{"token": a["token"], "user_id": a["user"]["user_id"]} for a in recruiter_accounts],
+        "admin": {"token": admin_account["token"]},
+        "job_ids": job_ids,
+    }
+
+
+def job_payload(company):
+    return {
+        "title": f"{random.choice(SKILLS)} Engineer",
+        "description": "Load test job posting",
+        "company_name": company,
+        "location": random.choice(LOCATIONS),
+        "salary_min": random.choice([300000, 600000, 900000]),
+        "salary_max": 1500000,
+        "job_type": random.choice(JOB_TYPES),
+        "required_skills": random.sample(SKILLS, 3),
+        "experience_required": random.randint(0, 5),
+    }
+
+
+# ============ JOURNEYS ============
+
+async def seeker_browse(client, fixtures):
+    params = {}
+    if random.random() < 0.5:
+        params["location"] = random.choice(LOCATIONS)
+    if random.random() < 0.3:
+        params["skills"] = ",".join(random.sample(SKILLS, 2))
+    if random.random() < 0.2:
+        params["job_type"] = random.choice(JOB_TYPES)
+    jobs = await client.call("GET /api/jobs", "GET", "/api/jobs", params=params)
+    if jobs:
+        job_id = random.choice(jobs)["job_id"]
+    else:
+        job_id = random.choice(fixtures["job_ids"])
+    await client.call("GET /api/jobs/{job_id}", "GET", f"/api/jobs/{job_id}")
+
+
+async def seeker_apply(client, fixtures):
+    seeker = random.choice(fixtures["seekers"])
+    await client.call("GET /api/jobs", "GET", "/api/jobs")
+    # A repeat application is a legitimate 400, not a failure
+    await client.call(
+        "POST /api/applications", "POST", "/api/applications", token=seeker["token"], expected=(200, 400),
+        data={"job_id": random.choice(fixtures["job_ids"]), "cover_letter": "Load test application"},
+        files={"resume": ("resume.pdf", RESUME_BYTES, "application/pdf")},
+    )
+    await client.call("GET /api/applications/my-applications", "GET", "/api/applications/my-applications",
+                      token=seeker["token"])
+
+
+async def seeker_chat(client, fixtures):
+    seeker = random.choice(fixtures["seekers"])
+    recruiter = random.choice(fixtures["recruiters"])
+    await client.call("POST /api/messages", "POST", "/api/messages", token=seeker["token"],
+                      json={"receiver_id": recruiter["user_id"], "content": "Hello from the load test"})
+    await client.call("GET /api/messages/conversation/{user_id}", "GET",
+                      f"/api/messages/conversation/{recruiter['user_id']}", token=seeker["token"])
+    await client.call("GET /api/messages/conversations", "GET", "/api/messages/conversations", token=seeker["token"])
+
+
+async def recruiter_post_and_review(client, fixtures):
+    recruiter = random.choice(fixtures["recruiters"])
+    await client.call("POST /api/jobs", "POST", "/api/jobs", token=recruiter["token"], json=job_payload("Load Co"))
+    jobs = await client.call("GET /api/jobs/recruiter/my-jobs", "GET", "/api/jobs/recruiter/my-jobs",
+                             token=recruiter["token"])
+    if not jobs:
+        return
+    job_id = random.choice(jobs)["job_id"]
+    applications = await client.call("GET /api/applications/job/{job_id}", "GET",
+                                      f"/api/applications/job/{job_id}", token=recruiter["token"])
+    if applications:
+        application = random.choice(applications)
+        await client.call("PUT /api/applications/{application_id}/status", "PUT",
+                          f"/api/applications/{application['application_id']}/status", token=recruiter["token"],
+                          params={"status": random.choice(["shortlisted", "rejected", "accepted"])})
+
+
+async def admin_analytics(client, fixtures):
+    token = fixtures["admin"]["token"]
+    await client.call("GET /api/admin/analytics", "GET", "/api/admin/analytics", token=token)
+    await client.call("GET /api/admin/jobs", "GET", "/api/admin/jobs", token=token, params={"limit": 50})
+
+
+JOURNEYS = {
+    "seeker_browse": seeker_browse,
+    "seeker_apply": seeker_apply,
+    "seeker_chat": seeker_chat,
+    "recruiter_post_and_review": recruiter_post_and_review,
+    "admin_analytics": admin_analytics,
+}
+
+
+# ============ DRIVER ============
+
+async def run_users(base_url, fixtures, concurrency, duration, seed):
+    """Run `concurrency` virtual users picking weighted journeys until `duration` elapses"""
+    rng = random.Random(seed)
+    names = list(JOURNEY_WEIGHTS)
+    weights = [JOURNEY_WEIGHTS[n] for n in names]
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as http:
+        client = LoadClient(http, recorder)
+
+        async def virtual_user():
+            while time.perf_counter() < deadline:
+                journey = rng.choices(names, weights=weights)[0]
+                try:
+                    await JOURNEYS[journey](client, fixtures)
+                except Exception as e:
+                    recorder.add(f"journey:{journey}", type(e).__name__, 0, False)
+
+        await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+    return recorder.samples
+
+
+def _process_worker(args):
+    base_url, fixtures, concurrency, duration, seed = args
+    return asyncio.run(run_users(base_url, fixtures, concurrency, duration, seed))
+
+
+def merge_samples(parts):
+    merged = {}
+    for part in parts:
+        for route, bucket in part.items():
+            target = merged.setdefault(route, {"latencies": [], "errors": 0, "statuses": {}})
+            target["latencies"].extend(bucket["latencies"])
+            target["errors"] += bucket["errors"]
+            for status, count in bucket["statuses"].items():
+                target["statuses"][status] = target["statuses"].get(status, 0) + count
+    return merged
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    routes = {}
+    total = 0
+    for route, bucket in sorted(samples.items()):
+        latencies = sorted(bucket["latencies"])
+        total += len(latencies)
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": bucket["errors"],
+            "statuses": bucket["statuses"],
+            "rps": round(len(latencies) / elapsed, 2),
+            "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+        }
+    return {"total_requests": total, "total_rps": round(total / elapsed, 2), "routes": routes}
+
+
+def print_report(summary, baseline=None):
+    base_routes = (baseline or {}).get("summary", {}).get("routes", {})
+    print(f"\nTotal: {summary['total_requests']} requests, {summary['total_rps']} req/s")
+    print(f"{'route':<50} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, stats in summary["routes"].items():
+        line = (f"{route:<50} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8} "
+                f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+        previous = base_routes.get(route)
+        if previous and previous["p95_ms"]:
+            delta = (stats["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+            line += f"  p95 {delta:+.1f}%"
+        print(line)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def spawn_server(port, mongo_url, db_name):
+    """Start uvicorn server:app from the backend directory against a local mongod"""
+    env = {
+        **os.environ,
+        "MONGO_URL": mongo_url,
+        "DB_NAME": db_name,
+        "JWT_SECRET_KEY": os.environ.get("JWT_SECRET_KEY", "load-test-secret"),
+        # Every virtual user shares one client IP; measure the handlers, not the limiter
+        "RATE_LIMIT_ENABLED": os.environ.get("RATE_LIMIT_ENABLED", "false"),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            if httpx.get(f"{base_url}/api/jobs", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("server:app did not become ready")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--spawn", action="store_true", help="start server:app locally instead of using --base-url")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="naya_job_loadtest")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--seekers", type=int, default=50)
+    parser.add_argument("--recruiters", type=int, default=10)
+    parser.add_argument("--jobs-per-recruiter", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="result file (default test_reports/load_<commit>_<time>.json)")
+    parser.add_argument("--compare", help="previous result file to diff p95 against")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    process = None
+    base_url = args.base_url
+    if args.spawn:
+        process, base_url = spawn_server(args.port, args.mongo_url, args.db_name)
+
+    try:
+        fixtures = asyncio.run(build_fixtures(base_url, args.seekers, args.recruiters, args.jobs_per_recruiter))
+        print(f"Fixtures ready: {len(fixtures['seekers'])} seekers, {len(fixtures['job_ids'])} jobs")
+
+        start = time.perf_counter()
+        if args.processes > 1:
+            work = [(base_url, fixtures, args.concurrency, args.duration, args.seed + i) for i in range(args.processes)]
+            with ProcessPoolExecutor(max_workers=args.processes) as pool:
+                samples = merge_samples(pool.map(_process_worker, work))
+        else:
+            samples = asyncio.run(run_users(base_url, fixtures, args.concurrency, args.duration, args.seed))
+        elapsed = time.perf_counter() - start
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    summary = summarize(samples, elapsed)
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(summary, baseline)
+
+    commit = git_commit()
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "journey_weights": JOURNEY_WEIGHTS,
+        "elapsed_seconds": round(elapsed, 2),
+        "summary": summary,
+    }
+    REPORTS_DIR.mkdir(exist_ok=True)
+    output = Path(args.output) if args.output else REPORTS_DIR / f"load_{commit}_{int(time.time())}.json"
+    output.write_text(json.dumps(result, indent=2))
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""Shared setup: import backend modules directly and run them against benchmarks/fake_db.py.
+
+The environment is filled in before anything imports server.py, so the tests
+need neither a .env file nor a running mongod.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "naya_job_test")
+os.environ.setdefault("JWT_SECRET_KEY", "test-only-secret-key-0123456789abcdef")
+os.environ.setdefault("SLOW_QUERY_LOG_ENABLED", "false")
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "naya_job_tests.log"))
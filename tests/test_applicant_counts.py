@@ -0,0 +1,67 @@
+import asyncio
+from datetime import timedelta
+
+import server
+from applicant_counts import empty_applicant_counts
+from benchmarks.fake_db import FakeDatabase
+from dates import utcnow
+
+
+def application(n, job_id, status="pending", age=timedelta(days=1)):
+    written = utcnow() - age
+    return {"application_id": f"app_{n}", "job_id": job_id, "job_seeker_id": f"user_{n}", "status": status,
+            "applied_at": written, "updated_at": written}
+
+
+def fake_db(monkeypatch, jobs, applications):
+    db = FakeDatabase()
+    db.jobs.docs.extend(jobs)
+    db.applications.docs.extend(applications)
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+def test_drifted_counters_are_rewritten(monkeypatch):
+    db = fake_db(monkeypatch, [
+        {"job_id": "job_a", "applicant_counts": {**empty_applicant_counts(), "total": 7, "pending": 7}},
+        {"job_id": "job_b"},
+    ], [application(1, "job_a"), application(2, "job_a", "shortlisted")])
+
+    assert asyncio.run(server.reconcile_applicant_counts()) == 2
+    assert db.jobs.docs[0]["applicant_counts"] == {**empty_applicant_counts(), "total": 2, "pending": 1, "shortlisted": 1}
+    assert db.jobs.docs[1]["applicant_counts"] == empty_applicant_counts()
+    assert asyncio.run(server.reconcile_applicant_counts()) == 0
+
+
+def test_increment_during_the_recount_is_not_overwritten(monkeypatch):
+    counts = {**empty_applicant_counts(), "total": 5, "pending": 5}
+    db = fake_db(monkeypatch, [{"job_id": "job_a", "applicant_counts": dict(counts)}], [application(1, "job_a")])
+    aggregate = db.applications.aggregate
+
+    def aggregate_while_status_changes(pipeline, **kwargs):
+        # update_application_status moves a counter between the job read and the rewrite
+        job = db.jobs.docs[0]
+        job["applicant_counts"] = {**job["applicant_counts"], "pending": 4, "accepted": 1}
+        return aggregate(pipeline, **kwargs)
+    monkeypatch.setattr(db.applications, "aggregate", aggregate_while_status_changes)
+
+    assert asyncio.run(server.reconcile_applicant_counts()) == 0
+    assert db.jobs.docs[0]["applicant_counts"] == {**counts, "pending": 4, "accepted": 1}
+
+
+def test_jobs_with_fresh_applications_wait_for_the_next_run(monkeypatch):
+    # The application is written, its job's $inc not yet
+    db = fake_db(monkeypatch, [{"job_id": "job_a", "applicant_counts": empty_applicant_counts()}],
+                 [application(1, "job_a", age=timedelta(seconds=1))])
+
+    assert asyncio.run(server.reconcile_applicant_counts()) == 0
+    assert db.jobs.docs[0]["applicant_counts"] == empty_applicant_counts()
+
+
+def test_recount_walks_every_batch(monkeypatch):
+    monkeypatch.setattr(server, "APPLICANT_COUNT_BATCH_SIZE", 2)
+    jobs = [{"job_id": f"job_{n}"} for n in range(5)]
+    db = fake_db(monkeypatch, jobs, [application(n, f"job_{n}") for n in range(5)])
+
+    assert asyncio.run(server.reconcile_applicant_counts()) == 5
+    assert all(job["applicant_counts"]["total"] == 1 for job in db.jobs.docs)
@@ -0,0 +1,126 @@
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+import server
+from applicant_counts import empty_applicant_counts
+from benchmarks.fake_db import FakeDatabase
+from dates import utcnow
+
+
+class Webhook:
+    async def post(self, *args, **kwargs):
+        return SimpleNamespace(status_code=201, text="")
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase()
+    db.users.docs.extend([
+        {"user_id": "user_seeker", "email": "s@example.com", "name": "S", "role": "job_seeker", "created_at": utcnow()},
+        {"user_id": "user_rec", "email": "r@example.com", "name": "R", "role": "recruiter", "created_at": utcnow()},
+    ])
+    db.jobs.docs.append({"job_id": "job_1", "recruiter_id": "user_rec", "title": "Engineer", "status": "approved",
+                         "applicant_counts": empty_applicant_counts()})
+    asyncio.run(db.applications.create_index([("job_id", 1), ("job_seeker_id", 1)], unique=True))
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "get_http_client", Webhook)
+    server.job_snapshots.clear()
+    return db
+
+
+def as_user(user_id):
+    token = jwt.encode({"user_id": user_id}, server.JWT_SECRET, algorithm=server.JWT_ALGORITHM)
+    return SimpleNamespace(headers={"Authorization": f"Bearer {token}"})
+
+
+def apply(job_id="job_1", user_id="user_seeker"):
+    return server.apply_to_job(job_id=job_id, cover_letter=None, resume=None, request=as_user(user_id), session_token=None)
+
+
+def test_concurrent_duplicate_applies_store_one_application(db, monkeypatch):
+    insert_one = db.applications.insert_one
+
+    async def yielding_insert(*args, **kwargs):
+        await asyncio.sleep(0)
+        return await insert_one(*args, **kwargs)
+    monkeypatch.setattr(db.applications, "insert_one", yielding_insert)
+
+    async def scenario():
+        return await asyncio.gather(apply(), apply(), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    duplicates = [r for r in results if isinstance(r, HTTPException)]
+    assert len(duplicates) == 1
+    assert duplicates[0].status_code == 400
+    assert len(db.applications.docs) == 1
+    assert db.jobs.docs[0]["applicant_counts"]["total"] == 1
+
+
+def test_apply_to_unknown_job_is_404(db):
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(apply(job_id="job_missing"))
+    assert e.value.status_code == 404
+
+
+def seed_applications(db, count):
+    now = utcnow()
+    for n in range(count):
+        seeker_id = f"user_s{n}"
+        db.users.docs.append({"user_id": seeker_id, "email": f"s{n}@example.com", "name": f"S{n}", "role": "job_seeker",
+                              "password_hash": "secret", "created_at": now})
+        if n % 2 == 0:
+            db.job_seeker_profiles.docs.append({"user_id": seeker_id, "skills": ["python"], "experience_years": n,
+                                                "location": "Pune", "bio": "private"})
+        db.applications.docs.append({
+            "application_id": f"app_{n}", "job_id": "job_1", "job_seeker_id": seeker_id, "recruiter_id": "user_rec",
+            "status": "shortlisted" if n % 3 == 0 else "pending", "cover_letter": None, "resume_url": None,
+            "applied_at": now - timedelta(minutes=n), "updated_at": now,
+        })
+
+
+def test_applications_page_joins_after_paging():
+    pipeline = server.applications_page_pipeline({"job_id": "job_1"}, -5, 1000, [{"from": "users", "as": "u"}], ["u"])
+
+    assert [next(iter(stage)) for stage in pipeline] == ["$match", "$sort", "$skip", "$limit", "$lookup", "$project"]
+    assert pipeline[2] == {"$skip": 0}
+    assert pipeline[3] == {"$limit": server.MAX_APPLICATIONS_PAGE}
+
+
+def test_job_applications_page_projects_joined_fields(db):
+    seed_applications(db, 5)
+
+    page = asyncio.run(server.get_job_applications("job_1", as_user("user_rec"), None, skip=1, limit=2))
+
+    assert [doc["application_id"] for doc in page] == ["app_1", "app_2"]
+    assert set(page[0]) == set(server.APPLICATION_FIELDS) - {"_id"} | {"job_seeker", "profile"}
+    assert page[0]["job_seeker"] == {"user_id": "user_s1", "name": "S1", "email": "s1@example.com"}
+    assert page[0]["profile"] is None
+    assert page[1]["profile"] == {"experience_years": 2, "location": "Pune", "skills": ["python"]}
+
+
+def test_job_applications_filter_by_status_and_owner(db):
+    seed_applications(db, 7)
+
+    page = asyncio.run(server.get_job_applications("job_1", as_user("user_rec"), None, status="shortlisted"))
+    assert [doc["application_id"] for doc in page] == ["app_0", "app_3", "app_6"]
+
+    db.users.docs.append({"user_id": "user_rec2", "email": "r2@example.com", "name": "R2", "role": "recruiter",
+                          "created_at": utcnow()})
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(server.get_job_applications("job_1", as_user("user_rec2"), None))
+    assert e.value.status_code == 403
+
+
+def test_my_applications_join_the_job(db):
+    asyncio.run(apply())
+
+    page = asyncio.run(server.get_my_applications(as_user("user_seeker"), None))
+
+    assert len(page) == 1
+    assert page[0]["job"] == {"job_id": "job_1", "title": "Engineer", "status": "approved"}
+    assert "recruiter_id" not in page[0]
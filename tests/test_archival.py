@@ -0,0 +1,56 @@
+import asyncio
+from datetime import timedelta
+
+from archival import POLICIES, Archiver
+from benchmarks.fake_db import FakeDatabase
+from dates import utcnow
+
+OLD = utcnow() - timedelta(days=400)
+
+
+def seeded_db():
+    db = FakeDatabase()
+    db.jobs.docs.extend([
+        {"job_id": "job_closed", "recruiter_id": "rec_1", "status": "closed", "closed_at": OLD, "posted_at": OLD},
+        {"job_id": "job_rejected", "recruiter_id": "rec_1", "status": "rejected", "posted_at": OLD},
+        {"job_id": "job_open", "recruiter_id": "rec_1", "status": "approved", "posted_at": OLD},
+    ])
+    for job_id in ("job_closed", "job_rejected", "job_open"):
+        db.applications.docs.extend(
+            {"application_id": f"app_{job_id}_{n}", "job_id": job_id, "job_seeker_id": f"user_{n}"} for n in range(3)
+        )
+    return db
+
+
+def job_ids(collection):
+    return sorted({doc["job_id"] for doc in collection.docs})
+
+
+def test_closed_jobs_move_with_their_applications():
+    db = seeded_db()
+    archiver = Archiver(db, policies={"jobs": POLICIES["jobs"]})
+
+    assert asyncio.run(archiver.run()) == 2
+    assert job_ids(db.jobs) == job_ids(db.applications) == ["job_open"]
+    assert job_ids(db.jobs_archive) == job_ids(db.applications_archive) == ["job_closed", "job_rejected"]
+    assert len(db.applications_archive.docs) == 6
+    assert asyncio.run(archiver.run()) == 0
+
+
+def test_job_reopened_during_the_sweep_keeps_its_applications():
+    db = seeded_db()
+    archiver = Archiver(db, policies={"jobs": POLICIES["jobs"]})
+    delete_many = db.jobs.delete_many
+
+    async def delete_after_reapproval(query):
+        # An admin re-approves the rejected job after its batch was read and its applications archived
+        next(job for job in db.jobs.docs if job["job_id"] == "job_rejected")["status"] = "approved"
+        return await delete_many(query)
+    db.jobs.delete_many = delete_after_reapproval
+
+    assert asyncio.run(archiver.run()) == 1
+    assert job_ids(db.jobs) == job_ids(db.applications) == ["job_open", "job_rejected"]
+    assert len(db.applications.docs) == 6
+    assert job_ids(db.jobs_archive) == job_ids(db.applications_archive) == ["job_closed"]
+    stats = {doc["_id"]: doc["documents"] for doc in db.archive_stats.docs}
+    assert stats == {"jobs": 1, "applications": 3}
@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from fastapi import HTTPException, Response
+
+import server
+from auth_tokens import RevocationList, TokenIssuer
+from benchmarks.fake_db import FakeDatabase
+from dates import utcnow
+
+USER = {"user_id": "user_1", "email": "a@example.com", "name": "A", "role": "job_seeker", "created_at": utcnow()}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase()
+    db.users.docs.append(dict(USER))
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "revocations", RevocationList(db))
+    monkeypatch.setattr(server, "token_issuer", TokenIssuer(server.JWT_SECRET, server.JWT_ALGORITHM, mode="stateless"))
+    return db
+
+
+def bearer(token):
+    return SimpleNamespace(headers={"Authorization": f"Bearer {token}"})
+
+
+def rejected(token):
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(server.get_current_user(bearer(token), None))
+    return e.value.status_code == 401
+
+
+def test_logout_revokes_a_legacy_token_without_jti(db):
+    token = jwt.encode({"user_id": "user_1"}, server.JWT_SECRET, algorithm=server.JWT_ALGORITHM)
+    assert asyncio.run(server.get_current_user(bearer(token), None)).user_id == "user_1"
+
+    result = asyncio.run(server.logout(bearer(token), Response()))
+
+    assert result == {"message": "Logged out successfully"}
+    assert db.users.docs[0]["token_version"] == 1
+    assert rejected(token)
+
+
+def test_logout_revokes_access_and_refresh_tokens(db):
+    tokens = server.token_issuer.issue(USER)
+
+    asyncio.run(server.logout(bearer(tokens["token"]), Response(), server.LogoutRequest(refresh_token=tokens["refresh_token"])))
+
+    assert rejected(tokens["token"])
+    with pytest.raises(HTTPException):
+        asyncio.run(server.refresh_tokens(server.RefreshRequest(refresh_token=tokens["refresh_token"])))
+
+
+def test_refresh_rotates_once_and_reuse_revokes_the_user(db):
+    tokens = server.token_issuer.issue(USER)
+
+    rotated = asyncio.run(server.refresh_tokens(server.RefreshRequest(refresh_token=tokens["refresh_token"])))
+    assert asyncio.run(server.get_current_user(bearer(rotated["token"]), None)).user_id == "user_1"
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(server.refresh_tokens(server.RefreshRequest(refresh_token=tokens["refresh_token"])))
+    assert e.value.status_code == 401
+    assert rejected(rotated["token"])
+    with pytest.raises(HTTPException):
+        asyncio.run(server.refresh_tokens(server.RefreshRequest(refresh_token=rotated["refresh_token"])))
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fake_db import FakeDatabase
+from business_ids import (
+    KeyedCollection, translate_filter, translate_lookup, translate_pipeline, translate_projection, translate_sort,
+)
+
+KEYED = {"jobs": "job_id", "users": "user_id"}
+
+
+def test_translate_filter_rewrites_the_key_at_every_level():
+    query = {
+        "job_id": {"$in": ["job_1", "job_2"]},
+        "status": "approved",
+        "$or": [{"job_id": "job_3"}, {"$and": [{"job_id": {"$ne": "job_4"}}, {"title": "x"}]}],
+        "$expr": {"$eq": ["$job_id", "$$target"]},
+    }
+
+    assert translate_filter(query, "job_id") == {
+        "_id": {"$in": ["job_1", "job_2"]},
+        "status": "approved",
+        "$or": [{"_id": "job_3"}, {"$and": [{"_id": {"$ne": "job_4"}}, {"title": "x"}]}],
+        "$expr": {"$eq": ["$_id", "$$target"]},
+    }
+    # Fields inside $elemMatch belong to array elements, never to the document's key
+    assert translate_filter({"tags": {"$elemMatch": {"job_id": 1}}}, "job_id") == {"tags": {"$elemMatch": {"job_id": 1}}}
+    assert translate_filter(None, "job_id") is None
+
+
+@pytest.mark.parametrize("projection, expected", [
+    (None, None),
+    # Everything but the ObjectId: the key is still wanted, so _id is returned and renamed
+    ({"_id": 0}, None),
+    ({"_id": 0, "title": 1}, {"title": 1, "_id": 0}),
+    ({"_id": 0, "job_id": 1, "title": 1}, {"title": 1, "_id": 1}),
+    ({"job_id": 1}, {"_id": 1}),
+    ({"job_id": 0}, {"_id": 0}),
+    ({"description": 0}, {"description": 0}),
+    ({"description": 0, "job_id": 0}, {"description": 0, "_id": 0}),
+])
+def test_translate_projection(projection, expected):
+    assert translate_projection(projection, "job_id") == expected
+
+
+def test_translate_sort():
+    assert translate_sort("job_id", -1, "job_id") == ("_id", -1)
+    assert translate_sort([("posted_at", -1), ("job_id", 1)], None, "job_id") == ([("posted_at", -1), ("_id", 1)], None)
+    assert translate_sort({"job_id": 1}, None, "job_id") == ([("_id", 1)], None)
+
+
+def test_translate_pipeline_adds_the_key_after_the_leading_stages():
+    pipeline = [
+        {"$match": {"job_id": "job_1"}},
+        {"$sort": {"job_id": 1}},
+        {"$limit": 5},
+        {"$group": {"_id": "$job_id", "n": {"$sum": 1}}},
+    ]
+
+    assert translate_pipeline(pipeline, "job_id", KEYED) == [
+        {"$match": {"_id": "job_1"}},
+        {"$sort": {"_id": 1}},
+        {"$limit": 5},
+        {"$addFields": {"job_id": "$_id"}},
+        {"$group": {"_id": "$job_id", "n": {"$sum": 1}}},
+    ]
+
+
+def test_lookup_from_an_unkeyed_collection_joins_on_id():
+    lookup = {"from": "jobs", "localField": "job_id", "foreignField": "job_id",
+              "pipeline": [{"$project": {"_id": 0, "title": 1}}], "as": "job"}
+
+    assert translate_lookup(lookup, KEYED) == {
+        "from": "jobs", "localField": "job_id", "foreignField": "_id",
+        "pipeline": [{"$addFields": {"job_id": "$_id"}}, {"$project": {"_id": 0, "title": 1}}], "as": "job",
+    }
+    # Unkeyed targets and nested $facet pipelines
+    unkeyed = {"from": "applications", "localField": "job_id", "foreignField": "job_id", "as": "apps"}
+    assert translate_lookup(unkeyed, KEYED) is unkeyed
+    facet = translate_pipeline([{"$facet": {"jobs": [{"$lookup": lookup}]}}], None, KEYED)
+    assert facet[0]["$facet"]["jobs"][0]["$lookup"]["foreignField"] == "_id"
+
+
+def keyed_db():
+    db = FakeDatabase()
+    return db, KeyedCollection(db.jobs, "job_id", KEYED), KeyedCollection(db.applications, None, KEYED)
+
+
+def test_keyed_collection_round_trip():
+    db, jobs, applications = keyed_db()
+
+    async def scenario():
+        await jobs.insert_one({"job_id": "job_1", "title": "Engineer", "status": "approved"})
+        await jobs.insert_many([{"job_id": "job_2", "title": "Designer", "status": "closed"}])
+        await applications.insert_one({"application_id": "app_1", "job_id": "job_1"})
+        await jobs.update_one({"job_id": "job_2"}, {"$set": {"status": "approved"}})
+        return {
+            "one": await jobs.find_one({"job_id": "job_1"}, {"_id": 0}),
+            "titles": await jobs.find({"status": "approved"}, {"_id": 0, "job_id": 1, "title": 1})
+                                .sort("job_id", -1).to_list(None),
+            "count": await jobs.count_documents({"job_id": {"$in": ["job_1", "job_2"]}}),
+            "joined": await applications.aggregate([{"$lookup": {
+                "from": "jobs", "localField": "job_id", "foreignField": "job_id",
+                "pipeline": [{"$project": {"_id": 0, "job_id": 1, "title": 1}}], "as": "job",
+            }}]).to_list(None),
+            "grouped": await jobs.aggregate([
+                {"$match": {"job_id": {"$ne": "job_3"}}}, {"$group": {"_id": None, "ids": {"$push": "$job_id"}}},
+            ]).to_list(None),
+            "deleted": await jobs.find_one_and_delete({"job_id": "job_2"}, {"title": 1, "job_id": 1}),
+        }
+
+    result = asyncio.run(scenario())
+
+    assert db.jobs.docs[0] == {"_id": "job_1", "title": "Engineer", "status": "approved"}
+    assert result["one"] == {"job_id": "job_1", "title": "Engineer", "status": "approved"}
+    assert result["titles"] == [{"job_id": "job_2", "title": "Designer"}, {"job_id": "job_1", "title": "Engineer"}]
+    assert result["count"] == 2
+    assert result["joined"][0]["job"] == [{"job_id": "job_1", "title": "Engineer"}]
+    assert sorted(result["grouped"][0]["ids"]) == ["job_1", "job_2"]
+    assert result["deleted"] == {"job_id": "job_2", "title": "Designer"}
+    assert [doc["_id"] for doc in db.jobs.docs] == ["job_1"]
+
+
+def test_keyed_collection_refuses_what_it_cannot_translate():
+    _, jobs, applications = keyed_db()
+
+    with pytest.raises(ValueError):
+        asyncio.run(jobs.update_one({"job_id": "job_1"}, {"$set": {"job_id": "job_9"}}))
+    for name in ("bulk_write", "watch", "create_indexes"):
+        with pytest.raises(NotImplementedError):
+            getattr(jobs, name)
+    # Unkeyed collections only rewrite $lookups, so everything else passes straight through
+    assert applications.name == "applications"
+    assert callable(applications.estimated_document_count)
@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timezone
+
+from pymongo.errors import OperationFailure
+
+import change_streams
+from benchmarks.fake_db import FakeDatabase
+from cache import TTLCache
+from change_streams import TOKEN_COLLECTION, ChangeStreamListener
+
+
+class FakeStream:
+    """Yields its events, then waits for more like an idle change stream"""
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.events:
+            await asyncio.Event().wait()
+        event = self.events.pop(0)
+        self.resume_token = {"_data": event["_id"]}
+        return event
+
+
+class WatchableDatabase(FakeDatabase):
+    """Each watch() call takes the next scripted attempt: an exception to raise or a list of events"""
+
+    def __init__(self, attempts):
+        super().__init__()
+        self.attempts = list(attempts)
+        self.resumed_after = []
+
+    def watch(self, pipeline, full_document=None, resume_after=None):
+        self.resumed_after.append(resume_after)
+        attempt = self.attempts.pop(0) if self.attempts else []
+        if isinstance(attempt, Exception):
+            raise attempt
+        return FakeStream(attempt)
+
+
+def event(n, operation="update", job_id="job_1", fields=("status",)):
+    change = {"_id": f"token_{n}", "operationType": operation, "ns": {"coll": "jobs"},
+              "wallTime": datetime.now(timezone.utc), "documentKey": {"_id": f"oid_{n}"}}
+    if operation == "update":
+        change["updateDescription"] = {"updatedFields": {field: 1 for field in fields}, "removedFields": []}
+        change["fullDocument"] = {"_id": f"oid_{n}", "job_id": job_id}
+    return change
+
+
+def run_listener(listener, until):
+    async def scenario():
+        listener.start()
+        for _ in range(200):
+            if until():
+                break
+            await asyncio.sleep(0.001)
+        result = listener.mode
+        await listener.stop()
+        return result
+    return asyncio.run(scenario())
+
+
+def test_resume_token_is_saved_and_used_by_the_next_listener():
+    db = WatchableDatabase([[event(1), event(2)]])
+    cache = TTLCache("test_stream_jobs", 60)
+    cache.set("job_1", "cached")
+    listener = ChangeStreamListener(db, consumer="worker_a")
+    listener.invalidate_cache("jobs", cache, key="job_id", fields=("status",))
+
+    assert run_listener(listener, lambda: listener.metrics["events"] == 2) == "streaming"
+    assert cache.get("job_1") is None
+    saved = db[TOKEN_COLLECTION].docs[0]
+    assert (saved["_id"], saved["token"]) == ("worker_a", {"_data": "token_2"})
+
+    db.attempts = [[]]
+    restarted = ChangeStreamListener(db, consumer="worker_a")
+    restarted.subscribe("jobs", lambda change: None)
+    run_listener(restarted, lambda: len(db.resumed_after) == 2)
+    assert db.resumed_after == [None, {"_data": "token_2"}]
+
+
+def test_updates_to_unwatched_fields_keep_the_entry():
+    db = WatchableDatabase([[event(1, fields=("views",))]])
+    cache = TTLCache("test_stream_fields", 60)
+    cache.set("job_1", "cached")
+    listener = ChangeStreamListener(db, consumer="worker_a")
+    listener.invalidate_cache("jobs", cache, key="job_id", fields=("status",))
+
+    run_listener(listener, lambda: listener.metrics["events"] == 1)
+
+    assert cache.get("job_1") == "cached"
+
+
+def test_deployments_without_change_streams_fall_back_to_ttl(monkeypatch):
+    monkeypatch.setattr(change_streams, "CHANGE_STREAM_RETRY_SECONDS", 60)
+    db = WatchableDatabase([OperationFailure("not a replica set", code=40573)])
+    listener = ChangeStreamListener(db, consumer="worker_a")
+    listener.subscribe("jobs", lambda change: None)
+
+    assert run_listener(listener, lambda: listener.metrics["errors"] == 1) == "ttl_only"
+    assert not listener.streaming()
+    assert listener.status()["last_error"]
+
+
+def test_lost_history_drops_the_token_and_clears_caches(monkeypatch):
+    monkeypatch.setattr(change_streams, "CHANGE_STREAM_RETRY_SECONDS", 0)
+    db = WatchableDatabase([OperationFailure("resume token too old", code=286), []])
+    db[TOKEN_COLLECTION].docs.append({"_id": "worker_a", "token": {"_data": "stale"}})
+    cache = TTLCache("test_stream_lost", 60)
+    cache.set("job_1", "cached")
+    listener = ChangeStreamListener(db, consumer="worker_a")
+    listener.clear_cache("jobs", cache)
+
+    assert run_listener(listener, lambda: len(db.resumed_after) == 2 and listener.streaming()) == "streaming"
+    assert db.resumed_after == [{"_data": "stale"}, None]
+    assert cache.get("job_1") is None
@@ -0,0 +1,35 @@
+import asyncio
+
+import httpx
+
+import integrations
+
+
+def test_warm_http_client_connects_once_per_host(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, str(request.url)))
+        if request.url.host == "down.example.com":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(405)
+
+    monkeypatch.setattr(integrations, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    async def scenario():
+        try:
+            return await integrations.warm_http_client([
+                "https://auth.example.com/oauth/session-data",
+                "https://auth.example.com/other?x=1",
+                "http://hooks.example.com:8000/api/webhook/",
+                "https://down.example.com/",
+            ])
+        finally:
+            await integrations.close_http_client()
+
+    assert asyncio.run(scenario()) == 2
+    assert sorted(seen) == [
+        ("HEAD", "http://hooks.example.com:8000/"),
+        ("HEAD", "https://auth.example.com/"),
+        ("HEAD", "https://down.example.com/"),
+    ]
@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import PyMongoError
+
+import server
+from benchmarks.fake_db import FakeDatabase
+from dates import utcnow
+
+RECRUITER_ID = "user_rec"
+JOB = server.JobCreate(title="Engineer", description="Build things", company_name="Acme", location="Pune", job_type="full-time")
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase()
+    db.users.docs.append({"user_id": RECRUITER_ID, "email": "r@example.com", "name": "R", "role": "recruiter",
+                          "created_at": utcnow()})
+    db.recruiter_profiles.docs.append({
+        "user_id": RECRUITER_ID, "subscription_plan": "basic", "subscription_status": "active",
+        "jobs_posted_this_month": 0, "job_limit": 3, "quota_period": server.current_quota_period(),
+    })
+    monkeypatch.setattr(server, "db", db)
+    return db
+
+
+def recruiter_request():
+    token = jwt.encode({"user_id": RECRUITER_ID}, server.JWT_SECRET, algorithm=server.JWT_ALGORITHM)
+    return SimpleNamespace(headers={"Authorization": f"Bearer {token}"})
+
+
+def yielding(monkeypatch, collection, name):
+    """Let other requests run before each call, as a real round trip would"""
+    call = getattr(collection, name)
+
+    async def wrapper(*args, **kwargs):
+        await asyncio.sleep(0)
+        return await call(*args, **kwargs)
+    monkeypatch.setattr(collection, name, wrapper)
+
+
+def profile(db):
+    return db.recruiter_profiles.docs[0]
+
+
+def test_concurrent_posts_never_exceed_the_limit(db, monkeypatch):
+    yielding(monkeypatch, db.recruiter_profiles, "find_one_and_update")
+    yielding(monkeypatch, db.jobs, "insert_one")
+
+    async def scenario():
+        return await asyncio.gather(
+            *[server.create_job(JOB, recruiter_request(), None) for _ in range(8)], return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(results) - len(rejected) == 3
+    assert {r.status_code for r in rejected} == {402}
+    assert len(db.jobs.docs) == 3
+    assert profile(db)["jobs_posted_this_month"] == 3
+
+
+def test_failed_insert_releases_the_reservation(db, monkeypatch):
+    async def failing_insert(*args, **kwargs):
+        raise PyMongoError("insert failed")
+    monkeypatch.setattr(db.jobs, "insert_one", failing_insert)
+
+    with pytest.raises(PyMongoError):
+        asyncio.run(server.create_job(JOB, recruiter_request(), None))
+
+    assert profile(db)["jobs_posted_this_month"] == 0
+    assert db.jobs.docs == []
+
+
+def test_bulk_post_reserves_all_or_nothing(db):
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(server.create_jobs_bulk([JOB] * 4, recruiter_request(), None))
+    assert e.value.status_code == 402
+    assert profile(db)["jobs_posted_this_month"] == 0
+
+    assert len(asyncio.run(server.create_jobs_bulk([JOB] * 3, recruiter_request(), None))) == 3
+    assert profile(db)["jobs_posted_this_month"] == 3
+
+
+def test_new_month_starts_a_fresh_quota_before_the_reset_task_runs(db):
+    profile(db).update(jobs_posted_this_month=3, quota_period="2000-01")
+
+    asyncio.run(server.create_job(JOB, recruiter_request(), None))
+
+    assert profile(db)["jobs_posted_this_month"] == 1
+    assert profile(db)["quota_period"] == server.current_quota_period()
@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+import server
+from benchmarks.fake_db import FakeDatabase
+from geo import location_fields
+
+
+def job(job_id, location, **fields):
+    return {"job_id": job_id, "status": "approved", "location": location, "posted_at": job_id, **fields}
+
+
+def search(monkeypatch, jobs, location):
+    db = FakeDatabase()
+    db.jobs.docs.extend(jobs)
+    monkeypatch.setattr(server, "db", db)
+    query = server.build_job_query("approved", location)
+    return sorted(doc["job_id"] for doc in asyncio.run(db.jobs.find(query).to_list(None)))
+
+
+def test_known_city_also_matches_ungeocoded_text(monkeypatch):
+    jobs = [
+        job("a", "Bengaluru, Karnataka", **location_fields("Bengaluru, Karnataka")),
+        # Saved before geocoding existed: location_normalized is missing
+        job("b", "Bangalore, Karnataka"),
+        # The geocoder could not place it
+        job("c", "Bangalore outskirts campus", location_normalized=""),
+        job("d", "Pune, Maharashtra", **location_fields("Pune, Maharashtra")),
+    ]
+    assert search(monkeypatch, jobs, "Bangalore") == ["a", "b", "c"]
+
+
+def test_unknown_location_is_a_substring_match(monkeypatch):
+    jobs = [job("a", "Remote (India)", location_normalized=""), job("b", "Pune", **location_fields("Pune"))]
+    assert search(monkeypatch, jobs, "remote") == ["a"]
+
+
+def test_known_city_still_matches_places_containing_it(monkeypatch):
+    jobs = [
+        job("a", "Mumbai", **location_fields("Mumbai")),
+        job("b", "Navi Mumbai", **location_fields("Navi Mumbai")),
+        job("c", "Pune", **location_fields("Pune")),
+    ]
+    assert search(monkeypatch, jobs, "Mumbai") == ["a", "b"]
+    assert search(monkeypatch, jobs, "Navi Mumbai") == ["b"]
+
+
+def faceted_jobs():
+    return [
+        job("a", "Pune", job_type="full-time", required_skills=["python", "sql"], salary_min=400000,
+            **location_fields("Pune")),
+        job("b", "Pune", job_type="contract", required_skills=["python"], salary_min=1200000, **location_fields("Pune")),
+        job("c", "Mumbai", job_type="full-time", required_skills=["react"], **location_fields("Mumbai")),
+        job("d", "Mumbai", job_type="full-time", status="closed", **location_fields("Mumbai")),
+    ]
+
+
+def faceted_search(db, **filters):
+    return asyncio.run(server.get_jobs(**{"status": "approved", "facets": True, **filters}))
+
+
+@pytest.fixture
+def facet_db(monkeypatch):
+    db = FakeDatabase()
+    db.jobs.docs.extend(faceted_jobs())
+    monkeypatch.setattr(server, "db", db)
+    server.job_facets.clear()
+    return db
+
+
+def test_facets_count_the_filtered_jobs(facet_db):
+    result = faceted_search(facet_db)
+
+    assert sorted(doc["job_id"] for doc in result["jobs"]) == ["a", "b", "c"]
+    facets = result["facets"]
+    assert facets["total"] == 3
+    assert facets["job_type"] == [{"value": "full-time", "count": 2}, {"value": "contract", "count": 1}]
+    assert facets["location"] == [
+        {"value": location_fields("Pune")["location_normalized"], "count": 2},
+        {"value": location_fields("Mumbai")["location_normalized"], "count": 1},
+    ]
+    assert facets["skills"][0] == {"value": "python", "count": 2}
+    assert facets["salary"] == [
+        {"min": 300000, "max": 600000, "count": 1},
+        {"min": 1000000, "max": 1500000, "count": 1},
+        {"min": None, "max": None, "count": 1},
+    ]
+    assert faceted_search(facet_db, job_type="contract")["facets"]["total"] == 1
+
+
+def test_facets_are_cached_until_a_job_write(facet_db):
+    assert faceted_search(facet_db)["facets"]["total"] == 3
+    facet_db.jobs.docs.append(job("e", "Pune", job_type="contract", **location_fields("Pune")))
+
+    # Served from job_facets while nothing announced the write
+    assert faceted_search(facet_db)["facets"]["total"] == 3
+    server.on_job_write("e")
+    assert faceted_search(facet_db)["facets"]["total"] == 4
+
+
+def test_change_stream_clears_facets_only_for_search_fields(facet_db):
+    faceted_search(facet_db)
+
+    def update(fields):
+        server.change_listener._dispatch({
+            "operationType": "update", "ns": {"coll": "jobs"}, "wallTime": datetime.now(timezone.utc),
+            "documentKey": {"_id": "oid_a"}, "fullDocument": {"job_id": "a", **facet_db.jobs.docs[0]},
+            "updateDescription": {"updatedFields": dict.fromkeys(fields, 1), "removedFields": []},
+        })
+
+    update(["applicant_counts.total"])
+    assert server.job_facets.stats()["entries"] == 1
+    update(["job_type"])
+    assert server.job_facets.stats()["entries"] == 0
@@ -0,0 +1,26 @@
+import logging
+
+import log_pipeline
+
+
+def test_stop_logging_restores_original_handlers(caplog):
+    # Importing server.py may have started the pipeline already
+    log_pipeline.stop_logging()
+    root = logging.getLogger()
+    original = list(root.handlers)
+    log_pipeline.setup_logging()
+    assert root.handlers != original
+
+    log_pipeline.stop_logging()
+    assert root.handlers == original
+
+    # Records logged after shutdown reach a live handler instead of a drained queue
+    with caplog.at_level(logging.WARNING):
+        logging.getLogger("teardown").warning("logged after shutdown")
+    assert "logged after shutdown" in caplog.text
+
+
+def test_stop_logging_twice_is_harmless():
+    log_pipeline.setup_logging()
+    log_pipeline.stop_logging()
+    log_pipeline.stop_logging()
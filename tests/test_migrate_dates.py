@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from benchmarks.fake_db import SyncFakeDatabase
+from migrate_dates import PROGRESS_COLLECTION, migrate_collection
+
+
+def seeded_db():
+    db = SyncFakeDatabase()
+    users = db.database.users.docs
+    users.extend({"_id": ObjectId(), "created_at": f"2024-01-0{n}T00:00:00+00:00"} for n in range(1, 4))
+    # Stored by business ID (BUSINESS_ID_COLLECTIONS), next to the ObjectId documents
+    users.extend({"_id": f"user_{n}", "created_at": f"2024-02-0{n}T00:00:00+00:00"} for n in range(1, 4))
+    return db
+
+
+def strings_left(db):
+    return [doc["_id"] for doc in db.database.users.docs if isinstance(doc["created_at"], str)]
+
+
+def test_converts_documents_of_every_id_type():
+    db = seeded_db()
+
+    assert migrate_collection(db, "users", ("created_at",), batch_size=2, max_docs_per_second=10 ** 6) == 6
+
+    assert strings_left(db) == []
+    assert all(isinstance(doc["created_at"], datetime) for doc in db.database.users.docs)
+    assert db.database[PROGRESS_COLLECTION].docs[0]["done"] is True
+
+
+def test_resuming_from_an_objectid_still_walks_string_ids():
+    db = seeded_db()
+    _, middle, newest = sorted(
+        (doc for doc in db.database.users.docs if isinstance(doc["_id"], ObjectId)), key=lambda doc: doc["_id"]
+    )
+    # An interrupted run converted the newest documents, then saved progress without an _id type
+    for doc in (middle, newest):
+        doc["created_at"] = datetime(2024, 1, 1)
+    db.database[PROGRESS_COLLECTION].docs.append(
+        {"_id": "dates:users", "last_id": middle["_id"], "converted": 2, "done": False}
+    )
+
+    assert migrate_collection(db, "users", ("created_at",), batch_size=2, max_docs_per_second=10 ** 6) == 6
+
+    assert strings_left(db) == []
+
+
+def test_resuming_within_string_ids_skips_the_objectids():
+    db = seeded_db()
+    db.database[PROGRESS_COLLECTION].docs.append(
+        {"_id": "dates:users", "id_type": "string", "last_id": "user_3", "converted": 4, "done": False}
+    )
+
+    assert migrate_collection(db, "users", ("created_at",), batch_size=2, max_docs_per_second=10 ** 6) == 6
+
+    # Only string _ids below the saved one; the ObjectIds were walked before the interruption
+    assert [doc_id for doc_id in strings_left(db) if not isinstance(doc_id, ObjectId)] == ["user_3"]
+    assert len(strings_left(db)) == 4
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import timedelta
+
+from benchmarks.fake_db import SyncFakeDatabase
+from business_ids import to_stored
+from dates import utcnow
+from message_store import BUCKET_COLLECTION, BucketMessageStore
+from migrate_messages import migrate
+
+START = utcnow() - timedelta(days=1)
+
+
+def message(n, sender, receiver, read=False):
+    return {"message_id": f"msg_{n}", "sender_id": sender, "receiver_id": receiver, "content": f"hello {n}",
+            "application_id": None, "created_at": (START + timedelta(minutes=n)).isoformat(), "read": read}
+
+
+def migrated_store(stored):
+    db = SyncFakeDatabase()
+    db.database.messages.docs.extend(stored)
+    totals = migrate(db, bucket_size=2, bucket_days=30)
+    return db.database, totals
+
+
+def test_keyed_messages_read_back_from_buckets():
+    messages = [message(0, "user_a", "user_b", read=True), message(1, "user_b", "user_a"),
+                message(2, "user_a", "user_b")]
+    # BUSINESS_ID_COLLECTIONS=messages: message_id is stored as _id only
+    database, totals = migrated_store([to_stored(doc, "message_id") for doc in messages])
+    store = BucketMessageStore(database, bucket_size=2)
+
+    assert totals == {"pairs": 1, "messages": 3, "buckets": 2}
+    thread = asyncio.run(store.thread("user_a", "user_b"))
+    assert [m["message_id"] for m in thread] == ["msg_0", "msg_1", "msg_2"]
+    assert thread[1]["receiver_id"] == "user_a"
+
+    asyncio.run(store.mark_read("user_a", "user_b"))
+    assert [m["read"] for m in asyncio.run(store.thread("user_a", "user_b"))] == [True, True, False]
+    assert all(bucket["unread"].get("user_a", 0) == 0 for bucket in database[BUCKET_COLLECTION].docs)
+
+
+def test_unkeyed_messages_keep_their_message_id():
+    database, _ = migrated_store([{"_id": f"oid_{n}", **message(n, "user_a", "user_b")} for n in range(2)])
+
+    thread = asyncio.run(BucketMessageStore(database).thread("user_b", "user_a"))
+
+    assert [m["message_id"] for m in thread] == ["msg_0", "msg_1"]
@@ -0,0 +1,141 @@
+import asyncio
+
+import jwt
+
+import rate_limit
+import server
+from benchmarks.fake_db import FakeDatabase
+from rate_limit import AdmissionControlMiddleware, InMemoryBucketBackend, MongoBucketBackend, RateLimitRule
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def request(middleware, path="/api/jobs", method="GET", ip="10.0.0.1", headers=None):
+    """(status, headers) of one request through the middleware"""
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": b"", "client": (ip, 1234),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(scope, receive, send)
+    start = sent[0]
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}
+
+
+def limited(capacity=2, refill_per_second=1.0, per="user", backend=None, **kwargs):
+    rule = RateLimitRule("jobs", r"^/api/jobs$", capacity=capacity, refill_per_second=refill_per_second, per=per)
+    return AdmissionControlMiddleware(ok_app, [rule], backend=backend, **kwargs)
+
+
+def test_bucket_answers_429_with_retry_after_once_empty():
+    middleware = limited(capacity=2, refill_per_second=0.25)
+
+    async def scenario():
+        return [await request(middleware) for _ in range(3)]
+
+    (first, _), (second, _), (third, headers) = asyncio.run(scenario())
+    assert (first, second, third) == (200, 200, 429)
+    assert headers["retry-after"] == "4"
+
+
+def test_bucket_refills_over_time(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: clock[0])
+    middleware = limited(capacity=1, refill_per_second=0.5)
+
+    async def scenario():
+        statuses = [(await request(middleware))[0] for _ in range(2)]
+        clock[0] += 1
+        statuses.append((await request(middleware))[0])
+        clock[0] += 1
+        statuses.append((await request(middleware))[0])
+        return statuses
+
+    assert asyncio.run(scenario()) == [200, 429, 429, 200]
+
+
+def test_concurrency_cap_answers_503_with_retry_after():
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            await gate.wait()
+            await ok_app(scope, receive, send)
+
+        middleware = AdmissionControlMiddleware(slow_app, [], max_concurrency=1)
+        first = asyncio.create_task(request(middleware))
+        await asyncio.sleep(0)
+        shed = await request(middleware)
+        gate.set()
+        return (await first)[0], shed
+
+    first, (status, headers) = asyncio.run(scenario())
+    assert (first, status) == (200, 503)
+    assert headers["retry-after"] == "1"
+
+
+def test_paths_outside_the_prefix_and_options_are_not_limited():
+    middleware = limited(capacity=1, max_concurrency=0)
+
+    async def scenario():
+        return [
+            (await request(middleware, path="/healthz"))[0],
+            (await request(middleware, method="OPTIONS"))[0],
+        ]
+
+    assert asyncio.run(scenario()) == [200, 200]
+
+
+def test_users_get_their_own_bucket_and_anonymous_requests_share_the_ip():
+    middleware = limited(capacity=1, identify=server.rate_limit_identity)
+
+    def bearer(user_id):
+        token = jwt.encode({"user_id": user_id}, server.JWT_SECRET, algorithm=server.JWT_ALGORITHM)
+        return {"Authorization": f"Bearer {token}"}
+
+    async def scenario():
+        return [(await request(middleware, headers=headers))[0] for headers in (
+            bearer("user_1"), bearer("user_2"), bearer("user_1"), None, None,
+        )]
+
+    # Same IP throughout: the two users and the anonymous caller are limited separately
+    assert asyncio.run(scenario()) == [200, 200, 429, 200, 429]
+
+
+def test_ip_rules_ignore_the_user():
+    middleware = limited(capacity=1, per="ip", identify=lambda conn: "user_1")
+
+    async def scenario():
+        return [(await request(middleware, ip=ip))[0] for ip in ("10.0.0.1", "10.0.0.1", "10.0.0.2")]
+
+    assert asyncio.run(scenario()) == [200, 429, 200]
+
+
+def test_mongo_backend_enforces_one_budget_across_limiters():
+    db = FakeDatabase()
+    workers = [limited(capacity=3, refill_per_second=0.01, backend=MongoBucketBackend(db)) for _ in range(2)]
+
+    async def scenario():
+        return [(await request(workers[n % 2]))[0] for n in range(5)]
+
+    assert asyncio.run(scenario()) == [200, 200, 200, 429, 429]
+    assert len(db[rate_limit.RATE_LIMIT_COLLECTION].docs) == 1
+
+
+def test_memory_backends_are_per_process():
+    workers = [limited(capacity=1, backend=InMemoryBucketBackend()) for _ in range(2)]
+
+    async def scenario():
+        return [(await request(worker))[0] for worker in workers]
+
+    assert asyncio.run(scenario()) == [200, 200]
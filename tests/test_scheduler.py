@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.fake_db import FakeDatabase
+from scheduler import LEASE_COLLECTION, PeriodicTask, Scheduler
+
+
+def counting_task(interval_seconds=3600):
+    runs = []
+
+    async def run():
+        runs.append(1)
+        return 1
+    return PeriodicTask("sweep", interval_seconds, run), runs
+
+
+def test_only_one_worker_runs_a_due_task():
+    db = FakeDatabase()
+    task, runs = counting_task()
+    workers = [Scheduler(db), Scheduler(db)]
+
+    async def scenario():
+        return await asyncio.gather(*[worker.run_if_leader(task) for worker in workers])
+
+    assert sorted(asyncio.run(scenario())) == [False, True]
+    assert len(runs) == 1
+    lease = db[LEASE_COLLECTION].docs[0]
+    assert lease["next_run_at"] > datetime.now(timezone.utc) + timedelta(minutes=59)
+
+
+def test_task_is_not_rerun_before_its_interval():
+    db = FakeDatabase()
+    task, runs = counting_task()
+
+    async def scenario():
+        await Scheduler(db).run_if_leader(task)
+        return await Scheduler(db).run_if_leader(task)
+
+    assert asyncio.run(scenario()) is False
+    assert len(runs) == 1
+
+
+def test_unfinished_first_run_is_retried_once_the_lease_expires():
+    db = FakeDatabase()
+    task, runs = counting_task()
+    crashed = Scheduler(db, lease_seconds=0)
+
+    async def scenario():
+        # The first worker wins the lease but never records the run (cancelled during a deploy)
+        assert await crashed._acquire(task)
+        return await Scheduler(db).run_if_leader(task)
+
+    assert asyncio.run(scenario()) is True
+    assert len(runs) == 1
+
+
+def test_lease_without_next_run_at_is_recovered():
+    db = FakeDatabase()
+    task, runs = counting_task()
+    # Written by a scheduler that did not set next_run_at on insert
+    db[LEASE_COLLECTION].docs.append(
+        {"_id": "sweep", "owner": "gone:1:abc", "lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}
+    )
+
+    assert asyncio.run(Scheduler(db).run_if_leader(task)) is True
+    assert len(runs) == 1
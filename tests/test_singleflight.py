@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flights = SingleFlight("test_shared", timeout_seconds=5)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"n": 1}
+
+    async def scenario():
+        return await asyncio.gather(*[flights.do("key", fetch) for _ in range(5)])
+
+    assert asyncio.run(scenario()) == [{"n": 1}] * 5
+    assert len(calls) == 1
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_cancelled_call_releases_waiters_before_the_timeout():
+    flights = SingleFlight("test_cancelled", timeout_seconds=5)
+
+    async def fetch():
+        await asyncio.sleep(60)
+
+    async def scenario():
+        waiters = [asyncio.create_task(flights.do("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        flights._inflight["key"].task.cancel()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    started = time.monotonic()
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert time.monotonic() - started < 1
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_errors_reach_every_waiter():
+    flights = SingleFlight("test_errors", timeout_seconds=5)
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        return await asyncio.gather(*[flights.do("key", fetch) for _ in range(2)], return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(scenario())] == [ValueError, ValueError]
+    assert flights.errors == 1
+    with pytest.raises(ValueError):
+        asyncio.run(flights.do("key", fetch))
@@ -0,0 +1,116 @@
+import asyncio
+
+from talent_index import ApplicantRanking, TalentIndex
+
+
+def profile(user_id, skills, experience=3, location="Pune"):
+    return {"user_id": user_id, "skills": skills, "experience_years": experience, "location": location,
+            "location_normalized": None, "preferred_salary_min": None, "preferred_salary_max": None}
+
+
+def index_over(profiles, streaming):
+    async def load():
+        return list(profiles)
+    return TalentIndex(load, synced=lambda: streaming, max_age_seconds=0)
+
+
+def test_stale_index_rebuilds_when_change_streams_are_down():
+    profiles = [profile("u1", ["Python"])]
+    index = index_over(profiles, streaming=False)
+
+    async def scenario():
+        await index.rebuild()
+        # Saved through another worker; without a change stream this worker never hears of it
+        profiles.append(profile("u2", ["Python", "SQL"]))
+        assert index.search(skills=["SQL"])["total"] == 0
+        await index._rebuild_task
+        return index.search(skills=["SQL"])
+
+    assert [c["user_id"] for c in asyncio.run(scenario())["candidates"]] == ["u2"]
+
+
+def test_streaming_index_is_not_rebuilt_on_reads():
+    index = index_over([profile("u1", ["Python"])], streaming=True)
+
+    async def scenario():
+        await index.rebuild()
+        index.search(skills=["Python"])
+        return index._rebuild_task
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_ranking_follows_profile_updates():
+    index = TalentIndex()
+    index.build([profile("u1", ["Python", "SQL"], 5), profile("u2", ["Excel"], 1)])
+    job = {"required_skills": ["Python", "SQL"], "experience_required": 4, "location": "Pune"}
+    ranking = ApplicantRanking(index, job, [
+        {"application_id": "a2", "job_seeker_id": "u2", "status": "pending"},
+        {"application_id": "a1", "job_seeker_id": "u1", "status": "pending"},
+    ])
+    assert [entry["application_id"] for entry in ranking.page()[1]] == ["a1", "a2"]
+
+    index.update(profile("u2", ["Python", "SQL", "Excel"], 8))
+    assert ranking.refresh() is True
+    total, page = ranking.page(min_score=0.99)
+    assert total == 2 and [entry["application_id"] for entry in page] == ["a2", "a1"]
+    assert ranking.refresh() is False
+
+
+def ranked_applicants():
+    index = TalentIndex()
+    index.build([
+        profile("u1", ["Python", "SQL", "AWS"], 5),
+        profile("u2", ["Python", "SQL"], 2),
+        profile("u3", ["Python"], 8),
+        profile("u4", ["Python", "SQL"], 2),
+    ])
+    job = {"required_skills": ["Python", "SQL", "AWS"], "experience_required": 4, "location": "Pune"}
+    # Newest first, as get_applicant_ranking reads them; u5 has no profile yet
+    applications = [
+        {"application_id": "a4", "job_seeker_id": "u4", "status": "pending"},
+        {"application_id": "a5", "job_seeker_id": "u5", "status": "pending"},
+        {"application_id": "a3", "job_seeker_id": "u3", "status": "shortlisted"},
+        {"application_id": "a2", "job_seeker_id": "u2", "status": "shortlisted"},
+        {"application_id": "a1", "job_seeker_id": "u1", "status": None},
+    ]
+    return index, ApplicantRanking(index, job, applications)
+
+
+def ids(page):
+    return [entry["application_id"] for entry in page]
+
+
+def test_ranking_orders_by_fit_then_recency():
+    _, ranking = ranked_applicants()
+
+    total, page = ranking.page()
+
+    assert total == 5
+    # a4 and a2 tie; a4 applied later
+    assert ids(page) == ["a1", "a4", "a2", "a3", "a5"]
+    assert page[0]["score"] == 1.0 and page[0]["fit"] == {"skills": 1.0, "experience": 1.0, "location": 1.0, "salary": 1.0}
+    assert page[-1] == {"application_id": "a5", "score": 0.0, "fit": None}
+    assert ids(ranking.page(skip=1, limit=2)[1]) == ["a4", "a2"]
+
+
+def test_ranking_filters():
+    _, ranking = ranked_applicants()
+
+    total, page = ranking.page(min_score=0.65)
+    assert (total, ids(page)) == (3, ["a1", "a4", "a2"])
+    total, page = ranking.page(top_n=2)
+    assert (total, ids(page)) == (2, ["a1", "a4"])
+    assert ids(ranking.page(skip=1, top_n=2)[1]) == ["a4"]
+    assert ids(ranking.page(status="shortlisted")[1]) == ["a2", "a3"]
+    assert ids(ranking.page(status="pending", min_score=0.5)[1]) == ["a1", "a4"]
+
+
+def test_refresh_scores_applicants_whose_profile_appears_later():
+    index, ranking = ranked_applicants()
+    assert ranking.refresh() is False
+
+    index.update(profile("u5", ["Python", "SQL", "AWS"], 10))
+
+    assert ranking.refresh() is True
+    assert ids(ranking.page(limit=2)[1]) == ["a5", "a1"]
@@ -0,0 +1,40 @@
+import asyncio
+
+from typeahead import TypeaheadIndex
+
+
+def approved(job_id, title):
+    return {"job_id": job_id, "status": "approved", "title": title, "company_name": "Acme", "required_skills": []}
+
+
+def index_over(jobs, streaming):
+    async def load():
+        return list(jobs)
+    return TypeaheadIndex(load, synced=lambda: streaming, max_age_seconds=0)
+
+
+def test_stale_index_rebuilds_when_change_streams_are_down():
+    jobs = [approved("job_1", "Python Developer")]
+    index = index_over(jobs, streaming=False)
+
+    async def scenario():
+        await index.rebuild()
+        # Written by another worker; without a change stream this worker never hears of it
+        jobs.append(approved("job_2", "Pastry Chef"))
+        assert [s["text"] for s in index.suggest("pa", kind="title")] == []
+        await index._rebuild_task
+        return [s["text"] for s in index.suggest("pa", kind="title")]
+
+    assert asyncio.run(scenario()) == ["Pastry Chef"]
+
+
+def test_streaming_index_is_not_rebuilt_on_lookups():
+    index = index_over([approved("job_1", "Python Developer")], streaming=True)
+
+    async def scenario():
+        await index.rebuild()
+        index.suggest("py")
+        return index._rebuild_task
+
+    assert asyncio.run(scenario()) is None
+    assert index.rebuilds == 1